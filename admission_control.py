@@ -0,0 +1,232 @@
+import itertools
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+from config import (
+    ADMISSION_MAX_CONCURRENT_TURNS, ADMISSION_MAX_QUEUE_WAIT, ADMISSION_TURN_LATENCY_SLO,
+    ADMISSION_LATENCY_WINDOW, ADMISSION_REDUCED_PROMPT_TOKENS, ADMISSION_TRANSFER_AFTER_SHED,
+    ADMISSION_TRANSFER_NUMBER, ADMISSION_RESPONSE_CACHE_SIZE, ADMISSION_DRAFT_SLOT_SHARE
+)
+from llm_router import LocalProvider
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# Admission modes, from full service to handing the caller to a person
+FULL = 'full'
+REDUCED = 'reduced'
+SHED = 'shed'
+TRANSFER = 'transfer'
+
+class Admission:
+    """The admission decision for a single turn or speculative draft"""
+    def __init__(self, call_id: Optional[str], mode: str, queue_wait: float,
+                 max_prompt_tokens: Optional[int] = None, started_at: Optional[float] = None,
+                 speculative: bool = False):
+        self.call_id = call_id
+        self.mode = mode
+        self.queue_wait = queue_wait
+        self.max_prompt_tokens = max_prompt_tokens
+        self.started_at = started_at
+        self.speculative = speculative
+        self.sequence: Optional[int] = None
+
+    @property
+    def admitted(self) -> bool:
+        """Whether the turn holds a slot and may call the language models"""
+        return self.mode in (FULL, REDUCED)
+
+class ResponseCache:
+    """Bounded LRU of model answers keyed by the normalized caller utterance"""
+    def __init__(self, max_size: int = ADMISSION_RESPONSE_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text: str) -> Optional[str]:
+        key = self._normalize(text)
+        with self._lock:
+            response = self._entries.get(key)
+            if response is not None:
+                self._entries.move_to_end(key)
+            return response
+
+    def put(self, text: str, response: str):
+        key = self._normalize(text)
+        if not key or not response:
+            return
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return " ".join(re.sub(r"[^a-z0-9 ]", "", (text or '').lower()).split())
+
+class AdmissionController:
+    """Admits webhook turns against a concurrency limit and a turn latency SLO.
+
+    A turn waits for a slot only as long as the SLO leaves room for after the
+    expected processing time. Turns expected to miss the SLO run with a shorter
+    prompt, turns that cannot get a slot in time are answered from the response
+    cache or local templates, and callers shed repeatedly are offered a transfer.
+    """
+    def __init__(self,
+                 max_concurrent_turns: int = ADMISSION_MAX_CONCURRENT_TURNS,
+                 max_queue_wait: float = ADMISSION_MAX_QUEUE_WAIT,
+                 latency_slo: float = ADMISSION_TURN_LATENCY_SLO,
+                 latency_window: int = ADMISSION_LATENCY_WINDOW,
+                 reduced_prompt_tokens: int = ADMISSION_REDUCED_PROMPT_TOKENS,
+                 transfer_after_shed: int = ADMISSION_TRANSFER_AFTER_SHED,
+                 transfer_number: Optional[str] = ADMISSION_TRANSFER_NUMBER,
+                 draft_slot_share: float = ADMISSION_DRAFT_SLOT_SHARE,
+                 response_cache: Optional[ResponseCache] = None,
+                 call_metrics=None,
+                 clock=time.monotonic):
+        self.max_concurrent_turns = max_concurrent_turns
+        self.max_queue_wait = max_queue_wait
+        self.latency_slo = latency_slo
+        self.reduced_prompt_tokens = reduced_prompt_tokens
+        self.transfer_after_shed = transfer_after_shed
+        self.transfer_number = transfer_number
+        self.draft_slot_share = draft_slot_share
+        self.response_cache = response_cache or ResponseCache()
+        self.call_metrics = call_metrics
+        self.clock = clock
+
+        self.latencies = deque(maxlen=latency_window)
+        self.in_flight: Dict[int, float] = {}
+        self._sequence = itertools.count()
+        self.waiting = 0
+        self.consecutive_shed: Dict[str, int] = {}
+        self.stats = {
+            FULL: 0,
+            REDUCED: 0,
+            SHED: 0,
+            TRANSFER: 0,
+            'cache_hits': 0,
+            'drafts_admitted': 0,
+            'drafts_refused': 0,
+            'queue_wait_seconds': 0.0
+        }
+        self._condition = threading.Condition()
+
+    def expected_latency(self) -> float:
+        """Expected processing time of a new turn, excluding any wait for a slot"""
+        with self._condition:
+            return self._expected_latency(self.clock())
+
+    def admit(self, call_id: Optional[str] = None) -> Admission:
+        """Decide how to serve a turn; admitted turns must be passed to ``release``"""
+        with self._condition:
+            start = self.clock()
+            expected = self._expected_latency(start)
+            deadline = start + min(self.max_queue_wait, max(self.latency_slo - expected, 0.0))
+
+            self.waiting += 1
+            try:
+                while len(self.in_flight) >= self.max_concurrent_turns:
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+            finally:
+                self.waiting -= 1
+
+            now = self.clock()
+            queue_wait = now - start
+            if len(self.in_flight) >= self.max_concurrent_turns:
+                admission = self._shed(call_id, queue_wait)
+            else:
+                mode = REDUCED if queue_wait + expected > self.latency_slo else FULL
+                admission = Admission(call_id, mode, queue_wait,
+                                      self.reduced_prompt_tokens if mode == REDUCED else None, now)
+                admission.sequence = next(self._sequence)
+                self.in_flight[admission.sequence] = now
+                if call_id is not None:
+                    self.consecutive_shed.pop(call_id, None)
+            self.stats[admission.mode] += 1
+            self.stats['queue_wait_seconds'] += queue_wait
+
+        if admission.mode != FULL:
+            logger.warning(f"Turn for call {call_id} {admission.mode} after {queue_wait:.3f}s "
+                           f"({len(self.in_flight)} in flight, {expected:.3f}s expected)")
+            self._record(admission)
+        return admission
+
+    def admit_draft(self, call_id: Optional[str] = None) -> Optional[Admission]:
+        """A slot for a speculative draft, granted at once or not at all; pass it to ``release`` when done"""
+        with self._condition:
+            now = self.clock()
+            # Drafts are optional work, so they only use capacity no caller is waiting for
+            if (self.waiting or len(self.in_flight) >= self.max_concurrent_turns * self.draft_slot_share
+                    or self._expected_latency(now) > self.latency_slo):
+                self.stats['drafts_refused'] += 1
+                return None
+            admission = Admission(call_id, FULL, 0.0, started_at=now, speculative=True)
+            admission.sequence = next(self._sequence)
+            self.in_flight[admission.sequence] = now
+            self.stats['drafts_admitted'] += 1
+        return admission
+
+    def release(self, admission: Admission):
+        """Free the slot held by an admitted turn and record how long it took"""
+        if not admission.admitted:
+            return
+        with self._condition:
+            started_at = self.in_flight.pop(admission.sequence, None)
+            if started_at is None:
+                return
+            if not admission.speculative:
+                self.latencies.append(self.clock() - started_at)
+            self._condition.notify()
+
+    def fallback_response(self, category: str, text: str) -> str:
+        """An answer that needs no model call: a cached answer to the same question, else a template"""
+        response = self.response_cache.get(text)
+        if response is not None:
+            with self._condition:
+                self.stats['cache_hits'] += 1
+            return response
+        return LocalProvider.RESPONSES.get(category, LocalProvider.RESPONSES['general_inquiry'])
+
+    def cache_response(self, text: str, response: str):
+        """Keep an answer for any caller who asks the same; never pass one built on a call's history"""
+        self.response_cache.put(text, response)
+
+    def end_call(self, call_id: str):
+        with self._condition:
+            self.consecutive_shed.pop(call_id, None)
+
+    def _expected_latency(self, now: float) -> float:
+        # Turns already running longer than usual are the first sign of a provider slowdown
+        longest_running = max((now - started for started in self.in_flight.values()), default=0.0)
+        if not self.latencies:
+            return longest_running
+        ordered = sorted(self.latencies)
+        p90 = ordered[min(int(len(ordered) * 0.9), len(ordered) - 1)]
+        return max(p90, longest_running)
+
+    def _shed(self, call_id: Optional[str], queue_wait: float) -> Admission:
+        shed_count = 0
+        if call_id is not None:
+            shed_count = self.consecutive_shed.get(call_id, 0) + 1
+            self.consecutive_shed[call_id] = shed_count
+        if self.transfer_number and self.transfer_after_shed and shed_count >= self.transfer_after_shed:
+            return Admission(call_id, TRANSFER, queue_wait)
+        return Admission(call_id, SHED, queue_wait)
+
+    def _record(self, admission: Admission):
+        if self.call_metrics is None:
+            return
+        try:
+            self.call_metrics.record_admission(admission.call_id, admission.mode, admission.queue_wait)
+        except Exception as e:
+            logger.error(f"Error recording admission metric: {e}")
@@ -1,27 +1,51 @@
-import openai
-import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from prompt_builder import PromptBuilder, TokenCounter
+from llm_router import LLMRouter
+
+RESPONSE_SYSTEM_PROMPT = "You are a helpful customer support AI assistant. Provide clear and concise responses."
+
+def categorize_intent(analysis: str) -> str:
+    """Map an intent analysis (or the caller's own words) to a response category by keywords"""
+    # Simple intent categorization logic
+    lower_analysis = analysis.lower()
+    
+    if any(word in lower_analysis for word in ["help", "support", "assistance"]):
+        return "general_help"
+    elif any(word in lower_analysis for word in ["price", "cost", "payment"]):
+        return "pricing"
+    elif any(word in lower_analysis for word in ["technical", "error", "problem"]):
+        return "technical_support"
+    elif any(word in lower_analysis for word in ["account", "login", "password"]):
+        return "account_support"
+    else:
+        return "general_inquiry"
 
 class AIAgent:
-    def __init__(self):
-        openai.api_key = os.getenv("OPENAI_API_KEY")
+    """Holds one call's conversation; the router and token counter may be shared between calls"""
+    def __init__(self, router: Optional[LLMRouter] = None, token_counter: Optional[TokenCounter] = None):
+        self.router = router or LLMRouter()
         self.conversation_history = []
+        self.prompt_builder = PromptBuilder(RESPONSE_SYSTEM_PROMPT, counter=token_counter)
+        self.last_prompt_tokens = 0
         
     def analyze_intent(self, user_input: str) -> Dict[str, Any]:
         # Add user input to conversation history
         self.conversation_history.append({"role": "user", "content": user_input})
-        
-        # Analyze intent using OpenAI
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
+        return self.classify_intent(user_input)
+    
+    def classify_intent(self, user_input: str) -> Dict[str, Any]:
+        """Classify the intent of an utterance without touching the conversation history"""
+        # Analyze intent on the fast model tier
+        response = self.router.complete(
+            [
                 {"role": "system", "content": "You are a customer support AI analyzing user intent."},
                 {"role": "user", "content": user_input}
-            ]
+            ],
+            route="intent"
         )
         
         # Extract intent from response
-        intent_analysis = response.choices[0].message['content']
+        intent_analysis = response.content
         
         # Simple intent categorization
         intent = {
@@ -32,37 +56,61 @@ class AIAgent:
         
         return intent
     
-    def generate_response(self, intent: Dict[str, Any]) -> str:
-        # Generate appropriate response based on intent
-        messages = [
-            {"role": "system", "content": "You are a helpful customer support AI assistant. Provide clear and concise responses."},
-            {"role": "user", "content": f"Generate a response for intent: {intent['category']}, user said: {intent['original_text']}"}
-        ]
+    def classify_intent_locally(self, user_input: str) -> Dict[str, Any]:
+        """Classify an utterance by keywords alone, without a model call"""
+        return {
+            "category": self._categorize_intent(user_input),
+            "original_text": user_input,
+            "confidence": 0.5  # Keyword matching is less reliable than the model
+        }
+    
+    def generate_response(self, intent: Dict[str, Any], max_prompt_tokens: Optional[int] = None) -> str:
+        ai_response = self.draft_response(intent, max_prompt_tokens)
+        self.conversation_history.append({"role": "assistant", "content": ai_response})
         
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=messages
+        return ai_response
+    
+    def draft_response(self, intent: Dict[str, Any], max_prompt_tokens: Optional[int] = None) -> str:
+        """Generate a response for an intent without touching the conversation history"""
+        # Generate appropriate response based on intent, with earlier turns as context
+        history = self.conversation_history
+        if history and history[-1] == {"role": "user", "content": intent['original_text']}:
+            # analyze_intent already recorded the current utterance
+            history = history[:-1]
+        messages = self.prompt_builder.build(
+            history,
+            f"Generate a response for intent: {intent['category']}, user said: {intent['original_text']}",
+            max_prompt_tokens
         )
+        self.last_prompt_tokens = self.prompt_builder.count_tokens(messages)
         
-        ai_response = response.choices[0].message['content']
-        self.conversation_history.append({"role": "assistant", "content": ai_response})
+        # The intent category decides which model tier answers
+        response = self.router.complete(messages, route=intent['category'])
         
-        return ai_response
+        return response.content
+    
+    def commit_turn(self, user_input: str, ai_response: str):
+        """Record a completed exchange that was classified and drafted ahead of time"""
+        self.conversation_history.append({"role": "user", "content": user_input})
+        self.conversation_history.append({"role": "assistant", "content": ai_response})
+    
+    def truncate_last_response(self, heard_text: str):
+        """Replace the last reply with the part the caller heard before interrupting"""
+        for index in range(len(self.conversation_history) - 1, -1, -1):
+            if self.conversation_history[index]["role"] == "assistant":
+                if heard_text:
+                    self.conversation_history[index] = {
+                        "role": "assistant",
+                        "content": f"{heard_text}... [interrupted by caller]"
+                    }
+                else:
+                    # Nothing was heard, so the reply never really happened
+                    del self.conversation_history[index]
+                return
     
     def _categorize_intent(self, analysis: str) -> str:
-        # Simple intent categorization logic
-        lower_analysis = analysis.lower()
-        
-        if any(word in lower_analysis for word in ["help", "support", "assistance"]):
-            return "general_help"
-        elif any(word in lower_analysis for word in ["price", "cost", "payment"]):
-            return "pricing"
-        elif any(word in lower_analysis for word in ["technical", "error", "problem"]):
-            return "technical_support"
-        elif any(word in lower_analysis for word in ["account", "login", "password"]):
-            return "account_support"
-        else:
-            return "general_inquiry"
+        return categorize_intent(analysis)
     
     def reset_conversation(self):
         self.conversation_history = []
+        self.prompt_builder.reset()
@@ -0,0 +1,435 @@
+"""Batch analytics over saved conversations and metrics files.
+
+Every file is streamed record by record and reduced to a small rollup in a
+worker process. Rollups are summed into one partial per kind of file and day,
+and the state file keeps those partials plus the size and modification time of
+every file read. A rerun reads only new files, plus the other files of any
+day in which a file changed, since a changed file's old contribution cannot be
+subtracted from its day.
+
+Example:
+    python analytics.py --format csv npz
+"""
+import argparse
+import csv
+import glob
+import json
+import math
+import os
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from ai_agent import categorize_intent
+from config import (
+    ANALYTICS_CONVERSATIONS_DIR, ANALYTICS_METRICS_DIR, ANALYTICS_OUTPUT_DIR, ANALYTICS_READ_CHUNK_SIZE,
+    ANALYTICS_HISTOGRAM_BINS_PER_DECADE, ANALYTICS_HISTOGRAM_MIN_SECONDS, CPU_WORKERS, CPU_POOL_START_METHOD
+)
+from logger_config import get_logger
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+logger = get_logger(__name__)
+
+STATE_VERSION = 2
+OUTPUT_FORMATS = ('csv', 'parquet', 'npz')
+_METRICS_DAY = re.compile(r'metrics_(\d{8})\.jsonl?$')
+_SEPARATORS = ' \t\r\n,'
+
+def iter_json_array(path: str, chunk_size: int = ANALYTICS_READ_CHUNK_SIZE) -> Iterator[Any]:
+    """Yield the items of a top-level JSON array while holding only about one item in memory"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer, position, eof, started = '', 0, False, False
+
+        def refill() -> bool:
+            nonlocal buffer, position, eof
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            return bool(chunk)
+
+        while True:
+            while position < len(buffer) and buffer[position] in _SEPARATORS:
+                position += 1
+            if position == len(buffer):
+                if refill():
+                    continue
+                raise ValueError(f"{path} ends before its JSON array is closed")
+
+            if not started:
+                if buffer[position] != '[':
+                    raise ValueError(f"{path} does not hold a JSON array")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                refill()
+                continue
+            if end == len(buffer) and not eof:
+                # A number at the end of the buffer may continue in the next chunk
+                refill()
+                continue
+            yield item
+            position = end
+
+def iter_json_lines(path: str) -> Iterator[Any]:
+    """Yield one record per line of a JSON-lines file, skipping a last line still being written"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.endswith('\n') and line.strip():
+                yield json.loads(line)
+
+def iter_metrics(path: str) -> Iterator[Any]:
+    # Older metrics files hold one JSON array; the collector now appends JSON lines
+    return iter_json_lines(path) if path.endswith('.jsonl') else iter_json_array(path)
+
+def _bin(value: float) -> int:
+    return max(int(math.floor(math.log10(max(value, ANALYTICS_HISTOGRAM_MIN_SECONDS) / ANALYTICS_HISTOGRAM_MIN_SECONDS)
+                              * ANALYTICS_HISTOGRAM_BINS_PER_DECADE)), 0)
+
+def bin_edges(index: int) -> Tuple[float, float]:
+    """Lower and upper bound in seconds of a histogram bin"""
+    lower = ANALYTICS_HISTOGRAM_MIN_SECONDS * 10 ** (index / ANALYTICS_HISTOGRAM_BINS_PER_DECADE)
+    return lower, lower * 10 ** (1 / ANALYTICS_HISTOGRAM_BINS_PER_DECADE)
+
+def new_stat() -> Dict[str, Any]:
+    return {'count': 0, 'sum': 0.0, 'max': 0.0, 'histogram': {}}
+
+def add_sample(stat: Dict[str, Any], value: float):
+    stat['count'] += 1
+    stat['sum'] += value
+    stat['max'] = max(stat['max'], value)
+    key = str(_bin(value))
+    stat['histogram'][key] = stat['histogram'].get(key, 0) + 1
+
+def merge_stat(target: Dict[str, Any], other: Dict[str, Any]):
+    for key in ('count', 'sum'):
+        target[key] += other[key]
+    target['max'] = max(target['max'], other['max'])
+    for key, count in other['histogram'].items():
+        target['histogram'][key] = target['histogram'].get(key, 0) + count
+
+def stat_percentile(stat: Dict[str, Any], pct: float) -> float:
+    """Percentile estimated from the histogram, as the geometric middle of its bin"""
+    if not stat['count']:
+        return 0.0
+    rank = stat['count'] * pct / 100.0
+    seen = 0
+    for index in sorted(int(key) for key in stat['histogram']):
+        seen += stat['histogram'][str(index)]
+        if seen >= rank:
+            lower, upper = bin_edges(index)
+            return min(math.sqrt(lower * upper), stat['max'])
+    return stat['max']
+
+def new_rollup() -> Dict[str, Any]:
+    return {
+        'conversations': {'calls': 0, 'messages': 0, 'user_turns': 0},
+        'intents': {},
+        'handle_time': new_stat(),
+        'llm_latency': {},
+        'metric_counts': {},
+    }
+
+def merge_rollup(target: Dict[str, Any], other: Dict[str, Any]):
+    for key, value in other['conversations'].items():
+        target['conversations'][key] += value
+    for category, counts in other['intents'].items():
+        totals = target['intents'].setdefault(category, {'calls': 0, 'user_turns': 0})
+        for key, value in counts.items():
+            totals[key] += value
+    merge_stat(target['handle_time'], other['handle_time'])
+    for route, stat in other['llm_latency'].items():
+        totals = target['llm_latency'].setdefault(route, dict(new_stat(), tokens=0, cost=0.0))
+        merge_stat(totals, stat)
+        totals['tokens'] += stat['tokens']
+        totals['cost'] += stat['cost']
+    for name, count in other['metric_counts'].items():
+        target['metric_counts'][name] = target['metric_counts'].get(name, 0) + count
+
+def summarize_conversation_file(path: str) -> Dict[str, Any]:
+    """Rollup of one saved call: its opening intent and the intent of every caller turn"""
+    rollup = new_rollup()
+    conversations = rollup['conversations']
+    turns = Counter()
+    opening = None
+    for message in iter_json_array(path):
+        conversations['messages'] += 1
+        if message.get('role') == 'user':
+            category = categorize_intent(message.get('content') or '')
+            turns[category] += 1
+            opening = opening or category
+    conversations['calls'] = 1
+    conversations['user_turns'] = sum(turns.values())
+    for category, count in turns.items():
+        rollup['intents'][category] = {'calls': int(category == opening), 'user_turns': count}
+    return rollup
+
+def summarize_metrics_file(path: str) -> Dict[str, Any]:
+    """Rollup of one metrics file: handle times, LLM latency by route and counts per metric"""
+    rollup = new_rollup()
+    counts = Counter()
+    for metric in iter_metrics(path):
+        name = metric.get('name')
+        counts[name] += 1
+        value = metric.get('value')
+        if not isinstance(value, (int, float)):
+            continue
+        tags = metric.get('tags') or {}
+        if name == 'call_duration':
+            add_sample(rollup['handle_time'], value)
+        elif name == 'llm_request_time':
+            stat = rollup['llm_latency'].setdefault(tags.get('route', 'unknown'), dict(new_stat(), tokens=0, cost=0.0))
+            add_sample(stat, value)
+            stat['tokens'] += int(tags.get('tokens') or 0)
+            stat['cost'] += float(tags.get('cost') or 0.0)
+    rollup['metric_counts'] = {str(name): count for name, count in counts.items()}
+    return rollup
+
+SUMMARIZERS = {
+    'conversation': summarize_conversation_file,
+    'metrics': summarize_metrics_file,
+}
+
+def _summarize(kind: str, path: str) -> Tuple[str, str, Optional[Dict[str, Any]], Optional[str]]:
+    try:
+        return kind, path, SUMMARIZERS[kind](path), None
+    except Exception as e:
+        # Most often the metrics file for today, caught mid-write; it is retried on the next run
+        return kind, path, None, str(e)
+
+def _bounded_map(pool: Optional[ProcessPoolExecutor], jobs: Iterable[Tuple[str, str]],
+                 max_pending: int) -> Iterator[Tuple[str, str, Optional[Dict[str, Any]], Optional[str]]]:
+    # Keeps at most max_pending files in flight, so memory does not grow with the number of files
+    if pool is None:
+        for kind, path in jobs:
+            yield _summarize(kind, path)
+        return
+    pending = []
+    for kind, path in jobs:
+        pending.append(pool.submit(_summarize, kind, path))
+        if len(pending) >= max_pending:
+            yield pending.pop(0).result()
+    for future in pending:
+        yield future.result()
+
+class AnalyticsJob:
+    """Incremental rollups of per-intent volumes, handle time and LLM latency by route"""
+    def __init__(self,
+                 conversations_dir: str = ANALYTICS_CONVERSATIONS_DIR,
+                 metrics_dir: str = ANALYTICS_METRICS_DIR,
+                 output_dir: str = ANALYTICS_OUTPUT_DIR,
+                 workers: int = CPU_WORKERS,
+                 formats: Iterable[str] = ('csv', 'npz')):
+        self.conversations_dir = conversations_dir
+        self.metrics_dir = metrics_dir
+        self.output_dir = output_dir
+        self.workers = workers
+        self.formats = list(formats)
+        self.state_file = os.path.join(output_dir, 'state.json')
+
+    def discover(self) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """Every input file with the size and modification time that identify its contents and its partial"""
+        sources = [('conversation', os.path.join(self.conversations_dir, '*.json')),
+                   ('metrics', os.path.join(self.metrics_dir, 'metrics_*.json')),
+                   ('metrics', os.path.join(self.metrics_dir, 'metrics_*.jsonl'))]
+        for kind, pattern in sources:
+            for path in sorted(glob.glob(pattern)):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                # Metrics files are named by day; conversations are saved as calls end
+                named = _METRICS_DAY.search(os.path.basename(path)) if kind == 'metrics' else None
+                day = named.group(1) if named else datetime.fromtimestamp(stat.st_mtime_ns / 1e9).strftime('%Y%m%d')
+                yield kind, path, {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'partial': f"{kind}:{day}"}
+
+    def load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+            if state.get('version') == STATE_VERSION:
+                return state
+            logger.warning(f"Ignoring analytics state with version {state.get('version')}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Error loading analytics state, rebuilding: {e}")
+        return {'version': STATE_VERSION, 'partials': {}, 'files': {}}
+
+    def run(self, full: bool = False) -> Dict[str, Any]:
+        """Process new and changed files, then rewrite the summaries; ``full`` starts over"""
+        state = {'version': STATE_VERSION, 'partials': {}, 'files': {}} if full else self.load_state()
+        partials, files = state['partials'], state['files']
+
+        discovered = list(self.discover())
+        stale = set()
+        for kind, path, signature in discovered:
+            entry = files.get(f"{kind}:{path}")
+            if entry is not None and (entry['size'], entry['mtime_ns']) != (signature['size'], signature['mtime_ns']):
+                stale.update((entry['partial'], signature['partial']))
+        # Stale partials are rebuilt from their current files; deleted files elsewhere keep their contribution
+        for partial in stale:
+            partials.pop(partial, None)
+        for key in [key for key, entry in files.items() if entry['partial'] in stale]:
+            del files[key]
+
+        skipped = 0
+        jobs: Dict[str, Dict[str, Any]] = {}
+
+        def pending() -> Iterator[Tuple[str, str]]:
+            nonlocal skipped
+            for kind, path, signature in discovered:
+                key = f"{kind}:{path}"
+                if key in files:
+                    skipped += 1
+                    continue
+                jobs[key] = signature
+                yield kind, path
+
+        processed, failed = 0, []
+        pool = None
+        if self.workers:
+            pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context(CPU_POOL_START_METHOD))
+        try:
+            for kind, path, rollup, error in _bounded_map(pool, pending(), max(self.workers, 1) * 4):
+                signature = jobs.pop(f"{kind}:{path}")
+                if error is not None:
+                    logger.warning(f"Skipping {path}: {error}")
+                    failed.append(path)
+                    continue
+                merge_rollup(partials.setdefault(signature['partial'], new_rollup()), rollup)
+                files[f"{kind}:{path}"] = signature
+                processed += 1
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        totals = new_rollup()
+        for rollup in partials.values():
+            merge_rollup(totals, rollup)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._save_state(state)
+        outputs = self.write_outputs(totals)
+        logger.info(f"Analytics processed {processed} files, skipped {skipped} unchanged, {len(failed)} failed")
+        return {'processed': processed, 'skipped': skipped, 'failed': failed, 'totals': totals, 'outputs': outputs}
+
+    def write_outputs(self, totals: Dict[str, Any]) -> List[str]:
+        tables = build_tables(totals)
+        write_parquet = 'parquet' in self.formats and pyarrow is not None
+        if 'parquet' in self.formats and pyarrow is None:
+            logger.warning("pyarrow is not installed, skipping Parquet output")
+
+        outputs = []
+        for name, rows in tables.items():
+            if 'csv' in self.formats:
+                outputs.append(self._write_csv(name, rows))
+            if write_parquet:
+                path = os.path.join(self.output_dir, f"{name}.parquet")
+                pyarrow.parquet.write_table(pyarrow.Table.from_pylist(rows), path)
+                outputs.append(path)
+        if 'npz' in self.formats:
+            outputs.append(self._write_npz(totals))
+        return outputs
+
+    def _save_state(self, state: Dict[str, Any]):
+        temporary = self.state_file + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(state, f)
+        os.replace(temporary, self.state_file)
+
+    def _write_csv(self, name: str, rows: List[Dict[str, Any]]) -> str:
+        path = os.path.join(self.output_dir, f"{name}.csv")
+        with open(path, 'w', newline='') as f:
+            if rows:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+        return path
+
+    def _write_npz(self, totals: Dict[str, Any]) -> str:
+        import numpy as np
+        # Dense histograms over a shared set of bins, one row per route
+        routes = sorted(totals['llm_latency'])
+        stats = [totals['handle_time']] + [totals['llm_latency'][route] for route in routes]
+        indices = sorted({int(key) for stat in stats for key in stat['histogram']})
+        bins = np.array([bin_edges(index) for index in indices]).reshape(-1, 2)
+
+        def dense(stat):
+            return np.array([stat['histogram'].get(str(index), 0) for index in indices], dtype=np.int64)
+
+        path = os.path.join(self.output_dir, 'summary.npz')
+        np.savez_compressed(
+            path,
+            histogram_bins=bins,
+            handle_time_histogram=dense(totals['handle_time']),
+            llm_routes=np.array(routes, dtype=str),
+            llm_latency_histograms=np.array([dense(totals['llm_latency'][route]) for route in routes],
+                                            dtype=np.int64).reshape(len(routes), len(indices)),
+            intent_categories=np.array(sorted(totals['intents']), dtype=str),
+            intent_calls=np.array([totals['intents'][c]['calls'] for c in sorted(totals['intents'])], dtype=np.int64),
+        )
+        return path
+
+def _stat_row(stat: Dict[str, Any]) -> Dict[str, float]:
+    return {
+        'count': stat['count'],
+        'mean_seconds': stat['sum'] / stat['count'] if stat['count'] else 0.0,
+        'p50_seconds': stat_percentile(stat, 50),
+        'p95_seconds': stat_percentile(stat, 95),
+        'max_seconds': stat['max'],
+    }
+
+def build_tables(totals: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """Report tables: intent volumes, handle time, LLM latency by route and metric counts"""
+    calls = totals['conversations']['calls']
+    intents = [
+        {'category': category, 'calls': counts['calls'], 'user_turns': counts['user_turns'],
+         'call_share': counts['calls'] / calls if calls else 0.0}
+        for category, counts in sorted(totals['intents'].items(), key=lambda item: -item[1]['calls'])
+    ]
+    llm_latency = [
+        dict({'route': route}, **_stat_row(stat), tokens=stat['tokens'], cost=round(stat['cost'], 6))
+        for route, stat in sorted(totals['llm_latency'].items())
+    ]
+    metric_counts = [{'metric': name, 'count': count} for name, count in sorted(totals['metric_counts'].items())]
+    return {
+        'intents': intents,
+        'handle_time': [_stat_row(totals['handle_time'])],
+        'llm_latency': llm_latency,
+        'metric_counts': metric_counts,
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Roll up saved conversations and metrics for reporting")
+    parser.add_argument('--conversations', default=ANALYTICS_CONVERSATIONS_DIR)
+    parser.add_argument('--metrics', default=ANALYTICS_METRICS_DIR)
+    parser.add_argument('--output', default=ANALYTICS_OUTPUT_DIR)
+    parser.add_argument('--workers', type=int, default=CPU_WORKERS, help="Worker processes; 0 runs inline")
+    parser.add_argument('--format', nargs='+', choices=OUTPUT_FORMATS, default=['csv', 'npz'])
+    parser.add_argument('--full', action='store_true', help="Ignore earlier rollups and reprocess every file")
+    args = parser.parse_args(argv)
+
+    job = AnalyticsJob(args.conversations, args.metrics, args.output, args.workers, args.format)
+    result = job.run(full=args.full)
+    print(json.dumps({key: result[key] for key in ('processed', 'skipped', 'failed', 'outputs')}, indent=2))
+    return 1 if result['failed'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,60 +1,334 @@
-from flask import Flask, request, Response
-from twilio.twiml.voice_response import VoiceResponse, Gather
+from flask import Flask, request, Response, abort
 from dotenv import load_dotenv
 import os
+import threading
+import time
+from typing import Optional
 from speech_processor import SpeechProcessor
 from ai_agent import AIAgent
+from prompt_builder import TokenCounter
+from llm_router import LLMRouter
 from call_handler import CallHandler
+from speculative import SpeculativeResponder
+from admission_control import AdmissionController, TRANSFER
+from twiml_templates import TwiMLRenderer, GREETING, FOLLOW_UP, TRANSFER_DECLINED
+from metrics_collector import CallMetrics
+from utils import ConversationUtils
+from logger_config import setup_logger, get_logger
+from config import (
+    SPECULATIVE_EXECUTION, WARM_UP_ON_START, FLASK_DEBUG, FLASK_PORT, MAX_CALL_DURATION, TWILIO_AUTH_TOKEN,
+    MEDIA_STREAM_URL
+)
+
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
 
 load_dotenv()
 
-app = Flask(__name__)
-speech_processor = SpeechProcessor()
-ai_agent = AIAgent()
-call_handler = CallHandler()
-
-@app.route("/incoming_call", methods=['POST'])
-def handle_incoming_call():
-    response = VoiceResponse()
-    gather = Gather(input='speech', action='/process_speech', timeout=3)
-    gather.say("Hello, I'm your AI customer support agent. How can I help you today?")
-    response.append(gather)
-    return str(response)
-
-@app.route("/process_speech", methods=['POST'])
-def process_speech():
-    speech_result = request.values.get('SpeechResult')
-    if not speech_result:
-        return handle_no_input()
-    
-    # Process speech and get AI response
-    intent = ai_agent.analyze_intent(speech_result)
-    response = ai_agent.generate_response(intent)
-    
-    # Generate TwiML response
-    twiml = VoiceResponse()
-    twiml.say(response)
-    
-    # Continue listening
-    gather = Gather(input='speech', action='/process_speech', timeout=3)
-    gather.say("Is there anything else I can help you with?")
-    twiml.append(gather)
-    
-    return str(twiml)
-
-@app.route("/hangup", methods=['POST'])
-def handle_hangup():
-    response = VoiceResponse()
-    response.say("Thank you for calling. Goodbye!")
-    response.hangup()
-    return str(response)
-
-def handle_no_input():
-    response = VoiceResponse()
-    response.say("I didn't catch that. Could you please repeat?")
-    gather = Gather(input='speech', action='/process_speech', timeout=3)
-    response.append(gather)
-    return str(response)
+logger = get_logger(__name__)
+
+class AppServices:
+    """Provider clients and call engines used by the webhooks, each built on first use"""
+    def __init__(self):
+        self._instances = {}
+        self._agents = {}
+        self._call_last_seen = {}
+        self._lock = threading.RLock()
+
+    def _get(self, name: str, factory):
+        instance = self._instances.get(name)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    instance = factory()
+                    self._instances[name] = instance
+        return instance
+
+    @property
+    def speech_processor(self) -> SpeechProcessor:
+        return self._get('speech_processor', SpeechProcessor)
+
+    @property
+    def call_metrics(self) -> CallMetrics:
+        return self._get('call_metrics', CallMetrics)
+
+    @property
+    def llm_router(self) -> LLMRouter:
+        return self._get('llm_router', lambda: LLMRouter(call_metrics=self.call_metrics))
+
+    @property
+    def token_counter(self) -> TokenCounter:
+        return self._get('token_counter', TokenCounter)
+
+    def ai_agent(self, call_sid: Optional[str]) -> AIAgent:
+        """The agent holding one call's conversation, so callers never see each other's turns"""
+        if not call_sid:
+            return AIAgent(self.llm_router, self.token_counter)
+        with self._lock:
+            agent = self._agents.get(call_sid)
+            if agent is None:
+                agent = AIAgent(self.llm_router, self.token_counter)
+                self._agents[call_sid] = agent
+        self.touch(call_sid)
+        return agent
+
+    def touch(self, call_sid: str):
+        """Note activity on a call; the first sight of a new call also drops calls gone quiet"""
+        now = time.monotonic()
+        with self._lock:
+            idle = []
+            if call_sid not in self._call_last_seen:
+                # Calls whose hangup callback never arrived
+                idle = [sid for sid, last_seen in self._call_last_seen.items() if now - last_seen > MAX_CALL_DURATION]
+            self._call_last_seen[call_sid] = now
+        for idle_sid in idle:
+            self.end_call(idle_sid)
+
+    def end_call(self, call_sid: str) -> Optional[AIAgent]:
+        """Forget everything held for a finished call; returns its agent, if one was created"""
+        with self._lock:
+            self._call_last_seen.pop(call_sid, None)
+            # Only engines already built hold per-call state
+            speculative_responder = self._instances.get('speculative_responder')
+            turn_taking = self._instances.get('turn_taking')
+            admission_controller = self._instances.get('admission_controller')
+        if speculative_responder is not None:
+            speculative_responder.discard(call_sid)
+        if turn_taking is not None:
+            turn_taking.end_call(call_sid)
+        if admission_controller is not None:
+            admission_controller.end_call(call_sid)
+        with self._lock:
+            return self._agents.pop(call_sid, None)
+
+    @property
+    def call_handler(self) -> CallHandler:
+        return self._get('call_handler', CallHandler)
+
+    @property
+    def speculative_responder(self) -> SpeculativeResponder:
+        return self._get('speculative_responder',
+                         lambda: SpeculativeResponder(self.ai_agent, call_metrics=self.call_metrics,
+                                                      admission_controller=self.admission_controller))
+
+    @property
+    def admission_controller(self) -> AdmissionController:
+        return self._get('admission_controller', lambda: AdmissionController(call_metrics=self.call_metrics))
+
+    @property
+    def turn_taking(self):
+        return self._get('turn_taking', self._build_turn_taking)
+
+    @property
+    def twiml_renderer(self) -> TwiMLRenderer:
+        return self._get('twiml_renderer', TwiMLRenderer)
+
+    @property
+    def request_validator(self):
+        """Checks Twilio request signatures; False when no auth token is configured"""
+        return self._get('request_validator', self._build_request_validator)
+
+    def _build_request_validator(self):
+        if not TWILIO_AUTH_TOKEN:
+            return False
+        from twilio.request_validator import RequestValidator
+        return RequestValidator(TWILIO_AUTH_TOKEN)
+
+    def _build_turn_taking(self):
+        # Deferred because the VAD pulls in numpy
+        from turn_taking import TurnTakingEngine
+        engine = TurnTakingEngine()
+        engine.add_barge_in_handler(self.cancel_pending_generation)
+        return engine
+
+    def cancel_pending_generation(self, call_id: str, heard_text: str):
+        """Drop the call's draft and trim its last reply before any draft is built on the interruption"""
+        self.speculative_responder.discard(call_id)
+        self.ai_agent(call_id).truncate_last_response(heard_text)
+
+    def warm_up(self):
+        """Build every service and provider client ahead of the first call"""
+        try:
+            self.twiml_renderer
+            self.turn_taking
+            self.speculative_responder
+            self.admission_controller
+            self.speech_processor.warm_up()
+            self.call_handler.client
+            self.llm_router
+            self.token_counter
+            # Load the OpenAI SDK now rather than inside the first caller's turn
+            import openai
+            logger.info("Services warmed up")
+        except Exception as e:
+            logger.error(f"Error warming up services: {e}")
+
+    def warm_up_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.warm_up, name='warm-up', daemon=True)
+        thread.start()
+        return thread
+
+def create_app(services: AppServices = None, warm_up: bool = WARM_UP_ON_START) -> Flask:
+    """Build the Flask app; provider clients are created lazily or warmed in the background"""
+    setup_logger()
+    services = services or AppServices()
+
+    app = Flask(__name__)
+    app.extensions['voice_services'] = services
+
+    @app.before_request
+    def track_call_activity():
+        call_sid = request.values.get('CallSid')
+        if call_sid:
+            services.touch(call_sid)
+
+    @app.route("/incoming_call", methods=['POST'])
+    def handle_incoming_call():
+        call_sid = request.values.get('CallSid')
+        turn_taking = services.turn_taking
+        response = services.twiml_renderer.greeting(turn_taking.speech_timeout(call_sid))
+        if call_sid:
+            turn_taking.start_playback(call_sid, GREETING)
+        return response
+
+    @app.route("/process_speech", methods=['POST'])
+    def process_speech():
+        speech_result = request.values.get('SpeechResult')
+        if not speech_result:
+            return handle_no_input()
+
+        call_sid = request.values.get('CallSid')
+        ai_agent = services.ai_agent(call_sid)
+        turn_taking = services.turn_taking
+
+        # Keep only what the caller heard of a reply they talked over; barge-ins seen
+        # on partial results were already cut short by cancel_pending_generation
+        if call_sid:
+            heard_text = turn_taking.interrupted_playback(call_sid, speech_result, include_barge_in=False)
+            if heard_text is not None:
+                ai_agent.truncate_last_response(heard_text)
+
+        # Under overload, answer without the language models rather than leave the caller in silence
+        admission_controller = services.admission_controller
+        admission = admission_controller.admit(call_sid)
+        if not admission.admitted:
+            return shed_turn(call_sid, speech_result, admission.mode)
+
+        # Answers built on earlier turns may carry the caller's details, so only opening answers are shared
+        shareable = not ai_agent.conversation_history
+
+        # Process speech and get AI response, reusing any draft started on partial transcripts
+        try:
+            if SPECULATIVE_EXECUTION and call_sid:
+                intent, response = services.speculative_responder.resolve(
+                    call_sid, speech_result, admission.max_prompt_tokens)
+            else:
+                intent = ai_agent.analyze_intent(speech_result)
+                response = ai_agent.generate_response(intent, admission.max_prompt_tokens)
+        finally:
+            admission_controller.release(admission)
+        if shareable:
+            admission_controller.cache_response(speech_result, response)
+        return speak_reply(call_sid, response)
+
+    @app.route("/partial_speech", methods=['POST'])
+    def partial_speech():
+        call_sid = request.values.get('CallSid')
+        stable_result = request.values.get('StableSpeechResult')
+        unstable_result = request.values.get('UnstableSpeechResult')
+        if call_sid and (stable_result or unstable_result):
+            services.turn_taking.observe_partial(call_sid, f"{stable_result or ''} {unstable_result or ''}".strip())
+        if SPECULATIVE_EXECUTION and call_sid and stable_result:
+            services.speculative_responder.on_partial_transcript(call_sid, stable_result)
+        return Response(status=204)
+
+    @app.route("/transfer/<transfer_to>", methods=['POST'])
+    def handle_transfer(transfer_to):
+        # Dials out at our expense, so only Twilio may ask and only for the support line
+        transfer_number = services.admission_controller.transfer_number
+        if not transfer_number or transfer_to != transfer_number or not is_signed_by_twilio():
+            logger.warning(f"Rejected transfer request for call {request.values.get('CallSid')}")
+            abort(403)
+        return services.twiml_renderer.transfer(transfer_number)
+
+    @app.route("/transfer_choice", methods=['POST'])
+    def transfer_choice():
+        call_sid = request.values.get('CallSid')
+        declined = (request.values.get('Digits') == '2'
+                    or 'continue' in (request.values.get('SpeechResult') or '').lower())
+        transfer_number = services.admission_controller.transfer_number
+        if transfer_number and not declined:
+            return services.twiml_renderer.transfer(transfer_number)
+        if call_sid:
+            # Start counting shed turns afresh before offering a transfer again
+            services.admission_controller.end_call(call_sid)
+        return speak_reply(call_sid, TRANSFER_DECLINED)
+
+    @app.route("/hangup", methods=['POST'])
+    def handle_hangup():
+        # Also Twilio's status callback, so per-call state goes when the caller hangs up
+        call_sid = request.values.get('CallSid')
+        if call_sid:
+            ai_agent = services.end_call(call_sid)
+            # Inputs for the post-call analytics job
+            if ai_agent is not None and ai_agent.conversation_history:
+                ConversationUtils.save_conversation(call_sid, ai_agent.conversation_history)
+            call_duration = request.values.get('CallDuration')
+            if call_duration:
+                services.call_metrics.record_call_duration(call_sid, float(call_duration))
+        return services.twiml_renderer.hangup()
+
+    def shed_turn(call_sid, speech_result, mode):
+        admission_controller = services.admission_controller
+        if call_sid:
+            services.speculative_responder.discard(call_sid, speech_result)
+        if mode == TRANSFER:
+            # Answered in this response; redirecting the live call over REST would race it
+            return services.twiml_renderer.transfer_offer(admission_controller.transfer_number)
+
+        # A cached answer to the same question, or a template for its keyword category
+        ai_agent = services.ai_agent(call_sid)
+        intent = ai_agent.classify_intent_locally(speech_result)
+        response = admission_controller.fallback_response(intent['category'], speech_result)
+        ai_agent.commit_turn(speech_result, response)
+        return speak_reply(call_sid, response)
+
+    def speak_reply(call_sid, response):
+        # Generate TwiML response, spoken inside a Gather so the caller can interrupt it
+        turn_taking = services.turn_taking
+        twiml = services.twiml_renderer.reply(response, turn_taking.speech_timeout(call_sid))
+        if call_sid:
+            turn_taking.start_playback(call_sid, f"{response} {FOLLOW_UP}")
+        return twiml
+
+    def is_signed_by_twilio():
+        validator = services.request_validator
+        signature = request.headers.get('X-Twilio-Signature')
+        return bool(validator and signature and validator.validate(request.url, request.form, signature))
+
+    def handle_no_input():
+        call_sid = request.values.get('CallSid')
+        return services.twiml_renderer.no_input(services.turn_taking.speech_timeout(call_sid))
+
+    if Sock is not None:
+        sock = Sock(app)
+
+        @sock.route('/media_stream')
+        def media_stream(ws):
+            # Twilio <Stream> audio drives VAD barge-in; the connection closes when the call ends
+            from turn_taking import MediaStreamSession
+            session = MediaStreamSession(services.turn_taking)
+            while True:
+                session.handle(ws.receive())
+    elif MEDIA_STREAM_URL:
+        logger.warning("MEDIA_STREAM_URL is set but flask-sock is not installed; no audio will reach /media_stream")
+
+    if warm_up:
+        services.warm_up_in_background()
+    return app
 
 if __name__ == "__main__":
-    app.run(debug=True, port=5000)
+    create_app().run(debug=FLASK_DEBUG, port=FLASK_PORT)
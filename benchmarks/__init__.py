@@ -0,0 +1 @@
+"""Offline benchmark suite with local stand-ins for OpenAI, Google Speech and Twilio"""
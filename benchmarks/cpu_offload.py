@@ -0,0 +1,108 @@
+import os
+import time
+from typing import Dict, Any, List, Optional, Sequence
+
+from benchmarks.stats import summarize
+
+SAMPLE_RATE = 8000
+TRANSCRIPT_LINES = [
+    "Hi, I was charged twice for my premium plan this month.",
+    "My card number is 4111 1111 1111 1111 and my email is caller@example.com.",
+    "You can reach me on (555) 010-2233 if the call drops.",
+    "I also need to update the billing address on my account.",
+]
+
+
+def synthesize_call_audio(seconds: float, seed: int = 0) -> bytes:
+    """Little-endian 16-bit PCM alternating between speech-like tones and line noise"""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    speaking = (t % 3.0) < 2.0
+    audio = rng.normal(0, 30, len(t))
+    audio += speaking * 6000 * np.sin(2 * np.pi * 180 * t) * (0.6 + 0.4 * np.abs(np.sin(2 * np.pi * 4 * t)))
+    return np.clip(audio, -32768, 32767).astype('<i2').tobytes()
+
+
+def build_transcript(turns: int) -> List[Dict[str, str]]:
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": TRANSCRIPT_LINES[i % len(TRANSCRIPT_LINES)]}
+        for i in range(turns)
+    ]
+
+
+def _run_workload(executor, calls: int, audio: bytes, transcript: List[Dict[str, str]]) -> Dict[str, Any]:
+    from cpu_executor import SharedAudioBuffer, converted_size, TASKS
+
+    text = "\n".join(message['content'] for message in transcript)
+    buffers = []
+    try:
+        for _ in range(calls):
+            source = SharedAudioBuffer.from_bytes(audio)
+            target = SharedAudioBuffer(converted_size(len(audio), 'pcm16', 'mulaw'))
+            buffers.extend([source, target])
+
+        jobs = []
+        for index in range(calls):
+            source, target = buffers[2 * index], buffers[2 * index + 1]
+            jobs.extend([
+                ('convert_audio', (source.ref, target.ref, 'pcm16', 'mulaw')),
+                ('detect_silence', (source.ref, 'pcm16', 0.1)),
+                ('redact_pii', (text,)),
+                ('index_transcript', (transcript,)),
+            ])
+
+        latencies = []
+        start = time.perf_counter()
+        if executor is None:
+            for task, args in jobs:
+                task_start = time.perf_counter()
+                TASKS[task](*args)
+                latencies.append(time.perf_counter() - task_start)
+        else:
+            submitted = [(time.perf_counter(), executor.submit(task, *args)) for task, args in jobs]
+            for task_start, future in submitted:
+                future.result()
+                latencies.append(time.perf_counter() - task_start)
+        elapsed = time.perf_counter() - start
+    finally:
+        for buffer in buffers:
+            buffer.close()
+
+    summary = summarize(latencies)
+    summary['wall_time'] = elapsed
+    summary['tasks_per_sec'] = len(jobs) / elapsed if elapsed else 0.0
+    return summary
+
+
+def measure_cpu_scaling(calls: int = 40,
+                        audio_seconds: float = 30.0,
+                        transcript_turns: int = 200,
+                        worker_counts: Optional[Sequence[int]] = None) -> Dict[str, Any]:
+    """Throughput of the per-call CPU tasks inline and on process pools of increasing size"""
+    from cpu_executor import CPUExecutor
+
+    if worker_counts is None:
+        cores = os.cpu_count() or 1
+        worker_counts = sorted({1, 2, 4, cores} & set(range(1, cores + 1))) or [1]
+    audio = synthesize_call_audio(audio_seconds)
+    transcript = build_transcript(transcript_turns)
+
+    report: Dict[str, Any] = {
+        'config': {'calls': calls, 'audio_seconds': audio_seconds, 'transcript_turns': transcript_turns,
+                   'cpu_count': os.cpu_count()},
+        'inline': _run_workload(None, calls, audio, transcript),
+        'pool': {}
+    }
+    for workers in worker_counts:
+        executor = CPUExecutor(max_workers=workers)
+        try:
+            # Process start-up is a one-off cost paid at app start, not per task
+            executor.warm_up()
+            result = _run_workload(executor, calls, audio, transcript)
+            result['task_stats'] = executor.get_stats()
+        finally:
+            executor.shutdown()
+        result['speedup'] = result['tasks_per_sec'] / report['inline']['tasks_per_sec']
+        report['pool'][f"workers_{workers}"] = result
+    return report
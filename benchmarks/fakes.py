@@ -0,0 +1,236 @@
+import math
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional
+from unittest import mock
+
+import openai
+from google.api_core import exceptions as google_exceptions
+from twilio.base.exceptions import TwilioRestException
+
+
+class LatencyModel:
+    """Samples simulated provider latencies and failures"""
+
+    DISTRIBUTIONS = ('constant', 'uniform', 'normal', 'lognormal')
+
+    def __init__(self,
+                 mean: float = 0.0,
+                 stddev: float = 0.0,
+                 distribution: str = 'lognormal',
+                 error_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        if not 0.0 <= error_rate <= 1.0:
+            raise ValueError("error_rate must be between 0 and 1")
+        self.mean = max(mean, 0.0)
+        self.stddev = max(stddev, 0.0)
+        self.distribution = distribution
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample_latency(self) -> float:
+        """Draw a single latency in seconds"""
+        if self.mean == 0.0:
+            return 0.0
+        with self._lock:
+            if self.distribution == 'constant' or self.stddev == 0.0:
+                return self.mean
+            if self.distribution == 'uniform':
+                return self._random.uniform(max(self.mean - self.stddev, 0.0), self.mean + self.stddev)
+            if self.distribution == 'normal':
+                return max(self._random.gauss(self.mean, self.stddev), 0.0)
+            # Parameterise the lognormal so that its mean and stddev match the inputs
+            sigma_sq = math.log(1 + (self.stddev / self.mean) ** 2)
+            mu = math.log(self.mean) - sigma_sq / 2
+            return self._random.lognormvariate(mu, math.sqrt(sigma_sq))
+
+    def should_fail(self) -> bool:
+        """Decide whether the current request should fail"""
+        if self.error_rate == 0.0:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def wait(self) -> bool:
+        """Sleep for a sampled latency and report whether the request fails"""
+        latency = self.sample_latency()
+        if latency:
+            time.sleep(latency)
+        return self.should_fail()
+
+
+class ProviderProfile:
+    """Latency models for every external provider used by the agent"""
+
+    def __init__(self,
+                 openai_latency: Optional[LatencyModel] = None,
+                 speech_latency: Optional[LatencyModel] = None,
+                 tts_latency: Optional[LatencyModel] = None,
+                 twilio_latency: Optional[LatencyModel] = None,
+                 model_latencies: Optional[Dict[str, LatencyModel]] = None,
+                 request_log_size: int = 0):
+        self.openai = openai_latency or LatencyModel()
+        # Per-model overrides of the OpenAI latency, for exercising model routing
+        self.model_latencies = model_latencies or {}
+        # Most recent OpenAI prompts kept for inspection; off by default so long load runs stay flat
+        self.request_log_size = request_log_size
+        self.speech = speech_latency or LatencyModel()
+        self.tts = tts_latency or LatencyModel()
+        self.twilio = twilio_latency or LatencyModel()
+
+
+class FakeChatCompletion:
+    """Stand-in for the legacy ``openai.ChatCompletion`` API"""
+
+    def __init__(self, latency: LatencyModel, model_latencies: Optional[Dict[str, LatencyModel]] = None,
+                 request_log_size: int = 0):
+        self.latency = latency
+        self.model_latencies = model_latencies or {}
+        self.call_count = 0
+        self.calls_by_model: Dict[str, int] = {}
+        self.requests: deque = deque(maxlen=request_log_size)
+        self._lock = threading.Lock()
+
+    def create(self, model: str = None, messages: List[Dict[str, str]] = None, **kwargs) -> Any:
+        with self._lock:
+            self.call_count += 1
+            self.calls_by_model[model] = self.calls_by_model.get(model, 0) + 1
+            if self.requests.maxlen:
+                self.requests.append(list(messages or []))
+        latency_model = self.model_latencies.get(model, self.latency)
+        latency = latency_model.sample_latency()
+        timeout = kwargs.get('request_timeout')
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise openai.error.Timeout("Simulated OpenAI request timeout")
+        if latency:
+            time.sleep(latency)
+        if latency_model.should_fail():
+            raise openai.error.ServiceUnavailableError("Simulated OpenAI outage")
+
+        messages = messages or []
+        user_text = messages[-1]['content'] if messages else ''
+        # Echo the caller's words so intent categorisation behaves realistically
+        content = f"The caller said: {user_text}"
+        prompt_tokens = sum(len(m['content'].split()) for m in messages)
+        completion_tokens = len(content.split())
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(message={'role': 'assistant', 'content': content})],
+            usage={
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        )
+
+
+class FakeSpeechClient:
+    """Stand-in for ``google.cloud.speech.SpeechClient``"""
+
+    def __init__(self, latency: LatencyModel, transcript: str = "I need help with my account"):
+        self.latency = latency
+        self.transcript = transcript
+
+    def recognize(self, config: Any = None, audio: Any = None) -> Any:
+        if self.latency.wait():
+            raise google_exceptions.ServiceUnavailable("Simulated Speech outage")
+        alternative = SimpleNamespace(transcript=self.transcript, confidence=0.95)
+        return SimpleNamespace(results=[SimpleNamespace(alternatives=[alternative])])
+
+
+class FakeTextToSpeechClient:
+    """Stand-in for ``google.cloud.texttospeech.TextToSpeechClient``"""
+
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+
+    def synthesize_speech(self, input: Any = None, voice: Any = None, audio_config: Any = None) -> Any:
+        if self.latency.wait():
+            raise google_exceptions.ServiceUnavailable("Simulated TTS outage")
+        text = getattr(input, 'text', '') or ''
+        # Roughly 1KB of MP3 per word keeps payload sizes realistic
+        return SimpleNamespace(audio_content=b'\x00' * (1024 * max(len(text.split()), 1)))
+
+
+class _FakeCallContext:
+    def __init__(self, client: 'FakeTwilioClient', sid: str):
+        self._client = client
+        self.sid = sid
+        self.recordings = SimpleNamespace(create=self._create_recording)
+
+    def update(self, **kwargs) -> Any:
+        self._client._request(f"/Calls/{self.sid}")
+        call = self._client.calls_by_sid.setdefault(self.sid, {'status': 'in-progress'})
+        call.update(kwargs)
+        return SimpleNamespace(sid=self.sid, **call)
+
+    def fetch(self) -> Any:
+        self._client._request(f"/Calls/{self.sid}")
+        call = self._client.calls_by_sid.get(self.sid, {})
+        return SimpleNamespace(
+            sid=self.sid,
+            status=call.get('status', 'in-progress'),
+            duration=call.get('duration', 0),
+            direction='inbound',
+            answered_by=None
+        )
+
+    def _create_recording(self) -> Any:
+        self._client._request(f"/Calls/{self.sid}/Recordings")
+        return SimpleNamespace(sid=f"RE{self.sid[2:]}")
+
+
+class _FakeCallList:
+    def __init__(self, client: 'FakeTwilioClient'):
+        self._client = client
+
+    def __call__(self, sid: str) -> _FakeCallContext:
+        return _FakeCallContext(self._client, sid)
+
+    def create(self, url: str = None, to: str = None, from_: str = None, **kwargs) -> Any:
+        self._client._request("/Calls")
+        with self._client._lock:
+            self._client._sequence += 1
+            sid = f"CA{self._client._sequence:032d}"
+        self._client.calls_by_sid[sid] = {'status': 'queued', 'to': to, 'from': from_, 'url': url}
+        return SimpleNamespace(sid=sid, status='queued')
+
+
+class FakeTwilioClient:
+    """Stand-in for ``twilio.rest.Client`` covering the calls used by CallHandler"""
+
+    def __init__(self, latency: LatencyModel, account_sid: str = None, auth_token: str = None):
+        self.latency = latency
+        self.calls_by_sid: Dict[str, Dict[str, Any]] = {}
+        self.calls = _FakeCallList(self)
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def _request(self, uri: str) -> None:
+        if self.latency.wait():
+            raise TwilioRestException(status=503, uri=uri, msg="Simulated Twilio outage")
+
+
+@contextmanager
+def fake_providers(profile: Optional[ProviderProfile] = None):
+    """Swap every external provider client for a local stand-in"""
+    profile = profile or ProviderProfile()
+    chat_completion = FakeChatCompletion(profile.openai, profile.model_latencies, profile.request_log_size)
+    profile.chat_completion = chat_completion
+
+    with mock.patch('openai.ChatCompletion.create', chat_completion.create), \
+            mock.patch('google.cloud.speech.SpeechClient',
+                       lambda *args, **kwargs: FakeSpeechClient(profile.speech)), \
+            mock.patch('google.cloud.texttospeech.TextToSpeechClient',
+                       lambda *args, **kwargs: FakeTextToSpeechClient(profile.tts)), \
+            mock.patch('twilio.rest.Client',
+                       lambda *args, **kwargs: FakeTwilioClient(profile.twilio, *args, **kwargs)):
+        yield profile
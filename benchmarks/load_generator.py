@@ -0,0 +1,104 @@
+import importlib
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Sequence
+
+from benchmarks.stats import summarize
+
+DEFAULT_UTTERANCES = [
+    "I need help with my account password",
+    "How much does the premium plan cost",
+    "I keep getting an error when I log in",
+    "Can you tell me your opening hours",
+    "I was charged twice on my last payment",
+]
+
+
+def load_app():
+    """Build the Flask app with fresh services, so provider clients come from whatever is patched in"""
+    app_module = importlib.import_module('app')
+    return app_module.create_app(app_module.AppServices(), warm_up=False)
+
+
+class WebhookLoadGenerator:
+    """Simulates concurrent Twilio calls against the voice webhooks"""
+
+    def __init__(self,
+                 flask_app,
+                 concurrent_calls: int = 10,
+                 turns_per_call: int = 3,
+                 utterances: Optional[Sequence[str]] = None,
+                 partial_lead_time: Optional[float] = None):
+        self.flask_app = flask_app
+        self.concurrent_calls = concurrent_calls
+        self.turns_per_call = turns_per_call
+        self.utterances = list(utterances or DEFAULT_UTTERANCES)
+        # Seconds between the stable partial transcript and the final one; None sends no partials
+        self.partial_lead_time = partial_lead_time
+        self._latencies: Dict[str, List[float]] = defaultdict(list)
+        self._status_codes: Dict[int, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def _post(self, client, path: str, data: Dict[str, str]) -> float:
+        start = time.perf_counter()
+        response = client.post(path, data=data)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._latencies[path].append(elapsed)
+            self._status_codes[response.status_code] += 1
+        return elapsed
+
+    def _simulate_call(self, call_index: int) -> None:
+        client = self.flask_app.test_client()
+        call_sid = f"CA{call_index:032d}"
+
+        self._post(client, '/incoming_call', {'CallSid': call_sid})
+        for turn in range(self.turns_per_call):
+            utterance = self.utterances[(call_index + turn) % len(self.utterances)]
+            if self.partial_lead_time is not None:
+                self._post(client, '/partial_speech', {
+                    'CallSid': call_sid,
+                    'StableSpeechResult': utterance
+                })
+                time.sleep(self.partial_lead_time)
+            elapsed = self._post(client, '/process_speech', {
+                'CallSid': call_sid,
+                'SpeechResult': utterance,
+                'Confidence': '0.92'
+            })
+            with self._lock:
+                self._latencies['turn'].append(elapsed)
+        self._post(client, '/hangup', {'CallSid': call_sid})
+
+    def run(self) -> Dict[str, Any]:
+        """Run every simulated call to completion and report latency and throughput"""
+        self._latencies.clear()
+        self._status_codes.clear()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrent_calls) as executor:
+            list(executor.map(self._simulate_call, range(self.concurrent_calls)))
+        wall_time = time.perf_counter() - start
+
+        turns = len(self._latencies['turn'])
+        errors = sum(count for code, count in self._status_codes.items() if code >= 400)
+        return {
+            'config': {
+                'concurrent_calls': self.concurrent_calls,
+                'turns_per_call': self.turns_per_call,
+                'partial_lead_time': self.partial_lead_time
+            },
+            'wall_time': wall_time,
+            'turns_per_sec': turns / wall_time if wall_time else 0.0,
+            'calls_per_sec': self.concurrent_calls / wall_time if wall_time else 0.0,
+            'errors': errors,
+            'status_codes': dict(self._status_codes),
+            'turn': summarize(self._latencies['turn']),
+            'endpoints': {
+                path: summarize(values)
+                for path, values in self._latencies.items()
+                if path != 'turn'
+            }
+        }
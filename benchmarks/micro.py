@@ -0,0 +1,96 @@
+import time
+from typing import Callable, Dict, Any
+
+from benchmarks.stats import summarize
+
+SAMPLE_ANALYSES = [
+    "The caller needs help resetting their account password",
+    "The caller is asking about the price of the premium plan",
+    "The caller reports a technical error when logging in",
+    "The caller wants to know the opening hours",
+]
+
+
+def time_operation(operation: Callable[[int], Any], iterations: int) -> Dict[str, float]:
+    """Time each invocation of ``operation(i)`` and summarize the results"""
+    latencies = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        op_start = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - op_start)
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(latencies)
+    summary['ops_per_sec'] = iterations / elapsed if elapsed else 0.0
+    return summary
+
+
+def bench_categorize_intent(iterations: int = 10000) -> Dict[str, float]:
+    """Benchmark the keyword-based intent categoriser"""
+    from ai_agent import AIAgent
+    agent = AIAgent()
+    return time_operation(
+        lambda i: agent._categorize_intent(SAMPLE_ANALYSES[i % len(SAMPLE_ANALYSES)]),
+        iterations
+    )
+
+
+def bench_record_metric(iterations: int = 500) -> Dict[str, float]:
+    """Benchmark appending metrics to the daily metrics file"""
+    from metrics_collector import CallMetrics
+    call_metrics = CallMetrics()
+    return time_operation(
+        lambda i: call_metrics.record_ai_processing_time(f"bench-{i % 10}", 0.25),
+        iterations
+    )
+
+
+def bench_conversation_persistence(iterations: int = 500, turns: int = 20) -> Dict[str, float]:
+    """Benchmark a save followed by a load of a conversation history"""
+    from utils import ConversationUtils
+    conversation = []
+    for turn in range(turns):
+        conversation.append({"role": "user", "content": SAMPLE_ANALYSES[turn % len(SAMPLE_ANALYSES)]})
+        conversation.append({"role": "assistant", "content": "Happy to help with that."})
+
+    def save_and_load(i: int):
+        call_id = f"bench-{i % 10}"
+        ConversationUtils.save_conversation(call_id, conversation)
+        ConversationUtils.load_conversation(call_id)
+
+    return time_operation(save_and_load, iterations)
+
+
+SAMPLE_REPLY = "Your order #1042 shipped today & should arrive in 3-5 days. Anything <else>?"
+
+
+def bench_twiml_library(iterations: int = 5000) -> Dict[str, float]:
+    """Benchmark building and serializing the reply TwiML with the twilio library"""
+    from twiml_templates import build_reply
+    return time_operation(lambda i: str(build_reply(SAMPLE_REPLY, 2)), iterations)
+
+
+def bench_twiml_template(iterations: int = 5000) -> Dict[str, float]:
+    """Benchmark rendering the same reply from the precompiled template"""
+    from twiml_templates import TwiMLRenderer
+    renderer = TwiMLRenderer()
+    return time_operation(lambda i: renderer.reply(SAMPLE_REPLY, 2), iterations)
+
+
+MICRO_BENCHMARKS = {
+    'categorize_intent': bench_categorize_intent,
+    'record_metric': bench_record_metric,
+    'conversation_persistence': bench_conversation_persistence,
+    'twiml_library': bench_twiml_library,
+    'twiml_template': bench_twiml_template,
+}
+
+
+def run_micro_benchmarks(scale: float = 1.0) -> Dict[str, Dict[str, float]]:
+    """Run every micro-benchmark, scaling the default iteration counts"""
+    results = {}
+    for name, benchmark in MICRO_BENCHMARKS.items():
+        default_iterations = benchmark.__defaults__[0]
+        results[name] = benchmark(max(int(default_iterations * scale), 1))
+    return results
@@ -0,0 +1,112 @@
+"""Run the offline benchmark suite.
+
+Example:
+    python -m benchmarks.run --calls 20 --turns 3 --llm-latency 0.2 --output report.json
+    python -m benchmarks.run --baseline report.json --max-regression 0.25
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.fakes import LatencyModel, ProviderProfile, fake_providers
+from benchmarks.stats import find_regressions
+
+
+def build_profile(args: argparse.Namespace) -> ProviderProfile:
+    def model(mean: float, seed_offset: int) -> LatencyModel:
+        return LatencyModel(
+            mean=mean,
+            stddev=mean * args.jitter,
+            distribution=args.distribution,
+            error_rate=args.error_rate,
+            seed=None if args.seed is None else args.seed + seed_offset
+        )
+
+    return ProviderProfile(
+        openai_latency=model(args.llm_latency, 0),
+        speech_latency=model(args.speech_latency, 1),
+        tts_latency=model(args.tts_latency, 2),
+        twilio_latency=model(args.twilio_latency, 3)
+    )
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline load test and micro-benchmarks")
+    parser.add_argument('--calls', type=int, default=10, help="Concurrent simulated calls")
+    parser.add_argument('--turns', type=int, default=3, help="Speech turns per call")
+    parser.add_argument('--llm-latency', type=float, default=0.05, help="Mean OpenAI latency (s)")
+    parser.add_argument('--speech-latency', type=float, default=0.02, help="Mean speech-to-text latency (s)")
+    parser.add_argument('--tts-latency', type=float, default=0.02, help="Mean text-to-speech latency (s)")
+    parser.add_argument('--twilio-latency', type=float, default=0.01, help="Mean Twilio REST latency (s)")
+    parser.add_argument('--jitter', type=float, default=0.3, help="Latency stddev as a fraction of the mean")
+    parser.add_argument('--distribution', choices=LatencyModel.DISTRIBUTIONS, default='lognormal')
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Probability a provider call fails")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--partial-lead-time', type=float, default=None,
+                        help="Send a stable partial transcript this many seconds before each final one")
+    parser.add_argument('--micro-scale', type=float, default=1.0, help="Multiplier for micro-benchmark iterations")
+    parser.add_argument('--skip-load', action='store_true')
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--skip-startup', action='store_true')
+    parser.add_argument('--startup-runs', type=int, default=3, help="Fresh interpreters used to time cold start")
+    parser.add_argument('--skip-cpu', action='store_true')
+    parser.add_argument('--cpu-calls', type=int, default=40, help="Calls' worth of audio and transcript work to offload")
+    parser.add_argument('--cpu-workers', type=int, nargs='*', default=None,
+                        help="Process pool sizes to measure (default: 1, 2, 4 and the core count)")
+    parser.add_argument('--workdir', default=None, help="Directory for logs, metrics and conversations")
+    parser.add_argument('--output', default=None, help="Write the JSON report to this file")
+    parser.add_argument('--baseline', default=None, help="Compare against a previous JSON report")
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help="Allowed fractional regression before failing")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    # Keep logs, metrics and conversation files out of the working tree
+    os.chdir(args.workdir or tempfile.mkdtemp(prefix='voice-agent-bench-'))
+
+    report = {}
+    if not args.skip_startup:
+        from benchmarks.startup import measure_startup
+        report['startup'] = measure_startup(args.startup_runs)
+    if not args.skip_cpu:
+        from benchmarks.cpu_offload import measure_cpu_scaling
+        report['cpu'] = measure_cpu_scaling(args.cpu_calls, worker_counts=args.cpu_workers)
+
+    with fake_providers(build_profile(args)):
+        if not args.skip_load:
+            from benchmarks.load_generator import WebhookLoadGenerator, load_app
+            generator = WebhookLoadGenerator(load_app(), args.calls, args.turns,
+                                             partial_lead_time=args.partial_lead_time)
+            report['load'] = generator.run()
+        if not args.skip_micro:
+            from benchmarks.micro import run_micro_benchmarks
+            report['micro'] = run_micro_benchmarks(args.micro_scale)
+
+    print(json.dumps(report, indent=2))
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if baseline_path:
+        with open(baseline_path, 'r') as f:
+            baseline = json.load(f)
+        regressions = find_regressions(report, baseline, args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
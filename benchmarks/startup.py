@@ -0,0 +1,54 @@
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, Any, List
+
+from benchmarks.stats import summarize
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter so every import is cold
+_PROBE = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+flask_app = app.create_app(warm_up=False)
+created = time.perf_counter()
+
+from benchmarks.fakes import fake_providers
+with fake_providers():
+    client = flask_app.test_client()
+    request_start = time.perf_counter()
+    client.post('/incoming_call', data={'CallSid': 'CA0'})
+    client.post('/process_speech', data={'CallSid': 'CA0', 'SpeechResult': 'I need help with my account'})
+    first_request = time.perf_counter() - request_start
+
+    request_start = time.perf_counter()
+    client.post('/incoming_call', data={'CallSid': 'CA1'})
+    client.post('/process_speech', data={'CallSid': 'CA1', 'SpeechResult': 'I need help with my account'})
+    warm_request = time.perf_counter() - request_start
+
+print(json.dumps({
+    'import': imported - start,
+    'create_app': created - imported,
+    'first_request': first_request,
+    'warm_request': warm_request,
+}))
+"""
+
+
+def measure_startup(runs: int = 5) -> Dict[str, Any]:
+    """Measure cold import, app creation and first-request latency across fresh interpreters"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get('PYTHONPATH')])))
+    samples: Dict[str, List[float]] = {}
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', _PROBE],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        # The probe's JSON is its last line of output; anything before it is logging
+        for name, value in json.loads(output.strip().splitlines()[-1]).items():
+            samples.setdefault(name, []).append(value)
+    return {name: summarize(values) for name, values in samples.items()}
@@ -0,0 +1,52 @@
+from typing import Dict, Any, List, Sequence
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Linearly interpolated percentile of a sequence of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize(latencies: Sequence[float]) -> Dict[str, float]:
+    """Summarize latencies (in seconds) as count, mean and tail percentiles"""
+    if not latencies:
+        return {'count': 0, 'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+    return {
+        'count': len(latencies),
+        'mean': sum(latencies) / len(latencies),
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'max': max(latencies)
+    }
+
+
+def find_regressions(report: Dict[str, Any],
+                     baseline: Dict[str, Any],
+                     tolerance: float = 0.2) -> List[str]:
+    """Compare a report against a baseline and describe every regression beyond tolerance"""
+    regressions = []
+
+    def walk(current: Dict[str, Any], previous: Dict[str, Any], path: str):
+        for key, value in current.items():
+            if key not in previous:
+                continue
+            name = f"{path}.{key}" if path else key
+            if isinstance(value, dict) and isinstance(previous[key], dict):
+                walk(value, previous[key], name)
+            elif key == 'p95' and previous[key] > 0:
+                if value > previous[key] * (1 + tolerance):
+                    regressions.append(
+                        f"{name} rose from {previous[key] * 1000:.3f}ms to {value * 1000:.3f}ms"
+                    )
+            elif key.endswith('_per_sec') and previous[key] > 0:
+                if value < previous[key] * (1 - tolerance):
+                    regressions.append(f"{name} fell from {previous[key]:.1f} to {value:.1f}")
+
+    walk(report, baseline, '')
+    return regressions
@@ -1,20 +1,33 @@
-from twilio.rest import Client
 import os
+import threading
 from typing import Dict, Any
 
 class CallHandler:
     def __init__(self):
         self.account_sid = os.getenv('TWILIO_ACCOUNT_SID')
         self.auth_token = os.getenv('TWILIO_AUTH_TOKEN')
-        self.client = Client(self.account_sid, self.auth_token)
+        self._client = None
+        self._lock = threading.Lock()
         self.active_calls = {}
     
+    @property
+    def client(self):
+        """Twilio REST client, created on first use"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from twilio.rest import Client
+                    self._client = Client(self.account_sid, self.auth_token)
+        return self._client
+    
     def start_call(self, to_number: str, from_number: str) -> str:
         """
         Initiate a new call
         """
         call = self.client.calls.create(
             url='http://your-webhook-url/incoming_call',
+            status_callback='http://your-webhook-url/hangup',
+            status_callback_event=['completed'],
             to=to_number,
             from_=from_number
         )
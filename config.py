@@ -7,6 +7,7 @@ load_dotenv()
 FLASK_DEBUG = True
 FLASK_PORT = 5000
 FLASK_HOST = '0.0.0.0'
+WARM_UP_ON_START = True  # build provider clients in a background thread at startup
 
 # Twilio Configuration
 TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
@@ -28,6 +29,87 @@ MAX_RETRIES = 3
 AI_CONFIDENCE_THRESHOLD = 0.7
 DEFAULT_LANGUAGE = 'en-US'
 
+# LLM Routing Settings
+LLM_OFFLINE = os.getenv('LLM_OFFLINE', '').lower() in ('1', 'true', 'yes')  # serve every turn locally
+LLM_TIERS = {
+    # 'fastest' reorders models by measured latency and cost, 'preferred' keeps the listed order
+    'fast': {'models': ['gpt-3.5-turbo', 'gpt-4o-mini'], 'strategy': 'fastest', 'latency_budget': 1.5},
+    'strong': {'models': ['gpt-4', 'gpt-3.5-turbo'], 'strategy': 'preferred', 'latency_budget': 4.0},
+}
+LLM_ROUTES = {
+    'intent': 'fast',
+    'general_inquiry': 'fast',
+    'general_help': 'fast',
+    'pricing': 'fast',
+    'account_support': 'strong',
+    'technical_support': 'strong',
+}
+LLM_DEFAULT_TIER = 'fast'
+LLM_MODEL_COSTS = {  # USD per 1K prompt / completion tokens
+    'gpt-3.5-turbo': (0.0005, 0.0015),
+    'gpt-4o-mini': (0.00015, 0.0006),
+    'gpt-4': (0.03, 0.06),
+}
+LLM_EXPECTED_LATENCY = {  # seconds, used until real latencies are measured
+    'gpt-3.5-turbo': 0.8,
+    'gpt-4o-mini': 1.0,
+    'gpt-4': 2.5,
+}
+LLM_LATENCY_WINDOW = 50  # requests kept per model for rolling latency and error rate
+LLM_MAX_ERROR_RATE = 0.5  # models failing more often than this are tried last
+LLM_HEALTH_TTL = 60.0  # seconds before a recorded latency or failure is forgotten, so demoted models get retried
+LLM_LOCAL_FALLBACK = True  # answer from local templates when every model fails
+
+# Prompt Construction Settings
+PROMPT_TOKEN_BUDGET = 1500  # max prompt tokens sent per turn
+PROMPT_RECENT_TURNS = 6  # history entries kept verbatim
+PROMPT_SUMMARY_MAX_TOKENS = 300  # cap for the rolling summary of older turns
+
+# Turn-Taking Settings
+VAD_SAMPLE_RATE = 8000  # Twilio media streams carry 8kHz audio
+VAD_FRAME_MS = 20
+VAD_ENERGY_MARGIN_DB = 12.0  # speech must be this far above the tracked noise floor
+VAD_MIN_SPEECH_DBFS = -50.0  # never treat quieter frames as speech
+VAD_HANGOVER_MS = 200  # keep speech state through short dips in energy
+BARGE_IN_MIN_SPEECH_MS = 200  # caller speech needed during playback to count as barge-in
+ENDPOINT_MIN_TIMEOUT = 1  # seconds, Twilio speechTimeout only accepts whole seconds
+ENDPOINT_MAX_TIMEOUT = SPEECH_TIMEOUT
+ENDPOINT_PAUSE_MARGIN = 0.3  # seconds added to the caller's typical mid-sentence pause
+TTS_WORDS_PER_SECOND = 2.6  # playback rate used to estimate how much of a reply was heard
+CALLER_WORDS_PER_SECOND = 2.5
+MEDIA_STREAM_URL = os.getenv('MEDIA_STREAM_URL')  # wss:// address of /media_stream; partial results only when unset
+
+# Speculative Execution Settings
+SPECULATIVE_EXECUTION = True
+SPECULATION_MIN_WORDS = 3  # stable partial transcript length before drafting starts
+SPECULATION_MATCH_THRESHOLD = 0.9  # similarity needed to commit a draft to the final transcript
+SPECULATION_WORKERS = 4
+SPECULATION_MAX_WAIT = 1.5  # seconds a turn waits for a draft still in flight before regenerating
+
+# Admission Control Settings
+ADMISSION_MAX_CONCURRENT_TURNS = 20  # turns processed at once; the rest wait briefly or are shed
+ADMISSION_MAX_QUEUE_WAIT = 0.5  # seconds a turn may wait for a free slot
+ADMISSION_TURN_LATENCY_SLO = 3.0  # seconds from the caller finishing to the reply starting
+ADMISSION_LATENCY_WINDOW = 50  # recent turns used to estimate processing time
+ADMISSION_REDUCED_PROMPT_TOKENS = 500  # prompt budget for turns expected to miss the SLO
+ADMISSION_TRANSFER_AFTER_SHED = 2  # consecutive shed turns before offering a transfer
+ADMISSION_TRANSFER_NUMBER = os.getenv('SUPPORT_TRANSFER_NUMBER')  # no transfers when unset
+ADMISSION_RESPONSE_CACHE_SIZE = 256  # model answers kept for reuse while overloaded
+ADMISSION_DRAFT_SLOT_SHARE = 0.5  # share of turn slots speculative drafts may occupy; drafts never queue
+
+# CPU Offload Settings
+CPU_WORKERS = max((os.cpu_count() or 1) - 1, 1)  # worker processes for audio, redaction and indexing; 0 runs inline
+CPU_POOL_START_METHOD = 'spawn'  # forking a process that is already running request threads is unsafe
+CPU_TASK_TIMEOUT = 5.0  # seconds a caller waits for an offloaded task
+
+# Post-Call Analytics Settings
+ANALYTICS_CONVERSATIONS_DIR = 'conversations'
+ANALYTICS_METRICS_DIR = 'metrics'
+ANALYTICS_OUTPUT_DIR = 'analytics'
+ANALYTICS_READ_CHUNK_SIZE = 64 * 1024  # bytes read at a time while streaming JSON files
+ANALYTICS_HISTOGRAM_BINS_PER_DECADE = 20  # log-spaced latency bins, ~12% wide
+ANALYTICS_HISTOGRAM_MIN_SECONDS = 0.001
+
 # Logging Configuration
 LOG_LEVEL = 'INFO'
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -0,0 +1,299 @@
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+from typing import Any, Callable, Dict, List, Optional
+from config import (
+    CPU_WORKERS, CPU_POOL_START_METHOD, CPU_TASK_TIMEOUT,
+    VAD_SAMPLE_RATE, VAD_FRAME_MS, VAD_MIN_SPEECH_DBFS, VAD_ENERGY_MARGIN_DB
+)
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# Bytes per sample of each supported audio encoding
+AUDIO_SAMPLE_WIDTHS = {'pcm16': 2, 'mulaw': 1}
+
+class AudioRef:
+    """Names a shared memory segment holding audio; this, not the audio, is what gets pickled"""
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+
+class SharedAudioBuffer:
+    """Audio in a shared memory segment that worker processes map instead of unpickling.
+
+    The creating process owns the segment and unlinks it on ``close``.
+    """
+    def __init__(self, size: int):
+        # Zero-length segments are not allowed, so empty audio still gets a byte
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.size = size
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'SharedAudioBuffer':
+        buffer = cls(len(data))
+        buffer.shm.buf[:len(data)] = data
+        return buffer
+
+    @property
+    def ref(self) -> AudioRef:
+        return AudioRef(self.shm.name, self.size)
+
+    def tobytes(self, length: Optional[int] = None) -> bytes:
+        return bytes(self.shm.buf[:self.size if length is None else length])
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self) -> 'SharedAudioBuffer':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _samples(buffer, size: int, audio_format: str):
+    import numpy as np
+    if audio_format == 'pcm16':
+        return np.frombuffer(buffer, dtype='<i2', count=size // 2)
+    if audio_format == 'mulaw':
+        from turn_taking import decode_mulaw
+        return decode_mulaw(bytes(buffer[:size]))
+    raise ValueError(f"Unsupported audio format: {audio_format}")
+
+def _encode_mulaw(samples):
+    import numpy as np
+    # G.711 on the top 14 bits, as audioop.lin2ulaw: bias the magnitude, then store sign,
+    # 3-bit segment and 4-bit mantissa, inverted. Shifting first rounds negative samples down.
+    values = samples.astype(np.int32) >> 2
+    negative = values < 0
+    magnitude = np.minimum(np.minimum(np.where(negative, -values, values), 8159) + 33, 0x1FFF)
+    segment = np.clip(np.floor(np.log2(magnitude)).astype(np.int32) - 5, 0, 7)
+    mantissa = (magnitude >> (segment + 1)) & 0x0F
+    return (((segment << 4) | mantissa) ^ np.where(negative, 0x7F, 0xFF)).astype(np.uint8)
+
+def converted_size(size: int, source_format: str, target_format: str) -> int:
+    """Size in bytes of ``size`` bytes of audio after conversion"""
+    for audio_format in (source_format, target_format):
+        if audio_format not in AUDIO_SAMPLE_WIDTHS:
+            raise ValueError(f"Unsupported audio format: {audio_format}")
+    return size // AUDIO_SAMPLE_WIDTHS[source_format] * AUDIO_SAMPLE_WIDTHS[target_format]
+
+def _convert(buffer, size: int, source_format: str, target_format: str):
+    if target_format not in AUDIO_SAMPLE_WIDTHS:
+        raise ValueError(f"Unsupported audio format: {target_format}")
+    samples = _samples(buffer, size, source_format)
+    return _encode_mulaw(samples) if target_format == 'mulaw' else samples.astype('<i2')
+
+def _is_silent(samples, threshold: float) -> bool:
+    import numpy as np
+    frame = VAD_SAMPLE_RATE * VAD_FRAME_MS // 1000
+    frames = len(samples) // frame
+    if frames == 0:
+        return True
+    power = np.mean(np.square(samples[:frames * frame].reshape(frames, frame).astype(np.float64)), axis=1)
+    dbfs = 10 * np.log10(power / 32768.0 ** 2 + 1e-12)
+    voiced = np.count_nonzero(dbfs > VAD_MIN_SPEECH_DBFS + VAD_ENERGY_MARGIN_DB)
+    return voiced / frames < threshold
+
+def convert_audio_bytes(data: bytes, source_format: str, target_format: str) -> bytes:
+    """Convert audio between encodings in the calling process"""
+    return _convert(data, len(data), source_format, target_format).tobytes()
+
+def detect_silence_bytes(data: bytes, audio_format: str = 'pcm16', threshold: float = 0.1) -> bool:
+    """``detect_silence`` for audio held in the calling process"""
+    return _is_silent(_samples(data, len(data), audio_format), threshold)
+
+def convert_audio(source: AudioRef, target: AudioRef, source_format: str, target_format: str) -> int:
+    """Convert shared audio between encodings into ``target``; returns the bytes written"""
+    import numpy as np
+    source_shm = shared_memory.SharedMemory(name=source.name)
+    target_shm = shared_memory.SharedMemory(name=target.name)
+    try:
+        encoded = _convert(source_shm.buf, source.size, source_format, target_format)
+        output = np.ndarray(encoded.shape, dtype=encoded.dtype, buffer=target_shm.buf)
+        output[:] = encoded
+        written = encoded.nbytes
+        # Views must be released before the segments can be closed
+        del encoded, output
+        return written
+    finally:
+        source_shm.close()
+        target_shm.close()
+
+def detect_silence(source: AudioRef, audio_format: str = 'pcm16', threshold: float = 0.1) -> bool:
+    """True when fewer than ``threshold`` of the 20 ms frames carry speech-level energy"""
+    shm = shared_memory.SharedMemory(name=source.name)
+    try:
+        samples = _samples(shm.buf, source.size, audio_format)
+        silent = _is_silent(samples, threshold)
+        # Views must be released before the segment can be closed
+        del samples
+        return silent
+    finally:
+        shm.close()
+
+# Applied in order, so card numbers are masked before their digit groups look like phone numbers
+PII_PATTERNS = [
+    (re.compile(r'\b(?:\d[ -]?){12,15}\d\b'), '****-****-****-****'),  # Credit card
+    (re.compile(r'\b\d{3}-\d{2}-\d{4}\b'), '***-**-****'),  # SSN
+    (re.compile(r'(?<![\w+])(?:\+?1[ .-]?)?\(?\d{3}\)?[ .-]?\d{3}[ .-]?\d{4}\b'), '***-***-****'),  # Phone
+    (re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b'), '****@****.***'),  # Email
+]
+
+def redact_pii(text: str) -> str:
+    """Mask card numbers, SSNs, phone numbers and email addresses"""
+    for pattern, mask in PII_PATTERNS:
+        text = pattern.sub(mask, text)
+    return text
+
+_INDEX_STOPWORDS = frozenset(
+    "a an and are as at be but by can do for from have i if in is it me my no not of on or so "
+    "that the this to was we with you your".split()
+)
+_INDEX_TERM = re.compile(r"[a-z0-9']+")
+
+def index_transcript(conversation: List[Dict[str, str]]) -> Dict[str, List[int]]:
+    """Inverted index of a conversation: each term to the message positions containing it"""
+    index: Dict[str, List[int]] = {}
+    for position, message in enumerate(conversation):
+        for term in set(_INDEX_TERM.findall(message.get('content', '').lower())):
+            term = term.strip("'")
+            if term and term not in _INDEX_STOPWORDS:
+                index.setdefault(term, []).append(position)
+    return index
+
+def _noop() -> None:
+    return None
+
+TASKS: Dict[str, Callable[..., Any]] = {
+    'convert_audio': convert_audio,
+    'detect_silence': detect_silence,
+    'redact_pii': redact_pii,
+    'index_transcript': index_transcript,
+    'noop': _noop,
+}
+
+class TaskTiming:
+    """Where a task's time went: waiting for a worker, then running on it"""
+    def __init__(self, task: str, queue_seconds: float, run_seconds: float, worker_pid: int):
+        self.task = task
+        self.queue_seconds = queue_seconds
+        self.run_seconds = run_seconds
+        self.worker_pid = worker_pid
+
+class TaskResult:
+    def __init__(self, value: Any, timing: TaskTiming):
+        self.value = value
+        self.timing = timing
+
+def _run_task(task: str, args: tuple, submitted_at: float):
+    # Wall-clock time is comparable across processes, perf_counter is not
+    queue_seconds = max(time.time() - submitted_at, 0.0)
+    start = time.perf_counter()
+    value = TASKS[task](*args)
+    return value, queue_seconds, time.perf_counter() - start, os.getpid()
+
+class CPUExecutor:
+    """Runs CPU-bound per-call work in worker processes, away from the webhook threads and the GIL.
+
+    Tasks are named entries of ``TASKS``; audio travels as ``AudioRef``s to shared
+    memory. With ``max_workers=0`` tasks run inline in the calling thread.
+    """
+    def __init__(self,
+                 max_workers: int = CPU_WORKERS,
+                 start_method: str = CPU_POOL_START_METHOD,
+                 call_metrics=None):
+        self.max_workers = max_workers
+        self.start_method = start_method
+        self.call_metrics = call_metrics
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.stats: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {'count': 0, 'failures': 0, 'queue_seconds': 0.0, 'run_seconds': 0.0, 'max_run_seconds': 0.0}
+        )
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        """Worker processes, started on first use"""
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=get_context(self.start_method))
+        return self._pool
+
+    def warm_up(self):
+        """Start the worker processes ahead of the first task"""
+        if self.max_workers:
+            for future in [self.pool.submit(_noop) for _ in range(self.max_workers)]:
+                future.result()
+
+    def submit(self, task: str, *args) -> 'Future[TaskResult]':
+        """Queue a task; the future resolves to its value and timing"""
+        if task not in TASKS:
+            raise ValueError(f"Unknown CPU task: {task}")
+        result: Future = Future()
+
+        if not self.max_workers:
+            try:
+                value, queue_seconds, run_seconds, pid = _run_task(task, args, time.time())
+                result.set_result(self._finish(task, value, queue_seconds, run_seconds, pid))
+            except Exception as e:
+                self._fail(task)
+                result.set_exception(e)
+            return result
+
+        def done(future: Future):
+            try:
+                value, queue_seconds, run_seconds, pid = future.result()
+            except Exception as e:
+                self._fail(task)
+                result.set_exception(e)
+                return
+            result.set_result(self._finish(task, value, queue_seconds, run_seconds, pid))
+
+        self.pool.submit(_run_task, task, args, time.time()).add_done_callback(done)
+        return result
+
+    def run(self, task: str, *args, timeout: Optional[float] = CPU_TASK_TIMEOUT) -> Any:
+        """Run a task and wait for its value"""
+        return self.submit(task, *args).result(timeout=timeout).value
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {task: dict(stats) for task, stats in self.stats.items()}
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _finish(self, task: str, value: Any, queue_seconds: float, run_seconds: float, pid: int) -> TaskResult:
+        with self._lock:
+            stats = self.stats[task]
+            stats['count'] += 1
+            stats['queue_seconds'] += queue_seconds
+            stats['run_seconds'] += run_seconds
+            stats['max_run_seconds'] = max(stats['max_run_seconds'], run_seconds)
+        if self.call_metrics is not None:
+            try:
+                self.call_metrics.record_cpu_task(task, queue_seconds, run_seconds)
+            except Exception as e:
+                logger.error(f"Error recording CPU task metric: {e}")
+        return TaskResult(value, TaskTiming(task, queue_seconds, run_seconds, pid))
+
+    def _fail(self, task: str):
+        with self._lock:
+            self.stats[task]['failures'] += 1
+
+def run_task(executor: Optional[CPUExecutor], task: str, *args) -> Any:
+    """Run a task on ``executor``, or inline when there is none"""
+    if executor is None:
+        return TASKS[task](*args)
+    return executor.run(task, *args)
@@ -2,13 +2,20 @@ from functools import wraps
 import logging
 from typing import Callable, Any, Dict
 from twilio.base.exceptions import TwilioRestException
-from google.cloud.speech import SpeechClient
-from google.api_core import exceptions as google_exceptions
-import openai
 from logger_config import get_logger
 
 logger = get_logger(__name__)
 
+# The Google and OpenAI SDKs are slow to import, so their exception types are
+# only loaded once an error actually needs to be classified
+def _google_api_error() -> type:
+    from google.api_core import exceptions as google_exceptions
+    return google_exceptions.GoogleAPIError
+
+def _openai_error() -> type:
+    import openai
+    return openai.error.OpenAIError
+
 class AIVoiceAgentError(Exception):
     """Base exception class for AI Voice Agent"""
     def __init__(self, message: str, error_code: str = None, details: Dict = None):
@@ -50,7 +57,9 @@ def handle_google_speech_errors(func: Callable) -> Callable:
     def wrapper(*args, **kwargs) -> Any:
         try:
             return func(*args, **kwargs)
-        except google_exceptions.GoogleAPIError as e:
+        except Exception as e:
+            if not isinstance(e, _google_api_error()):
+                raise
             error_msg = f"Google Speech API error: {str(e)}"
             logger.error(error_msg, exc_info=True)
             raise SpeechProcessingError(
@@ -66,7 +75,9 @@ def handle_openai_errors(func: Callable) -> Callable:
     def wrapper(*args, **kwargs) -> Any:
         try:
             return func(*args, **kwargs)
-        except openai.error.OpenAIError as e:
+        except Exception as e:
+            if not isinstance(e, _openai_error()):
+                raise
             error_msg = f"OpenAI API error: {str(e)}"
             logger.error(error_msg, exc_info=True)
             raise AIProcessingError(
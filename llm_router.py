@@ -0,0 +1,280 @@
+import os
+import threading
+import time
+from collections import deque, defaultdict
+from typing import Dict, Any, List, Optional
+from config import (
+    LLM_OFFLINE, LLM_TIERS, LLM_ROUTES, LLM_DEFAULT_TIER, LLM_MODEL_COSTS,
+    LLM_EXPECTED_LATENCY, LLM_LATENCY_WINDOW, LLM_MAX_ERROR_RATE, LLM_LOCAL_FALLBACK, LLM_HEALTH_TTL
+)
+from error_handler import AIProcessingError
+from prompt_builder import TokenCounter
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# Minimum requests before a model's error rate is trusted
+MIN_HEALTH_SAMPLES = 5
+
+class LLMResponse:
+    """Completion text plus the accounting details of the request that produced it"""
+    def __init__(self, content: str, provider: str, route: str,
+                 prompt_tokens: int = 0, completion_tokens: int = 0,
+                 latency: float = 0.0, cost: float = 0.0):
+        self.content = content
+        self.provider = provider
+        self.route = route
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.latency = latency
+        self.cost = cost
+
+class LLMProvider:
+    """Interface for chat completion backends"""
+    name = "provider"
+    prompt_cost = 0.0  # USD per 1K prompt tokens
+    completion_cost = 0.0  # USD per 1K completion tokens
+    expected_latency = 1.0
+
+    def complete(self, messages: List[Dict[str, str]], route: str,
+                 timeout: Optional[float] = None) -> LLMResponse:
+        """Complete a chat prompt, giving up after ``timeout`` seconds where the backend supports it"""
+        raise NotImplementedError
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (prompt_tokens * self.prompt_cost + completion_tokens * self.completion_cost) / 1000
+
+class OpenAIProvider(LLMProvider):
+    """Chat completions from an OpenAI model"""
+    def __init__(self, model: str):
+        self.api_key = os.getenv("OPENAI_API_KEY")
+        self.name = model
+        self.model = model
+        self.prompt_cost, self.completion_cost = LLM_MODEL_COSTS.get(model, (0.0, 0.0))
+        self.expected_latency = LLM_EXPECTED_LATENCY.get(model, 1.0)
+
+    def complete(self, messages: List[Dict[str, str]], route: str,
+                 timeout: Optional[float] = None) -> LLMResponse:
+        # Imported on first request; the SDK is one of the slowest imports at startup
+        import openai
+        response = openai.ChatCompletion.create(
+            model=self.model,
+            messages=messages,
+            api_key=self.api_key,
+            request_timeout=timeout
+        )
+        usage = getattr(response, 'usage', None) or {}
+        return LLMResponse(
+            content=response.choices[0].message['content'],
+            provider=self.name,
+            route=route,
+            prompt_tokens=usage.get('prompt_tokens', 0),
+            completion_tokens=usage.get('completion_tokens', 0)
+        )
+
+class LocalProvider(LLMProvider):
+    """Offline stand-in that answers from templates without any network calls"""
+    name = "local"
+    expected_latency = 0.001
+
+    RESPONSES = {
+        'general_help': "I'm here to help. Could you tell me a little more about what you need?",
+        'pricing': "I can help with pricing and payments. Which plan or charge are you asking about?",
+        'technical_support': "Sorry you're having trouble. Could you describe the error you're seeing?",
+        'account_support': "I can help with your account. Are you having trouble logging in or with your password?",
+        'general_inquiry': "Thanks for your question. Could you give me a few more details?",
+    }
+
+    def __init__(self, counter: Optional[TokenCounter] = None):
+        self.counter = counter or TokenCounter()
+
+    def complete(self, messages: List[Dict[str, str]], route: str,
+                 timeout: Optional[float] = None) -> LLMResponse:
+        if route == 'intent':
+            # The keyword categoriser works directly on the caller's own words
+            content = messages[-1]['content']
+        else:
+            content = self.RESPONSES.get(route, self.RESPONSES['general_inquiry'])
+        return LLMResponse(
+            content=content,
+            provider=self.name,
+            route=route,
+            prompt_tokens=self.counter.count_messages(messages),
+            completion_tokens=self.counter.count(content)
+        )
+
+class ProviderHealth:
+    """Rolling latency and error rate for a single provider.
+
+    Samples older than ``ttl`` are forgotten. A demoted provider gets no traffic
+    and so records nothing new; once its bad samples expire it is tried again.
+    """
+    def __init__(self, expected_latency: float, window: int = LLM_LATENCY_WINDOW,
+                 ttl: float = LLM_HEALTH_TTL, clock=time.monotonic):
+        self.expected_latency = expected_latency
+        self.ttl = ttl
+        self.clock = clock
+        self._latencies = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)
+
+    def record(self, latency: float, success: bool):
+        now = self.clock()
+        if success:
+            self._latencies.append((now, latency))
+        self._outcomes.append((now, success))
+
+    @property
+    def latencies(self) -> List[float]:
+        return [latency for _, latency in self._recent(self._latencies)]
+
+    @property
+    def outcomes(self) -> List[bool]:
+        return [success for _, success in self._recent(self._outcomes)]
+
+    @property
+    def latency(self) -> float:
+        latencies = self.latencies
+        if not latencies:
+            return self.expected_latency
+        ordered = sorted(latencies)
+        return ordered[len(ordered) // 2]
+
+    @property
+    def error_rate(self) -> float:
+        outcomes = self.outcomes
+        if not outcomes:
+            return 0.0
+        return 1 - sum(outcomes) / len(outcomes)
+
+    @property
+    def healthy(self) -> bool:
+        return len(self.outcomes) < MIN_HEALTH_SAMPLES or self.error_rate <= LLM_MAX_ERROR_RATE
+
+    def _recent(self, samples: deque) -> List[tuple]:
+        cutoff = self.clock() - self.ttl
+        return [sample for sample in list(samples) if sample[0] >= cutoff]
+
+class LLMRouter:
+    """Routes each completion to a model tier by intent category.
+
+    Within a tier, models are ordered by measured latency, error rate and cost,
+    and requests fail over down the list, finally to the local provider.
+    """
+    def __init__(self,
+                 providers: Optional[Dict[str, LLMProvider]] = None,
+                 tiers: Optional[Dict[str, Dict[str, Any]]] = None,
+                 routes: Optional[Dict[str, str]] = None,
+                 offline: bool = LLM_OFFLINE,
+                 local_fallback: bool = LLM_LOCAL_FALLBACK,
+                 call_metrics=None,
+                 clock=time.monotonic):
+        self.tiers = tiers or LLM_TIERS
+        self.routes = routes or LLM_ROUTES
+        self.offline = offline
+        self.local_fallback = local_fallback
+        self.call_metrics = call_metrics
+        self.clock = clock
+        self.local = LocalProvider()
+
+        if providers is None:
+            models = {model for tier in self.tiers.values() for model in tier['models']}
+            providers = {model: OpenAIProvider(model) for model in models}
+        self.providers = providers
+        self.health = {name: ProviderHealth(p.expected_latency, clock=clock) for name, p in providers.items()}
+
+        self.usage: Dict[str, Dict[str, Dict[str, float]]] = defaultdict(
+            lambda: defaultdict(lambda: {'requests': 0, 'failures': 0, 'prompt_tokens': 0,
+                                         'completion_tokens': 0, 'cost': 0.0})
+        )
+        self._lock = threading.Lock()
+
+    def tier(self, route: str) -> Dict[str, Any]:
+        """Settings of the model tier that answers a route"""
+        return self.tiers.get(self.routes.get(route, LLM_DEFAULT_TIER), self.tiers[LLM_DEFAULT_TIER])
+
+    def candidates(self, route: str) -> List[LLMProvider]:
+        """Providers to try for a route, best first"""
+        if self.offline:
+            return [self.local]
+
+        tier = self.tier(route)
+        budget = tier.get('latency_budget')
+        ordered = [self.providers[name] for name in tier['models'] if name in self.providers]
+
+        if tier.get('strategy') == 'fastest':
+            ordered.sort(key=lambda p: (
+                self.health[p.name].latency * (1 + self.health[p.name].error_rate),
+                p.prompt_cost + p.completion_cost
+            ))
+
+        def demoted(provider: LLMProvider) -> bool:
+            health = self.health[provider.name]
+            return not health.healthy or (budget is not None and health.latency > budget)
+
+        # Stable sort keeps the tier ordering among equally healthy providers
+        ordered.sort(key=demoted)
+        if self.local_fallback:
+            ordered.append(self.local)
+        return ordered
+
+    def complete(self, messages: List[Dict[str, str]], route: str) -> LLMResponse:
+        """Complete a chat prompt on the best available provider for the route"""
+        errors = []
+        # The tier's budget bounds the whole request, failovers included; each model gets what is left
+        budget = None if self.offline else self.tier(route).get('latency_budget')
+        deadline = None if budget is None else self.clock() + budget
+        for provider in self.candidates(route):
+            timeout = None
+            if deadline is not None and provider is not self.local:
+                timeout = deadline - self.clock()
+                if timeout <= 0:
+                    errors.append(f"{provider.name}: latency budget of {budget}s spent")
+                    continue
+            start = time.perf_counter()
+            try:
+                response = provider.complete(messages, route, timeout=timeout)
+            except Exception as e:
+                latency = time.perf_counter() - start
+                self._record(provider, route, latency, None)
+                logger.warning(f"LLM provider {provider.name} failed for route {route}: {e}")
+                errors.append(f"{provider.name}: {e}")
+                continue
+
+            response.latency = time.perf_counter() - start
+            response.cost = provider.cost(response.prompt_tokens, response.completion_tokens)
+            self._record(provider, route, response.latency, response)
+            return response
+
+        raise AIProcessingError(
+            message=f"All LLM providers failed for route {route}",
+            error_code="LLM_ROUTING_ERROR",
+            details={"errors": errors}
+        )
+
+    def get_usage(self) -> Dict[str, Any]:
+        """Per-route and per-provider token, cost and latency accounting"""
+        with self._lock:
+            return {
+                'routes': {route: {name: dict(stats) for name, stats in providers.items()}
+                           for route, providers in self.usage.items()},
+                'providers': {name: {'latency': health.latency, 'error_rate': health.error_rate}
+                              for name, health in self.health.items()}
+            }
+
+    def _record(self, provider: LLMProvider, route: str, latency: float, response: Optional[LLMResponse]):
+        with self._lock:
+            if provider.name in self.health:
+                self.health[provider.name].record(latency, response is not None)
+            stats = self.usage[route][provider.name]
+            stats['requests'] += 1
+            if response is None:
+                stats['failures'] += 1
+            else:
+                stats['prompt_tokens'] += response.prompt_tokens
+                stats['completion_tokens'] += response.completion_tokens
+                stats['cost'] += response.cost
+
+        if self.call_metrics is not None and response is not None:
+            self.call_metrics.record_llm_request(route, provider.name, latency,
+                                                 response.prompt_tokens + response.completion_tokens,
+                                                 response.cost)
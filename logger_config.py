@@ -4,6 +4,7 @@ import os
 from datetime import datetime
 
 def setup_logger():
+    """Configure console and file logging; called once by the application at startup"""
     # Create logs directory if it doesn't exist
     if not os.path.exists('logs'):
         os.makedirs('logs')
@@ -75,6 +76,3 @@ class SensitiveDataFilter(logging.Filter):
             for pattern_name, pattern in self.patterns.items():
                 record.msg = record.msg.replace(pattern, f'[REDACTED_{pattern_name.upper()}]')
         return True
-
-# Initialize logger when module is imported
-logger = setup_logger()
@@ -1,4 +1,5 @@
 import time
+import threading
 from datetime import datetime
 import json
 import os
@@ -8,19 +9,18 @@ from logger_config import get_logger
 logger = get_logger(__name__)
 
 class MetricsCollector:
+    """Appends metrics to a JSON-lines file per day, one line per metric"""
     def __init__(self):
         self.metrics_dir = "metrics"
         os.makedirs(self.metrics_dir, exist_ok=True)
+        # Webhook threads record concurrently; each metric is written as a single appended line
+        self._lock = threading.Lock()
         self._initialize_metrics_file()
 
     def _initialize_metrics_file(self):
         """Initialize metrics file for the current day"""
         self.current_date = datetime.now().strftime("%Y%m%d")
-        self.metrics_file = os.path.join(self.metrics_dir, f"metrics_{self.current_date}.json")
-        
-        if not os.path.exists(self.metrics_file):
-            with open(self.metrics_file, 'w') as f:
-                json.dump([], f)
+        self.metrics_file = os.path.join(self.metrics_dir, f"metrics_{self.current_date}.jsonl")
 
     def _rotate_metrics_file(self):
         """Check and rotate metrics file if date has changed"""
@@ -35,21 +35,18 @@ class MetricsCollector:
                      timestamp: Optional[float] = None) -> None:
         """Record a metric with the given name and value"""
         try:
-            self._rotate_metrics_file()
-            
             metric = {
                 'name': metric_name,
                 'value': value,
                 'timestamp': timestamp or time.time(),
                 'tags': tags or {}
             }
+            line = json.dumps(metric) + '\n'
 
-            with open(self.metrics_file, 'r+') as f:
-                metrics = json.load(f)
-                metrics.append(metric)
-                f.seek(0)
-                json.dump(metrics, f)
-                f.truncate()
+            with self._lock:
+                self._rotate_metrics_file()
+                with open(self.metrics_file, 'a') as f:
+                    f.write(line)
 
             logger.debug(f"Recorded metric: {metric}")
         except Exception as e:
@@ -62,8 +59,13 @@ class MetricsCollector:
                    tags: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
         """Retrieve metrics based on filters"""
         try:
-            with open(self.metrics_file, 'r') as f:
-                metrics = json.load(f)
+            metrics = []
+            if os.path.exists(self.metrics_file):
+                with open(self.metrics_file, 'r') as f:
+                    for line in f:
+                        # A line without its newline is still being written
+                        if line.endswith('\n'):
+                            metrics.append(json.loads(line))
 
             filtered_metrics = metrics
             
@@ -133,6 +135,14 @@ class CallMetrics:
             tags={'call_id': call_id}
         )
 
+    def record_llm_request(self, route: str, provider: str, duration: float, tokens: int, cost: float):
+        """Record a routed LLM request with its token usage and cost"""
+        self.metrics_collector.record_metric(
+            'llm_request_time',
+            duration,
+            tags={'route': route, 'provider': provider, 'tokens': str(tokens), 'cost': f"{cost:.6f}"}
+        )
+
     def record_error(self, call_id: str, error_type: str):
         """Record an error occurrence"""
         self.metrics_collector.record_metric(
@@ -141,6 +151,37 @@ class CallMetrics:
             tags={'call_id': call_id, 'error_type': error_type}
         )
 
+    def record_speculation(self, call_id: str, outcome: str, duration: float):
+        """Record a speculative draft and the time it saved or wasted"""
+        self.metrics_collector.record_metric(
+            'speculation_time',
+            duration,
+            tags={'call_id': call_id, 'outcome': outcome}
+        )
+
+    def record_cpu_task(self, task: str, queue_seconds: float, run_seconds: float):
+        """Record an offloaded CPU task and how long it waited for a worker"""
+        self.metrics_collector.record_metric(
+            'cpu_task_time',
+            run_seconds,
+            tags={'task': task, 'queue_seconds': f"{queue_seconds:.6f}"}
+        )
+
+    def record_admission(self, call_id: str, mode: str, queue_wait: float):
+        """Record a turn that was degraded or shed under load"""
+        self.metrics_collector.record_metric(
+            'turns_shed' if mode in ('shed', 'transfer') else 'turns_degraded',
+            1,
+            tags={'call_id': call_id or '', 'mode': mode, 'queue_wait': f"{queue_wait:.3f}"}
+        )
+
+    def get_load_shedding_statistics(self, start_time: Optional[float] = None) -> Dict[str, int]:
+        """Count turns degraded or shed under load"""
+        return {
+            'degraded': len(self.metrics_collector.get_metrics('turns_degraded', start_time=start_time)),
+            'shed': len(self.metrics_collector.get_metrics('turns_shed', start_time=start_time))
+        }
+
     def get_call_statistics(self, start_time: Optional[float] = None) -> Dict[str, Any]:
         """Get statistics for all calls"""
         metrics = self.metrics_collector.get_metrics('call_duration', start_time=start_time)
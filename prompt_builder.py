@@ -0,0 +1,158 @@
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional
+from config import PROMPT_TOKEN_BUDGET, PROMPT_RECENT_TURNS, PROMPT_SUMMARY_MAX_TOKENS
+from logger_config import get_logger
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = get_logger(__name__)
+
+# Approximates BPE splitting: words with their leading space, numbers and single punctuation marks
+_TOKEN_PATTERN = re.compile(r" ?[A-Za-z]+| ?\d{1,3}| ?[^\sA-Za-z\d]|\s+")
+
+# Chat format overhead: every message is wrapped in role/separator tokens and the reply is primed
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 2
+
+class TokenCounter:
+    """Counts tokens locally, using tiktoken when installed and a regex approximation otherwise"""
+    def __init__(self, model: str = "gpt-3.5-turbo"):
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except Exception as e:
+                logger.warning(f"Falling back to approximate token counts: {e}")
+        self.count = lru_cache(maxsize=4096)(self._count)
+
+    def _count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        tokens = 0
+        for piece in _TOKEN_PATTERN.findall(text):
+            # Long words are split into several sub-word tokens of roughly four characters
+            tokens += max(1, (len(piece.strip()) + 3) // 4) if piece.strip() else 1
+        return tokens
+
+    def count_messages(self, messages: List[Dict[str, str]]) -> int:
+        """Count the tokens a list of chat messages will use as a prompt"""
+        return sum(TOKENS_PER_MESSAGE + self.count(m['content']) for m in messages) + TOKENS_PER_REPLY
+
+class PromptBuilder:
+    """Builds chat prompts within a token budget from the conversation history.
+
+    The most recent turns are sent verbatim. Older turns are folded, once each,
+    into a rolling summary so the prompt size stays bounded however long the call runs.
+    """
+    def __init__(self,
+                 system_prompt: str,
+                 max_prompt_tokens: int = PROMPT_TOKEN_BUDGET,
+                 recent_turns: int = PROMPT_RECENT_TURNS,
+                 summary_max_tokens: int = PROMPT_SUMMARY_MAX_TOKENS,
+                 counter: Optional[TokenCounter] = None):
+        self.counter = counter or TokenCounter()
+        self.max_prompt_tokens = max_prompt_tokens
+        self.recent_turns = recent_turns
+        self.summary_max_tokens = summary_max_tokens
+
+        # The system prompt never changes, so its message and token cost are computed once
+        self.system_message = {"role": "system", "content": system_prompt}
+        self.system_tokens = self.counter.count_messages([self.system_message])
+
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget the rolling summary, e.g. when a new call starts"""
+        self.summary_lines: List[str] = []
+        self.summary_tokens = 0
+        self.folded_turns = 0
+        self._summary_message: Optional[Dict[str, str]] = None
+
+    def build(self, history: List[Dict[str, str]], user_message: str,
+              max_prompt_tokens: Optional[int] = None) -> List[Dict[str, str]]:
+        """Build the prompt for ``user_message`` given the turns that preceded it.
+
+        A ``max_prompt_tokens`` below the builder's budget shortens this prompt only:
+        recent turns that do not fit are left out rather than folded into the summary.
+        """
+        # Speculative drafts may build prompts concurrently with the live turn
+        with self._lock:
+            messages = self._build(history, user_message)
+            if max_prompt_tokens is not None and max_prompt_tokens < self.max_prompt_tokens:
+                messages = self._shorten(messages, max_prompt_tokens)
+            return messages
+
+    def _shorten(self, messages: List[Dict[str, str]], max_prompt_tokens: int) -> List[Dict[str, str]]:
+        # Drop the oldest verbatim turns first, then the summary; the system prompt and
+        # the current message are always kept
+        messages = list(messages)
+        droppable = 2 if self._summary_message is not None else 1
+        while len(messages) > 2 and self.count_tokens(messages) > max_prompt_tokens:
+            messages.pop(droppable if len(messages) > droppable + 1 else 1)
+        return messages
+
+    def _build(self, history: List[Dict[str, str]], user_message: str) -> List[Dict[str, str]]:
+        if len(history) < self.folded_turns:
+            # The history was replaced underneath us, so the summary no longer applies
+            self.reset()
+
+        # Fold turns that have slid out of the verbatim window into the summary
+        window_start = max(self.folded_turns, len(history) - self.recent_turns)
+        self._fold(history[self.folded_turns:window_start])
+
+        current = {"role": "user", "content": user_message}
+        recent = list(history[self.folded_turns:])
+        while recent and self._prompt_tokens(recent, current) > self.max_prompt_tokens:
+            self._fold(recent[:1])
+            recent.pop(0)
+
+        messages = [self.system_message]
+        if self._summary_message is not None:
+            messages.append(self._summary_message)
+        messages.extend(recent)
+        messages.append(current)
+        return messages
+
+    def count_tokens(self, messages: List[Dict[str, str]]) -> int:
+        return self.counter.count_messages(messages)
+
+    def _prompt_tokens(self, recent: List[Dict[str, str]], current: Dict[str, str]) -> int:
+        summary_tokens = self.summary_tokens + TOKENS_PER_MESSAGE if self._summary_message else 0
+        # The system message already includes the reply priming overhead
+        return (self.system_tokens + summary_tokens
+                + self.counter.count_messages(recent + [current]) - TOKENS_PER_REPLY)
+
+    def _fold(self, turns: List[Dict[str, str]]):
+        if not turns:
+            return
+        for turn in turns:
+            speaker = "Caller" if turn["role"] == "user" else "Agent"
+            self.summary_lines.append(f"{speaker}: {self._condense(turn['content'])}")
+        self.folded_turns += len(turns)
+
+        # Drop the oldest summary lines once the summary outgrows its own budget
+        self.summary_tokens = self.counter.count(self._summary_text())
+        while len(self.summary_lines) > 1 and self.summary_tokens > self.summary_max_tokens:
+            self.summary_lines.pop(0)
+            self.summary_tokens = self.counter.count(self._summary_text())
+
+        self._summary_message = {"role": "system", "content": self._summary_text()}
+
+    def _condense(self, text: str) -> str:
+        # Keep the first sentence, capped at a fraction of the summary budget
+        sentence = re.split(r"(?<=[.!?])\s", text.strip(), maxsplit=1)[0]
+        words = sentence.split()
+        limit = max(self.summary_max_tokens // 4, 8)
+        while len(words) > 1 and self.counter.count(" ".join(words)) > limit:
+            words = words[:-1]
+        condensed = " ".join(words)
+        return condensed if condensed == sentence else condensed + "..."
+
+    def _summary_text(self) -> str:
+        return "Summary of the earlier conversation:\n" + "\n".join(self.summary_lines)
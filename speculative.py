@@ -0,0 +1,237 @@
+import difflib
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, CancelledError, TimeoutError
+from typing import Callable, Dict, Any, Optional, Tuple
+from config import SPECULATION_MIN_WORDS, SPECULATION_MATCH_THRESHOLD, SPECULATION_WORKERS, SPECULATION_MAX_WAIT
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+class Speculation:
+    """A draft response being prepared from a stable partial transcript"""
+    def __init__(self, call_id: str, text: str):
+        self.call_id = call_id
+        self.text = text
+        self.cancel_event = threading.Event()
+        self.future = None
+        self.admission = None
+        self.max_prompt_tokens: Optional[int] = None
+        self.duration = 0.0
+
+    def cancel(self):
+        self.cancel_event.set()
+        self.future.cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+class SpeculativeResponder:
+    """Drafts AI responses while the caller is still speaking.
+
+    Intent classification and response drafting start on stable partial
+    transcripts. When the final transcript arrives the draft is committed if it
+    matches closely enough, otherwise it is cancelled and the turn is regenerated.
+    ``ai_agent(call_id)`` returns the agent holding that call's conversation.
+    With an admission controller, drafts only start while it has spare slots and
+    are built within the prompt budget of their admission.
+    """
+    def __init__(self,
+                 ai_agent: Callable[[str], Any],
+                 call_metrics=None,
+                 min_words: int = SPECULATION_MIN_WORDS,
+                 match_threshold: float = SPECULATION_MATCH_THRESHOLD,
+                 max_workers: int = SPECULATION_WORKERS,
+                 max_wait: float = SPECULATION_MAX_WAIT,
+                 admission_controller=None):
+        self.ai_agent = ai_agent
+        self.call_metrics = call_metrics
+        self.min_words = min_words
+        self.match_threshold = match_threshold
+        self.max_wait = max_wait
+        self.admission_controller = admission_controller
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='speculation')
+        self.speculations: Dict[str, Speculation] = {}
+        # Final transcript of each call's last resolved turn, so its late partials start no draft
+        self.resolved: Dict[str, str] = {}
+        self.stats = {
+            'started': 0,
+            'refused': 0,
+            'committed': 0,
+            'cancelled': 0,
+            'saved_seconds': 0.0,
+            'wasted_seconds': 0.0
+        }
+        self._lock = threading.Lock()
+
+    def on_partial_transcript(self, call_id: str, text: str) -> bool:
+        """Start drafting from a partial transcript; returns True if a new draft was started"""
+        text = (text or '').strip()
+        if len(text.split()) < self.min_words:
+            return False
+
+        with self._lock:
+            resolved = self.resolved.get(call_id)
+            if resolved is not None:
+                if self._belongs_to(text, resolved):
+                    return False
+                # The caller has started a new utterance
+                del self.resolved[call_id]
+            current = self.speculations.get(call_id)
+            if current is not None and self.matches(current.text, text):
+                # The caller is still saying the same thing, keep the draft in flight
+                return False
+            admission = None
+            if self.admission_controller is not None:
+                admission = self.admission_controller.admit_draft(call_id)
+                if admission is None:
+                    self.stats['refused'] += 1
+                    return False
+            speculation = Speculation(call_id, text)
+            speculation.admission = admission
+            speculation.max_prompt_tokens = admission.max_prompt_tokens if admission is not None else None
+            speculation.future = self.executor.submit(self._draft, speculation)
+            if admission is not None:
+                # Frees the slot of a draft cancelled before it started; release is idempotent
+                speculation.future.add_done_callback(lambda future: self.admission_controller.release(admission))
+            self.speculations[call_id] = speculation
+            self.stats['started'] += 1
+
+        if current is not None:
+            self._discard(current)
+        return True
+
+    def resolve(self, call_id: str, final_text: str,
+                max_prompt_tokens: Optional[int] = None) -> Tuple[Dict[str, Any], str]:
+        """Return the intent and response for the final transcript, reusing a matching draft"""
+        with self._lock:
+            speculation = self.speculations.pop(call_id, None)
+            self.resolved[call_id] = final_text
+
+        if speculation is not None:
+            if not self._within_budget(speculation.max_prompt_tokens, max_prompt_tokens):
+                # Drafted on a larger prompt than this turn is admitted with
+                self._discard(speculation)
+            elif self.matches(speculation.text, final_text):
+                result = self._wait_for(speculation)
+                if result is not None:
+                    intent, response = result
+                    intent['original_text'] = final_text
+                    self.ai_agent(call_id).commit_turn(final_text, response)
+                    return intent, response
+            else:
+                self._discard(speculation)
+
+        ai_agent = self.ai_agent(call_id)
+        intent = ai_agent.analyze_intent(final_text)
+        return intent, ai_agent.generate_response(intent, max_prompt_tokens)
+
+    def discard(self, call_id: str, final_text: Optional[str] = None):
+        """Cancel any draft for a call, e.g. when the caller hangs up.
+
+        Pass the turn's ``final_text`` when it was answered without a draft, so late
+        partial transcripts of it start none.
+        """
+        with self._lock:
+            speculation = self.speculations.pop(call_id, None)
+            if final_text is None:
+                self.resolved.pop(call_id, None)
+            else:
+                self.resolved[call_id] = final_text
+        if speculation is not None:
+            self._discard(speculation)
+
+    def matches(self, draft_text: str, final_text: str) -> bool:
+        draft, final = self._normalize(draft_text), self._normalize(final_text)
+        if draft == final:
+            return True
+        return difflib.SequenceMatcher(None, draft, final).ratio() >= self.match_threshold
+
+    def shutdown(self):
+        with self._lock:
+            speculations = list(self.speculations.values())
+            self.speculations.clear()
+            self.resolved.clear()
+        for speculation in speculations:
+            self._discard(speculation)
+        self.executor.shutdown(wait=False)
+
+    def _draft(self, speculation: Speculation) -> Optional[Tuple[Dict[str, Any], str]]:
+        start = time.perf_counter()
+        try:
+            ai_agent = self.ai_agent(speculation.call_id)
+            intent = ai_agent.classify_intent(speculation.text)
+            if speculation.cancelled:
+                # Skip the second model call once the draft is known to be stale
+                return None
+            return intent, ai_agent.draft_response(intent, speculation.max_prompt_tokens)
+        finally:
+            speculation.duration = time.perf_counter() - start
+            if speculation.admission is not None:
+                self.admission_controller.release(speculation.admission)
+
+    def _wait_for(self, speculation: Speculation) -> Optional[Tuple[Dict[str, Any], str]]:
+        if speculation.future.cancel():
+            # Still queued behind other calls' drafts; regenerating now beats waiting for a worker
+            self._discard(speculation)
+            return None
+
+        wait_start = time.perf_counter()
+        try:
+            result = speculation.future.result(timeout=self.max_wait)
+        except CancelledError:
+            return None
+        except TimeoutError:
+            logger.warning(f"Speculative draft for call {speculation.call_id} still running "
+                           f"after {self.max_wait}s, regenerating")
+            self._discard(speculation)
+            return None
+        except Exception as e:
+            logger.warning(f"Speculative draft failed for call {speculation.call_id}, regenerating: {e}")
+            self._record(speculation, 'failed', speculation.duration)
+            return None
+
+        # Time the draft spent running before the caller finished is latency they never hear
+        saved = max(speculation.duration - (time.perf_counter() - wait_start), 0.0)
+        with self._lock:
+            self.stats['committed'] += 1
+            self.stats['saved_seconds'] += saved
+        self._record(speculation, 'committed', saved)
+        return result
+
+    def _belongs_to(self, partial_text: str, final_text: str) -> bool:
+        # Partial results only grow towards the final transcript
+        partial, final = self._normalize(partial_text), self._normalize(final_text)
+        return final.startswith(partial) or self.matches(partial_text, final_text)
+
+    @staticmethod
+    def _within_budget(draft_tokens: Optional[int], turn_tokens: Optional[int]) -> bool:
+        # None is the full prompt budget
+        return turn_tokens is None or (draft_tokens is not None and draft_tokens <= turn_tokens)
+
+    def _discard(self, speculation: Speculation):
+        speculation.cancel()
+        with self._lock:
+            self.stats['cancelled'] += 1
+
+        def account(future):
+            # Work already done by a cancelled draft is wasted compute
+            with self._lock:
+                self.stats['wasted_seconds'] += speculation.duration
+            self._record(speculation, 'cancelled', speculation.duration)
+
+        speculation.future.add_done_callback(account)
+
+    def _record(self, speculation: Speculation, outcome: str, duration: float):
+        if self.call_metrics is None:
+            return
+        try:
+            self.call_metrics.record_speculation(speculation.call_id, outcome, duration)
+        except Exception as e:
+            logger.error(f"Error recording speculation metric: {e}")
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return re.sub(r"[^a-z0-9 ]", "", (text or '').lower()).strip()
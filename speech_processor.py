@@ -1,13 +1,37 @@
-from google.cloud import speech
-from google.cloud import texttospeech
 import os
+import threading
 
 class SpeechProcessor:
+    """Speech-to-text and text-to-speech; the Google clients are created on first use"""
     def __init__(self):
-        self.speech_client = speech.SpeechClient()
-        self.tts_client = texttospeech.TextToSpeechClient()
+        self._speech_client = None
+        self._tts_client = None
+        self._lock = threading.Lock()
+    
+    @property
+    def speech_client(self):
+        if self._speech_client is None:
+            with self._lock:
+                if self._speech_client is None:
+                    from google.cloud import speech
+                    self._speech_client = speech.SpeechClient()
+        return self._speech_client
+    
+    @property
+    def tts_client(self):
+        if self._tts_client is None:
+            with self._lock:
+                if self._tts_client is None:
+                    from google.cloud import texttospeech
+                    self._tts_client = texttospeech.TextToSpeechClient()
+        return self._tts_client
+    
+    def warm_up(self):
+        """Create both clients ahead of the first call"""
+        return self.speech_client, self.tts_client
     
     def speech_to_text(self, audio_content):
+        from google.cloud import speech
         audio = speech.RecognitionAudio(content=audio_content)
         config = speech.RecognitionConfig(
             encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
@@ -22,6 +46,7 @@ class SpeechProcessor:
         return ""
     
     def text_to_speech(self, text):
+        from google.cloud import texttospeech
         synthesis_input = texttospeech.SynthesisInput(text=text)
         voice = texttospeech.VoiceSelectionParams(
             language_code="en-US",
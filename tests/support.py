@@ -0,0 +1,24 @@
+import logging
+import os
+import tempfile
+
+
+def use_temporary_workdir(test):
+    """Run ``test`` in a scratch directory so logs, metrics and conversations stay out of the tree"""
+    workdir = tempfile.TemporaryDirectory()
+    test.addCleanup(workdir.cleanup)
+    test.addCleanup(os.chdir, os.getcwd())
+
+    # create_app() points the root logger at files under the scratch directory; put it back afterwards
+    root_logger = logging.getLogger()
+    handlers, level = root_logger.handlers[:], root_logger.level
+
+    def restore_logging():
+        for handler in root_logger.handlers:
+            if handler not in handlers:
+                handler.close()
+        root_logger.handlers, root_logger.level = handlers, level
+
+    test.addCleanup(restore_logging)
+    os.chdir(workdir.name)
+    return workdir.name
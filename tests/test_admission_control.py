@@ -0,0 +1,204 @@
+import unittest
+import sys
+import os
+import threading
+from unittest.mock import MagicMock
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission_control import AdmissionController, ResponseCache, FULL, REDUCED, SHED, TRANSFER
+from prompt_builder import PromptBuilder
+from llm_router import LocalProvider
+from benchmarks.fakes import LatencyModel, ProviderProfile, fake_providers
+from support import use_temporary_workdir
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestAdmissionController(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.metrics = MagicMock()
+        self.controller = AdmissionController(max_concurrent_turns=2, max_queue_wait=0.0, latency_slo=2.0,
+                                              reduced_prompt_tokens=300, transfer_after_shed=2,
+                                              transfer_number="+15550100", call_metrics=self.metrics,
+                                              clock=self.clock)
+
+    def test_turns_within_limits_are_admitted_in_full(self):
+        admission = self.controller.admit("CA1")
+        self.assertEqual(admission.mode, FULL)
+        self.assertIsNone(admission.max_prompt_tokens)
+        self.controller.release(admission)
+        self.assertEqual(self.controller.in_flight, {})
+        self.metrics.record_admission.assert_not_called()
+
+    def test_turns_over_the_concurrency_limit_are_shed(self):
+        first, second = self.controller.admit("CA1"), self.controller.admit("CA2")
+        shed = self.controller.admit("CA3")
+        self.assertEqual(shed.mode, SHED)
+        self.assertFalse(shed.admitted)
+        self.metrics.record_admission.assert_called_once_with("CA3", SHED, 0.0)
+
+        self.controller.release(first)
+        self.assertEqual(self.controller.admit("CA3").mode, FULL)
+        self.controller.release(second)
+
+    def test_slow_turns_degrade_to_shorter_prompts(self):
+        admission = self.controller.admit("CA1")
+        self.clock.now += 2.5
+        self.controller.release(admission)
+        self.assertAlmostEqual(self.controller.expected_latency(), 2.5)
+
+        degraded = self.controller.admit("CA1")
+        self.assertEqual(degraded.mode, REDUCED)
+        self.assertEqual(degraded.max_prompt_tokens, 300)
+        self.assertEqual(self.controller.stats[REDUCED], 1)
+
+    def test_long_running_turns_raise_the_expected_latency(self):
+        self.controller.admit("CA1")
+        self.clock.now += 3.0
+        self.assertEqual(self.controller.admit("CA2").mode, REDUCED)
+
+    def test_repeatedly_shed_callers_are_offered_a_transfer(self):
+        self.controller.admit("CA1")
+        self.controller.admit("CA2")
+        self.assertEqual(self.controller.admit("CA3").mode, SHED)
+        self.assertEqual(self.controller.admit("CA3").mode, TRANSFER)
+        self.controller.end_call("CA3")
+        self.assertEqual(self.controller.admit("CA3").mode, SHED)
+
+    def test_no_transfer_without_a_number(self):
+        controller = AdmissionController(max_concurrent_turns=0, max_queue_wait=0.0,
+                                         transfer_after_shed=1, transfer_number=None)
+        self.assertEqual(controller.admit("CA1").mode, SHED)
+
+    def test_queued_turn_is_admitted_when_a_slot_frees(self):
+        controller = AdmissionController(max_concurrent_turns=1, max_queue_wait=5.0, latency_slo=10.0)
+        running = controller.admit("CA1")
+        threading.Timer(0.05, controller.release, args=[running]).start()
+        admission = controller.admit("CA2")
+        self.assertEqual(admission.mode, FULL)
+        self.assertGreater(admission.queue_wait, 0.0)
+
+    def test_fallback_prefers_cached_answers(self):
+        self.controller.cache_response("How much does it cost?", "Plans start at $10 a month.")
+        self.assertEqual(self.controller.fallback_response('pricing', "how much does it cost"),
+                         "Plans start at $10 a month.")
+        self.assertEqual(self.controller.fallback_response('pricing', "Is there a discount?"),
+                         LocalProvider.RESPONSES['pricing'])
+        self.assertEqual(self.controller.stats['cache_hits'], 1)
+
+class TestResponseCache(unittest.TestCase):
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ResponseCache(max_size=2)
+        cache.put("one", "1")
+        cache.put("two", "2")
+        cache.get("one")
+        cache.put("three", "3")
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("two"))
+        self.assertEqual(cache.get("One!"), "1")
+
+class TestShortenedPrompt(unittest.TestCase):
+    def test_reduced_budget_drops_recent_turns_without_folding(self):
+        builder = PromptBuilder("You are a support agent.", max_prompt_tokens=2000, recent_turns=10)
+        history = []
+        for i in range(4):
+            history.append({"role": "user", "content": f"Question number {i} about my account settings"})
+            history.append({"role": "assistant", "content": f"Answer number {i} about your account settings"})
+
+        full = builder.build(history, "One more question")
+        short = builder.build(history, "One more question", max_prompt_tokens=60)
+        self.assertEqual(len(full), len(history) + 2)
+        self.assertLessEqual(builder.count_tokens(short), 60)
+        self.assertEqual(short[0], full[0])
+        self.assertEqual(short[-1], full[-1])
+        self.assertEqual(short[-2], history[-1])
+        self.assertEqual(builder.folded_turns, 0)
+
+class TestOverloadedWebhook(unittest.TestCase):
+    def setUp(self):
+        use_temporary_workdir(self)
+
+    def test_shed_turn_answers_from_template_then_transfers(self):
+        import app
+        services = app.AppServices()
+        with fake_providers(ProviderProfile(openai_latency=LatencyModel(mean=0.0, distribution='constant'))):
+            services._instances['admission_controller'] = AdmissionController(
+                max_concurrent_turns=0, max_queue_wait=0.0, transfer_after_shed=2, transfer_number="+15550100",
+                call_metrics=MagicMock()
+            )
+            client = app.create_app(services, warm_up=False).test_client()
+
+            response = client.post('/process_speech', data={'CallSid': 'CA1', 'SpeechResult': 'What does it cost'})
+            self.assertIn(b'I can help with pricing', response.data)
+            self.assertEqual(services.ai_agent('CA1').conversation_history[-1]['content'],
+                             LocalProvider.RESPONSES['pricing'])
+
+            # The transfer is offered and dialed in the webhook's own response, not over REST
+            response = client.post('/process_speech', data={'CallSid': 'CA1', 'SpeechResult': 'Hello?'})
+            self.assertIn(b'action="/transfer_choice"', response.data)
+            self.assertIn(b'transfer you.</Say><Dial>+15550100</Dial>', response.data)
+            self.assertEqual(services.call_handler.client.calls_by_sid, {})
+
+            response = client.post('/transfer_choice', data={'CallSid': 'CA1', 'Digits': '2'})
+            self.assertIn(b"let's keep going", response.data)
+            self.assertNotIn('CA1', services.admission_controller.consecutive_shed)
+            response = client.post('/transfer_choice', data={'CallSid': 'CA1', 'SpeechResult': 'yes please'})
+            self.assertIn(b'<Dial>+15550100</Dial>', response.data)
+
+            response = client.post('/transfer/+15550100', data={'CallSid': 'CA1'},
+                                   headers={'X-Twilio-Signature': self.sign(services, '/transfer/+15550100')})
+            self.assertIn(b'<Dial>+15550100</Dial>', response.data)
+
+    def sign(self, services, path, params=None):
+        from twilio.request_validator import RequestValidator
+        validator = RequestValidator('test-auth-token')
+        services._instances['request_validator'] = validator
+        return validator.compute_signature(f"http://localhost{path}", params or {'CallSid': 'CA1'})
+
+    def test_transfer_only_dials_the_support_line_for_twilio(self):
+        import app
+        services = app.AppServices()
+        services._instances['admission_controller'] = AdmissionController(
+            transfer_number="+15550100", call_metrics=MagicMock())
+        client = app.create_app(services, warm_up=False).test_client()
+
+        forged = client.post('/transfer/+19005550199', data={'CallSid': 'CA1'},
+                             headers={'X-Twilio-Signature': self.sign(services, '/transfer/+19005550199')})
+        self.assertEqual(forged.status_code, 403)
+        unsigned = client.post('/transfer/+15550100', data={'CallSid': 'CA1'})
+        self.assertEqual(unsigned.status_code, 403)
+        tampered = client.post('/transfer/+15550100', data={'CallSid': 'CA2'},
+                               headers={'X-Twilio-Signature': self.sign(services, '/transfer/+15550100')})
+        self.assertEqual(tampered.status_code, 403)
+
+        # Without TWILIO_AUTH_TOKEN no request can be verified
+        signature = self.sign(services, '/transfer/+15550100')
+        services._instances['request_validator'] = False
+        response = client.post('/transfer/+15550100', data={'CallSid': 'CA1'},
+                               headers={'X-Twilio-Signature': signature})
+        self.assertEqual(response.status_code, 403)
+
+    def test_answers_built_on_call_history_are_not_cached(self):
+        import app
+        services = app.AppServices()
+        with fake_providers():
+            controller = AdmissionController(call_metrics=MagicMock())
+            services._instances['admission_controller'] = controller
+            client = app.create_app(services, warm_up=False).test_client()
+            client.post('/process_speech', data={'CallSid': 'CA1', 'SpeechResult': 'My account number is 5551234'})
+            client.post('/process_speech', data={'CallSid': 'CA1', 'SpeechResult': 'What is my balance'})
+            client.post('/process_speech', data={'CallSid': 'CA2', 'SpeechResult': 'What does it cost'})
+
+        self.assertIsNotNone(controller.response_cache.get('My account number is 5551234'))
+        self.assertIsNotNone(controller.response_cache.get('What does it cost'))
+        self.assertIsNone(controller.response_cache.get('What is my balance'))
+        self.assertEqual(controller.fallback_response('account_support', 'What is my balance'),
+                         LocalProvider.RESPONSES['account_support'])
+
+if __name__ == '__main__':
+    unittest.main()
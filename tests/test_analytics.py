@@ -0,0 +1,207 @@
+import unittest
+import sys
+import os
+import csv
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from analytics import AnalyticsJob, iter_json_array, new_stat, add_sample, stat_percentile
+from support import use_temporary_workdir
+
+def write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+def read_csv(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+def conversation(*utterances):
+    messages = []
+    for utterance in utterances:
+        messages.append({"role": "user", "content": utterance})
+        messages.append({"role": "assistant", "content": "Sure, let me help with that."})
+    return messages
+
+def metric(name, value, **tags):
+    return {'name': name, 'value': value, 'timestamp': 1700000000.0, 'tags': tags}
+
+class TestStreaming(unittest.TestCase):
+    def test_items_split_across_chunks(self):
+        items = [12345, {"text": "commas, [brackets] and \"quotes\""}, [1, 2.5], "x" * 50, None, 7]
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(items, f, indent=1)
+        try:
+            for chunk_size in (1, 3, 7, 4096):
+                self.assertEqual(list(iter_json_array(f.name, chunk_size=chunk_size)), items)
+        finally:
+            os.unlink(f.name)
+
+    def test_truncated_file_raises(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            f.write('[{"name": "call_duration"}, {"name": "err')
+        try:
+            with self.assertRaises(ValueError):
+                list(iter_json_array(f.name, chunk_size=8))
+        finally:
+            os.unlink(f.name)
+
+    def test_histogram_percentiles(self):
+        stat = new_stat()
+        for value in range(1, 101):
+            add_sample(stat, value / 100)
+        self.assertAlmostEqual(stat_percentile(stat, 50), 0.5, delta=0.05)
+        self.assertAlmostEqual(stat_percentile(stat, 95), 0.95, delta=0.1)
+        self.assertEqual(stat_percentile(new_stat(), 95), 0.0)
+
+class TestAnalyticsJob(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.conversations = os.path.join(self.workdir.name, 'conversations')
+        self.metrics = os.path.join(self.workdir.name, 'metrics')
+        self.output = os.path.join(self.workdir.name, 'analytics')
+        os.makedirs(self.conversations)
+        os.makedirs(self.metrics)
+
+        write_json(os.path.join(self.conversations, 'CA1.json'),
+                   conversation("How much does the premium plan cost?", "I also see an error"))
+        write_json(os.path.join(self.conversations, 'CA2.json'), conversation("I forgot my password"))
+        write_json(os.path.join(self.metrics, 'metrics_20261018.json'), [
+            metric('call_duration', 120.0, call_id='CA1'),
+            metric('call_duration', 60.0, call_id='CA2'),
+            metric('llm_request_time', 0.4, route='pricing', provider='gpt-3.5-turbo', tokens='150', cost='0.000200'),
+            metric('llm_request_time', 0.6, route='pricing', provider='gpt-3.5-turbo', tokens='250', cost='0.000300'),
+            metric('turns_shed', 1, call_id='CA1', mode='shed', queue_wait='0.000'),
+        ])
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def make_job(self, workers=0):
+        return AnalyticsJob(self.conversations, self.metrics, self.output, workers=workers)
+
+    def test_rollups(self):
+        result = self.make_job(workers=1).run()
+        self.assertEqual((result['processed'], result['failed']), (3, []))
+
+        intents = {row['category']: row for row in read_csv(os.path.join(self.output, 'intents.csv'))}
+        self.assertEqual(intents['pricing']['calls'], '1')
+        self.assertEqual(intents['account_support']['calls'], '1')
+        self.assertEqual(intents['technical_support']['calls'], '0')
+        self.assertEqual(intents['technical_support']['user_turns'], '1')
+
+        handle_time = read_csv(os.path.join(self.output, 'handle_time.csv'))[0]
+        self.assertEqual(handle_time['count'], '2')
+        self.assertAlmostEqual(float(handle_time['mean_seconds']), 90.0)
+
+        latency = read_csv(os.path.join(self.output, 'llm_latency.csv'))[0]
+        self.assertEqual((latency['route'], latency['count'], latency['tokens']), ('pricing', '2', '400'))
+        self.assertAlmostEqual(float(latency['mean_seconds']), 0.5)
+
+        counts = {row['metric']: row['count'] for row in read_csv(os.path.join(self.output, 'metric_counts.csv'))}
+        self.assertEqual(counts['turns_shed'], '1')
+
+        summary = np.load(os.path.join(self.output, 'summary.npz'))
+        self.assertEqual(list(summary['llm_routes']), ['pricing'])
+        self.assertEqual(summary['llm_latency_histograms'].sum(), 2)
+        self.assertEqual(summary['handle_time_histogram'].sum(), 2)
+
+    def test_rerun_only_processes_new_and_changed_files(self):
+        job = self.make_job()
+        job.run()
+        self.assertEqual(job.run()['processed'], 0)
+
+        write_json(os.path.join(self.conversations, 'CA3.json'), conversation("What does it cost?"))
+        metrics_file = os.path.join(self.metrics, 'metrics_20261018.json')
+        with open(metrics_file) as f:
+            metrics = json.load(f)
+        write_json(metrics_file, metrics + [metric('call_duration', 30.0, call_id='CA3')])
+
+        result = job.run()
+        self.assertEqual((result['processed'], result['skipped']), (2, 2))
+        self.assertEqual(result['totals']['conversations']['calls'], 3)
+        self.assertEqual(result['totals']['intents']['pricing']['calls'], 2)
+        # The changed metrics file replaces its earlier rollup rather than adding to it
+        self.assertEqual(result['totals']['handle_time']['count'], 3)
+
+        self.assertEqual(job.run(full=True)['processed'], 4)
+
+    def test_changed_conversation_rebuilds_its_day(self):
+        noon = 1792324800 * 10 ** 9  # 2026-10-18
+        for name in ('CA1.json', 'CA2.json'):
+            os.utime(os.path.join(self.conversations, name), ns=(noon, noon))
+        job = self.make_job()
+        job.run()
+
+        ca1 = os.path.join(self.conversations, 'CA1.json')
+        write_json(ca1, conversation("I forgot my password", "Still locked out"))
+        os.utime(ca1, ns=(noon + 10 ** 9, noon + 10 ** 9))
+        result = job.run()
+        # CA2 is read again to rebuild the day; the metrics file is not
+        self.assertEqual((result['processed'], result['skipped']), (2, 1))
+        self.assertEqual(result['totals']['conversations']['calls'], 2)
+        self.assertEqual(result['totals']['intents']['account_support']['calls'], 2)
+        self.assertNotIn('pricing', {c for c, counts in result['totals']['intents'].items() if counts['calls']})
+
+        with open(os.path.join(self.output, 'state.json')) as f:
+            state = json.load(f)
+        self.assertEqual(sorted(state['partials']), ['conversation:20261018', 'metrics:20261018'])
+        self.assertTrue(all('rollup' not in entry for entry in state['files'].values()))
+
+    def test_json_lines_metrics(self):
+        with open(os.path.join(self.metrics, 'metrics_20261019.jsonl'), 'w') as f:
+            for record in (metric('call_duration', 30.0, call_id='CA3'), metric('error_count', 1, call_id='CA3')):
+                f.write(json.dumps(record) + '\n')
+            f.write('{"name": "call_dura')
+        result = self.make_job().run()
+        self.assertEqual((result['processed'], result['failed']), (4, []))
+        self.assertEqual(result['totals']['handle_time']['count'], 3)
+        self.assertEqual(result['totals']['metric_counts']['error_count'], 1)
+
+    def test_unreadable_files_are_retried(self):
+        broken = os.path.join(self.metrics, 'metrics_20261019.json')
+        with open(broken, 'w') as f:
+            f.write('[{"name": "call_duration", "value": 1')
+        job = self.make_job()
+        self.assertEqual(job.run()['failed'], [broken])
+
+        write_json(broken, [metric('call_duration', 1.0, call_id='CA9')])
+        result = job.run()
+        self.assertEqual((result['processed'], result['failed']), (1, []))
+        self.assertEqual(result['totals']['handle_time']['count'], 3)
+
+class TestWebhookToAnalytics(unittest.TestCase):
+    def setUp(self):
+        use_temporary_workdir(self)
+
+    def test_finished_calls_feed_the_rollups(self):
+        from benchmarks.fakes import fake_providers
+        import app
+        calls = {'CA1': ("How much does the premium plan cost?", '95'),
+                 'CA2': ("I forgot my password", '45')}
+        with fake_providers():
+            client = app.create_app(app.AppServices(), warm_up=False).test_client()
+            for call_sid, (question, duration) in calls.items():
+                client.post('/incoming_call', data={'CallSid': call_sid})
+                client.post('/process_speech', data={'CallSid': call_sid, 'SpeechResult': question})
+                client.post('/hangup', data={'CallSid': call_sid, 'CallStatus': 'completed',
+                                             'CallDuration': duration})
+            # Hung up during the greeting: a duration but no conversation
+            client.post('/incoming_call', data={'CallSid': 'CA3'})
+            client.post('/hangup', data={'CallSid': 'CA3', 'CallStatus': 'completed', 'CallDuration': '4'})
+
+        self.assertEqual(sorted(os.listdir('conversations')), ['CA1.json', 'CA2.json'])
+        result = AnalyticsJob(workers=0).run()
+        self.assertEqual(result['failed'], [])
+
+        intents = {row['category']: row for row in read_csv(os.path.join('analytics', 'intents.csv'))}
+        self.assertEqual(intents['pricing']['calls'], '1')
+        self.assertEqual(intents['account_support']['calls'], '1')
+        handle_time = read_csv(os.path.join('analytics', 'handle_time.csv'))[0]
+        self.assertEqual(handle_time['count'], '3')
+        self.assertAlmostEqual(float(handle_time['mean_seconds']), 48.0)
+
+if __name__ == '__main__':
+    unittest.main()
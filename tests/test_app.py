@@ -0,0 +1,108 @@
+import unittest
+import sys
+import os
+import subprocess
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import ProviderProfile, fake_providers
+from support import use_temporary_workdir
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestColdStart(unittest.TestCase):
+    def test_import_has_no_heavy_imports_or_side_effects(self):
+        probe = (
+            "import sys, os, app\n"
+            "heavy = ['openai', 'google.cloud.speech', 'google.cloud.texttospeech', 'twilio.rest', 'numpy']\n"
+            "print(sorted(m for m in heavy if m in sys.modules))\n"
+            "print(sorted(os.listdir('.')))\n"
+        )
+        with tempfile.TemporaryDirectory() as workdir:
+            output = subprocess.run(
+                [sys.executable, '-c', probe], cwd=workdir, capture_output=True, text=True, check=True,
+                env=dict(os.environ, PYTHONPATH=REPO_ROOT)
+            ).stdout.splitlines()
+        self.assertEqual(output, ['[]', '[]'])
+
+class TestCreateApp(unittest.TestCase):
+    def setUp(self):
+        use_temporary_workdir(self)
+
+    def test_services_are_built_on_first_request(self):
+        import app
+        services = app.AppServices()
+        with fake_providers():
+            client = app.create_app(services, warm_up=False).test_client()
+            self.assertEqual(services._instances, {})
+
+            response = client.post('/incoming_call', data={'CallSid': 'CA1'})
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'<Gather', response.data)
+            self.assertNotIn('llm_router', services._instances)
+
+            response = client.post('/process_speech', data={'CallSid': 'CA1', 'SpeechResult': 'What does it cost'})
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('llm_router', services._instances)
+
+            response = client.post('/hangup', data={'CallSid': 'CA1'})
+            self.assertIn(b'<Hangup />', response.data)
+
+    def test_interleaved_calls_keep_separate_conversations(self):
+        import app
+        services = app.AppServices()
+        with fake_providers(ProviderProfile(request_log_size=20)) as profile:
+            client = app.create_app(services, warm_up=False).test_client()
+            for call_sid in ('CA1', 'CA2'):
+                client.post('/incoming_call', data={'CallSid': call_sid})
+            client.post('/process_speech', data={
+                'CallSid': 'CA1', 'SpeechResult': 'My password is hunter2 and my account number is 5551234'})
+            seen = len(profile.chat_completion.requests)
+            client.post('/process_speech', data={'CallSid': 'CA2', 'SpeechResult': 'What does it cost'})
+
+            ca2_prompts = str(list(profile.chat_completion.requests)[seen:])
+            self.assertIn('What does it cost', ca2_prompts)
+            self.assertNotIn('hunter2', ca2_prompts)
+            self.assertEqual(len(services.ai_agent('CA1').conversation_history), 2)
+            self.assertEqual(len(services.ai_agent('CA2').conversation_history), 2)
+
+            client.post('/hangup', data={'CallSid': 'CA1'})
+            self.assertNotIn('CA1', services._agents)
+            self.assertIn('CA2', services._agents)
+
+    def test_idle_calls_are_dropped_from_every_engine(self):
+        import app
+        services = app.AppServices()
+        with fake_providers():
+            client = app.create_app(services, warm_up=False).test_client()
+            client.post('/incoming_call', data={'CallSid': 'CA1'})
+            client.post('/process_speech', data={'CallSid': 'CA1', 'SpeechResult': 'What does it cost'})
+            services.admission_controller.consecutive_shed['CA1'] = 1
+            services.speculative_responder.on_partial_transcript('CA1', 'and the premium plan')
+            self.assertIn('CA1', services.turn_taking.calls)
+
+            # CA1's hangup callback never arrives; the next new call clears it out
+            services._call_last_seen['CA1'] -= app.MAX_CALL_DURATION + 1
+            client.post('/incoming_call', data={'CallSid': 'CA2'})
+            self.assertNotIn('CA1', services._agents)
+            self.assertNotIn('CA1', services.turn_taking.calls)
+            self.assertNotIn('CA1', services.admission_controller.consecutive_shed)
+            self.assertNotIn('CA1', services.speculative_responder.speculations)
+            self.assertIn('CA2', services.turn_taking.calls)
+
+            client.post('/hangup', data={'CallSid': 'CA2', 'CallStatus': 'completed'})
+            self.assertNotIn('CA2', services.turn_taking.calls)
+            self.assertEqual(services._call_last_seen, {})
+
+    def test_warm_up_builds_every_service(self):
+        import app
+        services = app.AppServices()
+        with fake_providers():
+            services.warm_up_in_background().join(timeout=30)
+            for name in ('speech_processor', 'call_handler', 'llm_router', 'turn_taking', 'twiml_renderer'):
+                self.assertIn(name, services._instances)
+            self.assertIsNotNone(services.speech_processor._speech_client)
+            self.assertIsNotNone(services.call_handler._client)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import LatencyModel, ProviderProfile, fake_providers
+from benchmarks.stats import percentile, summarize, find_regressions
+from support import use_temporary_workdir
+
+class TestLatencyModel(unittest.TestCase):
+    def test_constant_latency(self):
+        model = LatencyModel(mean=0.25, stddev=0.1, distribution='constant')
+        self.assertEqual(model.sample_latency(), 0.25)
+
+    def test_lognormal_latency_is_seeded(self):
+        first = LatencyModel(mean=0.2, stddev=0.05, seed=7)
+        second = LatencyModel(mean=0.2, stddev=0.05, seed=7)
+        samples = [first.sample_latency() for _ in range(5)]
+        self.assertEqual(samples, [second.sample_latency() for _ in range(5)])
+        self.assertTrue(all(sample > 0 for sample in samples))
+
+    def test_error_rate(self):
+        self.assertTrue(LatencyModel(error_rate=1.0).should_fail())
+        self.assertFalse(LatencyModel(error_rate=0.0).should_fail())
+        with self.assertRaises(ValueError):
+            LatencyModel(error_rate=1.5)
+
+class TestStats(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertAlmostEqual(percentile(values, 50), 50.5)
+        self.assertAlmostEqual(percentile(values, 99), 99.01)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_summarize(self):
+        summary = summarize([0.1, 0.2, 0.3])
+        self.assertEqual(summary['count'], 3)
+        self.assertAlmostEqual(summary['p50'], 0.2)
+
+    def test_find_regressions(self):
+        baseline = {'load': {'turns_per_sec': 100.0, 'turn': {'p95': 0.1}}}
+        report = {'load': {'turns_per_sec': 70.0, 'turn': {'p95': 0.15}}}
+        regressions = find_regressions(report, baseline, tolerance=0.2)
+        self.assertEqual(len(regressions), 2)
+        self.assertEqual(find_regressions(baseline, baseline), [])
+
+class TestFakeProviders(unittest.TestCase):
+    def test_agent_runs_offline(self):
+        with fake_providers():
+            from ai_agent import AIAgent
+            agent = AIAgent()
+            intent = agent.analyze_intent("I forgot my account password")
+            self.assertEqual(intent['category'], 'account_support')
+            self.assertIsInstance(agent.generate_response(intent), str)
+
+    def test_call_handler_runs_offline(self):
+        with fake_providers():
+            from call_handler import CallHandler
+            handler = CallHandler()
+            call_sid = handler.start_call('+15550000001', '+15550000002')
+            self.assertEqual(handler.get_call_status(call_sid)['status'], 'queued')
+            self.assertTrue(handler.end_call(call_sid))
+
+    def test_simulated_outage(self):
+        profile = ProviderProfile(openai_latency=LatencyModel(error_rate=1.0))
+        with fake_providers(profile):
+            from ai_agent import AIAgent
+            from llm_router import LLMRouter
+            from error_handler import AIProcessingError
+            with self.assertRaises(AIProcessingError):
+                AIAgent(LLMRouter(local_fallback=False)).analyze_intent("hello")
+
+    def test_chat_completion_counts_concurrent_requests(self):
+        import threading
+        import openai
+        with fake_providers(ProviderProfile(request_log_size=5)) as profile:
+            def send():
+                for _ in range(200):
+                    openai.ChatCompletion.create(model='gpt-3.5-turbo', messages=[{'role': 'user', 'content': 'hi'}])
+
+            threads = [threading.Thread(target=send) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        chat_completion = profile.chat_completion
+        self.assertEqual(chat_completion.call_count, 1600)
+        self.assertEqual(chat_completion.calls_by_model, {'gpt-3.5-turbo': 1600})
+        self.assertEqual(len(chat_completion.requests), 5)
+
+class TestWebhookLoadGenerator(unittest.TestCase):
+    def setUp(self):
+        use_temporary_workdir(self)
+
+    def test_run_reports_every_turn(self):
+        with fake_providers():
+            from benchmarks.load_generator import WebhookLoadGenerator, load_app
+            report = WebhookLoadGenerator(load_app(), concurrent_calls=3, turns_per_call=2).run()
+        self.assertEqual(report['errors'], 0)
+        self.assertEqual(report['turn']['count'], 6)
+        self.assertEqual(report['endpoints']['/incoming_call']['count'], 3)
+        self.assertEqual(report['endpoints']['/hangup']['count'], 3)
+        self.assertGreater(report['turns_per_sec'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import unittest
+import sys
+import os
+import warnings
+from unittest import mock
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cpu_executor import (
+    CPUExecutor, SharedAudioBuffer, converted_size, convert_audio_bytes, redact_pii, index_transcript
+)
+from turn_taking import decode_mulaw
+from utils import AudioUtils, SecurityUtils, ConversationUtils
+from benchmarks.cpu_offload import synthesize_call_audio, measure_cpu_scaling
+
+CONVERSATION = [
+    {"role": "user", "content": "My password reset email never arrived"},
+    {"role": "assistant", "content": "I can resend the password reset link."},
+]
+
+class TestTasks(unittest.TestCase):
+    def test_redact_pii(self):
+        text = ("Card 4111 1111 1111 1111, SSN 123-45-6789, "
+                "phone (555) 010-2233, email caller@example.com")
+        self.assertEqual(redact_pii(text), "Card ****-****-****-****, SSN ***-**-****, "
+                                           "phone ***-***-****, email ****@****.***")
+
+    def test_index_transcript(self):
+        index = index_transcript(CONVERSATION)
+        self.assertEqual(index['password'], [0, 1])
+        self.assertEqual(index['resend'], [1])
+        self.assertNotIn('the', index)
+
+# audioop.lin2ulaw output for samples where rounding of negative values and segment edges matter
+MULAW_REFERENCE = [
+    (0, 255), (3, 255), (4, 254), (124, 239), (8316, 159), (32124, 128), (32767, 128),
+    (-1, 126), (-4, 126), (-5, 126), (-19, 124), (-105, 113), (-250, 103), (-443, 93), (-793, 82),
+    (-1338, 72), (-2043, 62), (-3449, 51), (-5498, 41), (-8059, 31), (-13689, 20), (-21370, 10),
+    (-31611, 0), (-32124, 0), (-32768, 0),
+]
+
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        import audioop
+except ImportError:
+    # Removed from the standard library in Python 3.13
+    audioop = None
+
+class TestMulawEncoding(unittest.TestCase):
+    def test_reference_table(self):
+        samples = np.array([sample for sample, _ in MULAW_REFERENCE], dtype='<i2')
+        encoded = convert_audio_bytes(samples.tobytes(), 'pcm16', 'mulaw')
+        self.assertEqual(list(encoded), [code for _, code in MULAW_REFERENCE])
+
+    @unittest.skipIf(audioop is None, "audioop is not available")
+    def test_matches_audioop_for_every_sample(self):
+        samples = np.arange(-32768, 32768, dtype='<i2').tobytes()
+        self.assertEqual(convert_audio_bytes(samples, 'pcm16', 'mulaw'), audioop.lin2ulaw(samples, 2))
+
+class TestCPUExecutor(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = CPUExecutor(max_workers=1)
+        cls.executor.warm_up()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+
+    def test_audio_round_trips_through_shared_memory(self):
+        pcm = synthesize_call_audio(1.0)
+        mulaw = AudioUtils.convert_audio_format(pcm, 'pcm16', 'mulaw', executor=self.executor)
+        self.assertEqual(len(mulaw), len(pcm) // 2)
+        decoded = AudioUtils.convert_audio_format(mulaw, 'mulaw', 'pcm16', executor=self.executor)
+        self.assertEqual(decoded, decode_mulaw(mulaw).astype('<i2').tobytes())
+        self.assertEqual(mulaw, AudioUtils.convert_audio_format(pcm, 'pcm16', 'mulaw'))
+
+        original = np.frombuffer(pcm, dtype='<i2').astype(np.int32)
+        error = np.abs(np.frombuffer(decoded, dtype='<i2').astype(np.int32) - original)
+        # mu-law keeps the error within about 5% of the sample's magnitude; G.711 drops the two
+        # lowest bits first, which costs negative samples up to one more step
+        self.assertTrue(np.all(error <= np.maximum(np.abs(original) * 0.051, 12)))
+
+    def test_detect_silence(self):
+        silence = np.random.default_rng(0).normal(0, 30, 8000).astype('<i2').tobytes()
+        self.assertTrue(AudioUtils.detect_silence(silence, executor=self.executor))
+        self.assertFalse(AudioUtils.detect_silence(synthesize_call_audio(1.0), executor=self.executor))
+
+    def test_utils_match_inline_results(self):
+        text = "Reach me at caller@example.com"
+        self.assertEqual(SecurityUtils.mask_sensitive_data(text, executor=self.executor),
+                         SecurityUtils.mask_sensitive_data(text))
+        self.assertEqual(ConversationUtils.index_transcript(CONVERSATION, executor=self.executor),
+                         ConversationUtils.index_transcript(CONVERSATION))
+
+    def test_tasks_are_timed(self):
+        result = self.executor.submit('redact_pii', "SSN 123-45-6789").result(timeout=10)
+        self.assertEqual(result.value, "SSN ***-**-****")
+        self.assertNotEqual(result.timing.worker_pid, os.getpid())
+        self.assertGreaterEqual(result.timing.run_seconds, 0.0)
+        self.assertGreaterEqual(self.executor.get_stats()['redact_pii']['count'], 1)
+
+    def test_unknown_task(self):
+        with self.assertRaises(ValueError):
+            self.executor.submit('format_disk')
+
+class TestInlineExecutor(unittest.TestCase):
+    def test_zero_workers_run_in_the_calling_process(self):
+        executor = CPUExecutor(max_workers=0)
+        result = executor.submit('index_transcript', CONVERSATION).result()
+        self.assertEqual(result.timing.worker_pid, os.getpid())
+        self.assertIsNone(executor._pool)
+
+    def test_inline_audio_skips_shared_memory(self):
+        pcm = synthesize_call_audio(1.0)
+        with mock.patch('utils.SharedAudioBuffer') as shared_buffer:
+            mulaw = AudioUtils.convert_audio_format(pcm, 'pcm16', 'mulaw')
+            self.assertFalse(AudioUtils.detect_silence(pcm))
+        shared_buffer.assert_not_called()
+        self.assertEqual(AudioUtils.convert_audio_format(mulaw, 'mulaw', 'pcm16'),
+                         decode_mulaw(mulaw).astype('<i2').tobytes())
+
+    def test_unsupported_audio_format(self):
+        self.assertIsNone(AudioUtils.convert_audio_format(b'\x00\x01', 'pcm16', 'opus'))
+        self.assertIsNone(AudioUtils.convert_audio_format(b'\x00\x01', 'opus', 'pcm16'))
+        with self.assertRaises(ValueError):
+            converted_size(2, 'pcm16', 'opus')
+
+    def test_shared_buffer_holds_empty_audio(self):
+        with SharedAudioBuffer.from_bytes(b'') as buffer:
+            self.assertEqual(buffer.tobytes(), b'')
+
+class TestCPUScalingBenchmark(unittest.TestCase):
+    def test_reports_throughput_per_pool_size(self):
+        report = measure_cpu_scaling(calls=2, audio_seconds=1.0, transcript_turns=10, worker_counts=[1])
+        self.assertGreater(report['inline']['tasks_per_sec'], 0)
+        self.assertEqual(report['pool']['workers_1']['count'], 8)
+        self.assertIn('speedup', report['pool']['workers_1'])
+
+if __name__ == '__main__':
+    unittest.main()
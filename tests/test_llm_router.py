@@ -0,0 +1,151 @@
+import unittest
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_router import LLMRouter, LLMProvider, LLMResponse, LocalProvider, OpenAIProvider
+from error_handler import AIProcessingError
+from benchmarks.fakes import LatencyModel, ProviderProfile, fake_providers
+
+MESSAGES = [{"role": "user", "content": "How much is the premium plan?"}]
+
+class StubProvider(LLMProvider):
+    def __init__(self, name, fail=False, prompt_cost=0.001, completion_cost=0.002, delay=0.0):
+        self.name = name
+        self.fail = fail
+        self.delay = delay
+        self.prompt_cost = prompt_cost
+        self.completion_cost = completion_cost
+        self.calls = 0
+        self.timeouts = []
+
+    def complete(self, messages, route, timeout=None):
+        self.calls += 1
+        self.timeouts.append(timeout)
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("provider down")
+        return LLMResponse(f"{self.name} answer", self.name, route, prompt_tokens=100, completion_tokens=50)
+
+TIERS = {
+    'fast': {'models': ['cheap', 'spare'], 'strategy': 'fastest', 'latency_budget': 1.0},
+    'strong': {'models': ['smart', 'cheap'], 'strategy': 'preferred', 'latency_budget': 5.0},
+}
+ROUTES = {'intent': 'fast', 'pricing': 'fast', 'technical_support': 'strong'}
+
+class TestLLMRouter(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+
+    def make_router(self, **overrides):
+        self.providers = {
+            'cheap': StubProvider('cheap'),
+            'spare': StubProvider('spare'),
+            'smart': StubProvider('smart', prompt_cost=0.03, completion_cost=0.06),
+        }
+        for name, provider in overrides.items():
+            self.providers[name] = provider
+        return LLMRouter(providers=self.providers, tiers=TIERS, routes=ROUTES, offline=False,
+                         clock=lambda: self.now)
+
+    def test_routes_by_intent_category(self):
+        router = self.make_router()
+        self.assertEqual(router.complete(MESSAGES, 'pricing').provider, 'cheap')
+        self.assertEqual(router.complete(MESSAGES, 'technical_support').provider, 'smart')
+
+    def test_fastest_strategy_uses_measured_latency(self):
+        router = self.make_router()
+        for _ in range(5):
+            router.health['cheap'].record(0.9, True)
+            router.health['spare'].record(0.2, True)
+        self.assertEqual(router.candidates('pricing')[0].name, 'spare')
+
+    def test_failover_and_accounting(self):
+        router = self.make_router(smart=StubProvider('smart', fail=True))
+        response = router.complete(MESSAGES, 'technical_support')
+        self.assertEqual(response.provider, 'cheap')
+        self.assertAlmostEqual(response.cost, (100 * 0.001 + 50 * 0.002) / 1000)
+
+        usage = router.get_usage()['routes']['technical_support']
+        self.assertEqual(usage['smart']['failures'], 1)
+        self.assertEqual(usage['cheap']['prompt_tokens'], 100)
+        self.assertEqual(usage['cheap']['completion_tokens'], 50)
+
+    def test_unhealthy_provider_is_demoted(self):
+        router = self.make_router(smart=StubProvider('smart', fail=True))
+        for _ in range(5):
+            router.complete(MESSAGES, 'technical_support')
+        self.assertEqual(router.candidates('technical_support')[0].name, 'cheap')
+        self.assertEqual(self.providers['smart'].calls, 5)
+
+    def test_slow_provider_is_demoted(self):
+        router = self.make_router()
+        router.health['smart'].record(8.0, True)
+        self.assertEqual(router.candidates('technical_support')[0].name, 'cheap')
+
+    def test_demoted_provider_is_retried_once_its_failures_expire(self):
+        router = self.make_router(smart=StubProvider('smart', fail=True))
+        for _ in range(5):
+            router.complete(MESSAGES, 'technical_support')
+        self.providers['smart'].fail = False
+        for _ in range(10):
+            router.complete(MESSAGES, 'technical_support')
+        self.assertEqual(self.providers['smart'].calls, 5)
+
+        self.now += 61.0
+        self.assertEqual(router.complete(MESSAGES, 'technical_support').provider, 'smart')
+        self.assertEqual(router.candidates('technical_support')[0].name, 'smart')
+
+    def test_budget_is_a_deadline_across_failover(self):
+        providers = {'slow': StubProvider('slow', fail=True, delay=0.15), 'spare': StubProvider('spare', fail=True)}
+        router = LLMRouter(providers=providers, tiers={'fast': {'models': ['slow', 'spare'], 'latency_budget': 0.2}},
+                           routes={}, offline=False)
+        self.assertEqual(router.complete(MESSAGES, 'pricing').provider, 'local')
+        self.assertAlmostEqual(providers['slow'].timeouts[0], 0.2, delta=0.01)
+        self.assertLess(providers['spare'].timeouts[0], 0.06)
+
+        providers['slow'].delay = 0.25
+        router.complete(MESSAGES, 'pricing')
+        # Nothing was left of the budget for the second model; the local templates still answer
+        self.assertEqual(providers['spare'].calls, 1)
+
+    def test_requests_are_bounded_by_the_tier_budget(self):
+        router = self.make_router()
+        router.complete(MESSAGES, 'pricing')
+        router.complete(MESSAGES, 'technical_support')
+        self.assertEqual(self.providers['cheap'].timeouts, [1.0])
+        self.assertEqual(self.providers['smart'].timeouts, [5.0])
+
+    def test_slow_model_times_out_within_budget(self):
+        profile = ProviderProfile(model_latencies={'slow': LatencyModel(mean=2.0, distribution='constant')})
+        router = LLMRouter(providers={'slow': OpenAIProvider('slow')},
+                           tiers={'fast': {'models': ['slow'], 'latency_budget': 0.1}},
+                           routes={}, offline=False)
+        with fake_providers(profile):
+            start = time.perf_counter()
+            response = router.complete(MESSAGES, 'technical_support')
+        self.assertEqual(response.provider, 'local')
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(router.get_usage()['routes']['technical_support']['slow']['failures'], 1)
+
+    def test_local_fallback(self):
+        router = self.make_router(cheap=StubProvider('cheap', fail=True), spare=StubProvider('spare', fail=True))
+        response = router.complete(MESSAGES, 'pricing')
+        self.assertEqual(response.provider, 'local')
+        self.assertEqual(response.content, LocalProvider.RESPONSES['pricing'])
+
+    def test_all_providers_failing(self):
+        router = LLMRouter(providers={'cheap': StubProvider('cheap', fail=True)},
+                           tiers={'fast': {'models': ['cheap']}}, routes={}, offline=False, local_fallback=False)
+        with self.assertRaises(AIProcessingError):
+            router.complete(MESSAGES, 'pricing')
+
+    def test_offline_mode(self):
+        router = LLMRouter(providers={}, tiers=TIERS, routes=ROUTES, offline=True)
+        response = router.complete(MESSAGES, 'intent')
+        self.assertEqual(response.provider, 'local')
+        self.assertEqual(response.content, MESSAGES[-1]['content'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,6 +7,7 @@ from speech_processor import SpeechProcessor
 from ai_agent import AIAgent
 from call_handler import CallHandler
 from utils import CallUtils, ConversationUtils, SecurityUtils
+from support import use_temporary_workdir
 
 class TestSpeechProcessor(unittest.TestCase):
     def setUp(self):
@@ -69,6 +70,7 @@ class TestUtils(unittest.TestCase):
         self.assertTrue(formatted.startswith('+'))
 
     def test_conversation_utils(self):
+        use_temporary_workdir(self)
         call_id = "test_call_id"
         conversation = [
             {"role": "user", "content": "Hello"},
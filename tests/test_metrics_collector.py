@@ -0,0 +1,40 @@
+import unittest
+import sys
+import os
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics_collector import MetricsCollector, CallMetrics
+from support import use_temporary_workdir
+
+class TestMetricsCollector(unittest.TestCase):
+    def setUp(self):
+        use_temporary_workdir(self)
+
+    def test_concurrent_records_are_all_kept(self):
+        call_metrics = CallMetrics()
+
+        def record(worker):
+            for i in range(20):
+                call_metrics.record_llm_request('pricing', 'gpt-3.5-turbo', 0.25, 150, 0.0002)
+                call_metrics.record_speculation(f"CA{worker}", 'committed', 0.1)
+
+        threads = [threading.Thread(target=record, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        collector = call_metrics.metrics_collector
+        self.assertEqual(len(collector.get_metrics('llm_request_time')), 160)
+        self.assertEqual(len(collector.get_metrics('speculation_time', tags={'call_id': 'CA3'})), 20)
+
+    def test_line_being_written_is_skipped(self):
+        collector = MetricsCollector()
+        collector.record_metric('call_duration', 30.0, tags={'call_id': 'CA1'})
+        with open(collector.metrics_file, 'a') as f:
+            f.write('{"name": "call_dur')
+        self.assertEqual([m['value'] for m in collector.get_metrics('call_duration')], [30.0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_builder import PromptBuilder, TokenCounter
+from benchmarks.fakes import fake_providers
+
+def make_history(turns):
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"Question number {i} about my account. Extra detail here."})
+        history.append({"role": "assistant", "content": f"Answer number {i} for your account."})
+    return history
+
+class TestTokenCounter(unittest.TestCase):
+    def test_count(self):
+        counter = TokenCounter()
+        self.assertEqual(counter.count(""), 0)
+        self.assertGreater(counter.count("Hello, how can I help you today?"), 5)
+        self.assertGreater(counter.count_messages([{"role": "user", "content": "hi"}]), counter.count("hi"))
+
+class TestPromptBuilder(unittest.TestCase):
+    def setUp(self):
+        self.builder = PromptBuilder("You are a support agent.", max_prompt_tokens=400,
+                                     recent_turns=4, summary_max_tokens=80)
+
+    def test_short_history_is_verbatim(self):
+        history = make_history(2)
+        messages = self.builder.build(history, "What now?")
+        self.assertEqual(messages[0]["content"], "You are a support agent.")
+        self.assertEqual(messages[1:-1], history)
+        self.assertEqual(messages[-1], {"role": "user", "content": "What now?"})
+
+    def test_older_turns_are_summarized(self):
+        history = make_history(5)
+        messages = self.builder.build(history, "What now?")
+        self.assertIn("Summary of the earlier conversation", messages[1]["content"])
+        self.assertIn("Caller: Question number 2", messages[1]["content"])
+        self.assertEqual(messages[2:-1], history[-4:])
+
+    def test_summary_is_incremental(self):
+        history = make_history(4)
+        self.builder.build(history, "next")
+        folded = self.builder.folded_turns
+        history += make_history(1)
+        self.builder.build(history, "next")
+        self.assertEqual(self.builder.folded_turns, folded + 2)
+
+    def test_prompt_tokens_stay_bounded(self):
+        history = []
+        for turns in range(1, 200):
+            history = make_history(turns)
+            messages = self.builder.build(history, "What should I do next?")
+            self.assertLessEqual(self.builder.count_tokens(messages), 400)
+        self.assertLessEqual(self.builder.summary_tokens, 80)
+
+    def test_reset_when_history_replaced(self):
+        self.builder.build(make_history(6), "next")
+        messages = self.builder.build(make_history(1), "next")
+        self.assertEqual(len(messages), 4)
+
+class TestAIAgentContext(unittest.TestCase):
+    def test_generate_response_includes_history(self):
+        with fake_providers():
+            from ai_agent import AIAgent
+            agent = AIAgent()
+            first = agent.analyze_intent("My password stopped working")
+            agent.generate_response(first)
+            second = agent.analyze_intent("I still cannot log in")
+            agent.generate_response(second)
+            self.assertEqual(len(agent.conversation_history), 4)
+            self.assertGreater(agent.last_prompt_tokens, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import unittest
+import sys
+import os
+import threading
+from unittest.mock import MagicMock
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import LatencyModel, ProviderProfile, fake_providers
+from speculative import SpeculativeResponder
+from admission_control import AdmissionController
+
+class TestSpeculativeResponder(unittest.TestCase):
+    def setUp(self):
+        profile = ProviderProfile(openai_latency=LatencyModel(mean=0.02, distribution='constant'))
+        self.providers = fake_providers(profile)
+        self.providers.__enter__()
+        from ai_agent import AIAgent
+        self.agent = AIAgent()
+        self.responder = SpeculativeResponder(lambda call_id: self.agent, min_words=3, match_threshold=0.9)
+
+    def tearDown(self):
+        self.responder.shutdown()
+        self.providers.__exit__(None, None, None)
+
+    def test_matching_draft_is_committed(self):
+        self.assertTrue(self.responder.on_partial_transcript("CA1", "I forgot my account password"))
+        intent, response = self.responder.resolve("CA1", "I forgot my account password.")
+        self.assertEqual(intent['category'], 'account_support')
+        self.assertEqual(intent['original_text'], "I forgot my account password.")
+        self.assertEqual(self.responder.stats['committed'], 1)
+        self.assertEqual(self.agent.conversation_history, [
+            {"role": "user", "content": "I forgot my account password."},
+            {"role": "assistant", "content": response}
+        ])
+
+    def test_mismatched_draft_is_regenerated(self):
+        self.responder.on_partial_transcript("CA1", "I forgot my account password")
+        intent, _ = self.responder.resolve("CA1", "How much does the premium plan cost")
+        self.assertEqual(intent['category'], 'pricing')
+        self.assertEqual(self.responder.stats['committed'], 0)
+        self.assertEqual(self.responder.stats['cancelled'], 1)
+        self.assertEqual(len(self.agent.conversation_history), 2)
+
+    def test_growing_partial_replaces_stale_draft(self):
+        self.responder.on_partial_transcript("CA1", "I need help with")
+        self.assertFalse(self.responder.on_partial_transcript("CA1", "I need help with"))
+        self.assertTrue(self.responder.on_partial_transcript("CA1", "I need help with the price of my plan"))
+        self.assertEqual(self.responder.stats['started'], 2)
+        self.assertEqual(self.responder.stats['cancelled'], 1)
+
+    def test_short_partials_are_ignored(self):
+        self.assertFalse(self.responder.on_partial_transcript("CA1", "Hi there"))
+        self.assertEqual(self.responder.stats['started'], 0)
+
+    def test_discard_on_hangup(self):
+        self.responder.on_partial_transcript("CA1", "I forgot my account password")
+        self.responder.discard("CA1")
+        self.assertNotIn("CA1", self.responder.speculations)
+        self.assertEqual(self.agent.conversation_history, [])
+
+    def test_queued_draft_is_regenerated_inline(self):
+        responder = SpeculativeResponder(lambda call_id: self.agent, min_words=3, max_workers=1)
+        self.addCleanup(responder.shutdown)
+        busy = threading.Event()
+        self.addCleanup(busy.set)
+        # Another call's draft holds the only worker
+        responder.executor.submit(busy.wait)
+
+        responder.on_partial_transcript("CA1", "I forgot my account password")
+        intent, _ = responder.resolve("CA1", "I forgot my account password")
+        self.assertEqual(intent['category'], 'account_support')
+        self.assertEqual((responder.stats['committed'], responder.stats['cancelled']), (0, 1))
+        self.assertEqual(len(self.agent.conversation_history), 2)
+
+    def test_wait_for_a_running_draft_is_bounded(self):
+        responder = SpeculativeResponder(lambda call_id: self.agent, min_words=3, max_wait=0.01)
+        self.addCleanup(responder.shutdown)
+        with fake_providers(ProviderProfile(openai_latency=LatencyModel(mean=0.2, distribution='constant'))):
+            responder.on_partial_transcript("CA1", "I forgot my account password")
+            intent, _ = responder.resolve("CA1", "I forgot my account password")
+        self.assertEqual(intent['original_text'], "I forgot my account password")
+        self.assertEqual((responder.stats['committed'], responder.stats['cancelled']), (0, 1))
+
+    def test_drafts_need_a_spare_admission_slot(self):
+        controller = AdmissionController(max_concurrent_turns=2, call_metrics=MagicMock())
+        responder = SpeculativeResponder(lambda call_id: self.agent, min_words=3, admission_controller=controller)
+        self.addCleanup(responder.shutdown)
+
+        turn = controller.admit("CA2")
+        self.assertFalse(responder.on_partial_transcript("CA1", "I forgot my account password"))
+        self.assertEqual(responder.stats['refused'], 1)
+        controller.release(turn)
+
+        self.assertTrue(responder.on_partial_transcript("CA1", "I forgot my account password"))
+        responder.resolve("CA1", "I forgot my account password")
+        self.assertEqual(responder.stats["committed"], 1, responder.stats)
+        self.assertEqual(controller.in_flight, {})
+        self.assertEqual(controller.stats['drafts_admitted'], 1)
+
+    def test_draft_over_the_turn_budget_is_regenerated(self):
+        controller = AdmissionController(max_concurrent_turns=4, call_metrics=MagicMock())
+        responder = SpeculativeResponder(lambda call_id: self.agent, min_words=3, admission_controller=controller)
+        self.addCleanup(responder.shutdown)
+
+        responder.on_partial_transcript("CA1", "I forgot my account password")
+        responder.speculations["CA1"].future.result(timeout=5)
+        # The draft had the full prompt budget; this turn was admitted with a reduced one
+        intent, _ = responder.resolve("CA1", "I forgot my account password", max_prompt_tokens=500)
+        self.assertEqual(intent['category'], 'account_support')
+        self.assertEqual((responder.stats['committed'], responder.stats['cancelled']), (0, 1))
+
+        responder.on_partial_transcript("CA1", "and my user name as well")
+        responder.speculations["CA1"].future.result(timeout=5)
+        responder.resolve("CA1", "and my user name as well")
+        self.assertEqual(responder.stats['committed'], 1)
+
+    def test_late_partials_of_a_resolved_turn_start_no_draft(self):
+        self.responder.on_partial_transcript("CA1", "I forgot my account")
+        self.responder.resolve("CA1", "I forgot my account password")
+        self.assertFalse(self.responder.on_partial_transcript("CA1", "I forgot my account"))
+        self.assertFalse(self.responder.on_partial_transcript("CA1", "I forgot my account password"))
+        self.assertNotIn("CA1", self.responder.speculations)
+
+        # A turn answered without drafting, e.g. while overloaded
+        self.responder.discard("CA1", "What does the premium plan cost")
+        self.assertFalse(self.responder.on_partial_transcript("CA1", "What does the premium"))
+
+        self.assertTrue(self.responder.on_partial_transcript("CA1", "Can I pay by card"))
+        self.assertNotIn("CA1", self.responder.resolved)
+        self.responder.discard("CA1")
+        self.assertEqual(self.responder.resolved, {})
+
+if __name__ == '__main__':
+    unittest.main()
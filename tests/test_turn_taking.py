@@ -0,0 +1,291 @@
+import unittest
+import sys
+import os
+import base64
+import json
+import tempfile
+import threading
+import wave
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from turn_taking import (
+    TurnTakingEngine, VoiceActivityDetector, AdaptiveEndpointer, MediaStreamSession, decode_mulaw, load_pcm_fixture
+)
+from support import use_temporary_workdir
+
+SAMPLE_RATE = 8000
+REPLY = "Thanks for calling. Your order shipped yesterday and should arrive within three to five business days."
+
+def synthesize(segments, seed=0):
+    """Build a call recording from ('noise' | 'speech', seconds) segments"""
+    rng = np.random.default_rng(seed)
+    pieces = []
+    for kind, seconds in segments:
+        count = int(seconds * SAMPLE_RATE)
+        audio = rng.normal(0, 30, count)
+        if kind == 'speech':
+            t = np.arange(count) / SAMPLE_RATE
+            syllables = 0.6 + 0.4 * np.abs(np.sin(2 * np.pi * 4 * t))
+            audio += 6000 * syllables * (np.sin(2 * np.pi * 180 * t) + 0.5 * np.sin(2 * np.pi * 360 * t))
+        pieces.append(audio)
+    return np.clip(np.concatenate(pieces), -32768, 32767).astype('<i2')
+
+class TestFixtures(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_load_wav_and_raw_pcm(self):
+        samples = synthesize([('noise', 0.2), ('speech', 0.2)])
+        wav_path = os.path.join(self.tmpdir.name, 'call.wav')
+        with wave.open(wav_path, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(SAMPLE_RATE)
+            wav.writeframes(samples.tobytes())
+        raw_path = os.path.join(self.tmpdir.name, 'call.pcm')
+        with open(raw_path, 'wb') as f:
+            f.write(samples.tobytes())
+
+        loaded, rate = load_pcm_fixture(wav_path)
+        self.assertEqual(rate, SAMPLE_RATE)
+        np.testing.assert_array_equal(loaded, samples)
+        np.testing.assert_array_equal(load_pcm_fixture(raw_path)[0], samples)
+
+    def test_decode_mulaw(self):
+        decoded = decode_mulaw(bytes([0xFF, 0x7F, 0x00, 0x80]))
+        self.assertEqual(list(decoded), [0, 0, -32124, 32124])
+
+class TestVoiceActivityDetector(unittest.TestCase):
+    def test_detects_speech_between_noise(self):
+        vad = VoiceActivityDetector(sample_rate=SAMPLE_RATE, hangover_ms=0)
+        decisions = vad.process(synthesize([('noise', 0.5), ('speech', 0.5), ('noise', 0.5)]))
+        self.assertEqual(len(decisions), 75)
+        self.assertFalse(any(decisions[:25]))
+        self.assertTrue(all(decisions[26:49]))
+        self.assertFalse(any(decisions[51:]))
+
+    def test_frames_span_chunks(self):
+        vad = VoiceActivityDetector(sample_rate=SAMPLE_RATE)
+        samples = synthesize([('noise', 0.5)])
+        self.assertEqual(len(vad.process(samples[:100])), 0)
+        self.assertEqual(len(vad.process(samples[100:])), 25)
+
+class TestAdaptiveEndpointer(unittest.TestCase):
+    def test_timeout_follows_caller_pauses(self):
+        endpointer = AdaptiveEndpointer(min_timeout=1, max_timeout=3, margin=0.3)
+        self.assertEqual(endpointer.speech_timeout(), 3)
+        for _ in range(10):
+            endpointer.observe_pause(0.4)
+        self.assertAlmostEqual(endpointer.timeout_seconds, 1.0)
+        self.assertEqual(endpointer.speech_timeout(), 1)
+        for _ in range(10):
+            endpointer.observe_pause(1.6)
+        self.assertEqual(endpointer.speech_timeout(), 2)
+
+class TestTurnTakingEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = TurnTakingEngine(sample_rate=SAMPLE_RATE, clock=lambda: 0.0)
+        self.interruptions = []
+        self.engine.add_barge_in_handler(lambda call_id, heard: self.interruptions.append((call_id, heard)))
+
+    def test_barge_in_during_playback(self):
+        self.engine.start_playback("CA1", REPLY, at=0.0)
+        audio = synthesize([('noise', 1.2), ('speech', 0.6), ('noise', 0.5)])
+        events = self.engine.process_audio("CA1", audio.tobytes(), at=0.0)
+
+        barge_ins = [e for e in events if e['type'] == 'barge_in']
+        self.assertEqual(len(barge_ins), 1)
+        self.assertAlmostEqual(barge_ins[0]['at'], 1.2, delta=0.05)
+        self.assertEqual(barge_ins[0]['heard_text'], "Thanks for calling.")
+        self.assertEqual(self.interruptions, [("CA1", "Thanks for calling.")])
+        self.assertEqual(self.engine.interrupted_playback("CA1", "Where is my order"), "Thanks for calling.")
+
+    def test_no_barge_in_after_playback_finished(self):
+        self.engine.start_playback("CA1", "Hello there.", at=0.0)
+        audio = synthesize([('noise', 1.2), ('speech', 0.6)])
+        events = self.engine.process_audio("CA1", audio, at=0.0)
+        self.assertEqual([e for e in events if e['type'] == 'barge_in'], [])
+        self.assertEqual(self.interruptions, [])
+
+    def test_end_of_utterance_uses_learned_pauses(self):
+        segments = [('noise', 0.5)]
+        for _ in range(4):
+            segments += [('speech', 0.5), ('noise', 0.6)]
+        segments += [('noise', 1.5)]
+        events = self.engine.process_audio("CA1", synthesize(segments), at=0.0)
+
+        ends = [e for e in events if e['type'] == 'end_of_utterance']
+        self.assertEqual(len(ends), 1)
+        self.assertLess(ends[0]['at'] - ends[0]['speech_ended_at'], 1.5)
+        self.assertEqual(self.engine.speech_timeout("CA1"), 1)
+
+    def test_media_stream_messages_drive_barge_in(self):
+        from cpu_executor import convert_audio_bytes
+        self.engine.start_playback("CA1", REPLY, at=0.0)
+        audio = convert_audio_bytes(synthesize([('noise', 1.2), ('speech', 0.6)]).tobytes(), 'pcm16', 'mulaw')
+        session = MediaStreamSession(self.engine)
+        messages = [{'event': 'connected'}, {'event': 'start', 'start': {'callSid': 'CA1', 'streamSid': 'MZ1'}}]
+        # Twilio sends 20 ms of 8 kHz mu-law per message
+        for offset in range(0, len(audio), 160):
+            messages.append({'event': 'media', 'media': {
+                'track': 'inbound', 'timestamp': str(offset // 8),
+                'payload': base64.b64encode(audio[offset:offset + 160]).decode('ascii')}})
+        messages.append({'event': 'stop'})
+
+        events = [event for message in messages for event in session.handle(json.dumps(message))]
+        barge_ins = [e for e in events if e['type'] == 'barge_in']
+        self.assertEqual(len(barge_ins), 1)
+        self.assertAlmostEqual(barge_ins[0]['at'], 1.2, delta=0.05)
+        self.assertEqual(self.interruptions, [("CA1", "Thanks for calling.")])
+
+    def test_partial_result_barge_in(self):
+        self.engine.start_playback("CA1", REPLY, at=0.0)
+        event = self.engine.observe_partial("CA1", "wait where", at=2.0)
+        self.assertEqual(event['type'], 'barge_in')
+        self.assertEqual(event['heard_text'], "Thanks for calling.")
+        self.assertIsNone(self.engine.observe_partial("CA1", "wait where is it", at=2.3))
+
+    def test_final_transcript_fallback(self):
+        self.engine.start_playback("CA1", REPLY, at=0.0)
+        heard = self.engine.interrupted_playback("CA1", "stop", at=4.6)
+        self.assertEqual(heard, "Thanks for calling.")
+        self.assertIsNone(self.engine.interrupted_playback("CA1", "stop", at=60.0))
+
+class TestTruncateLastResponse(unittest.TestCase):
+    def test_history_keeps_heard_text_only(self):
+        from benchmarks.fakes import fake_providers
+        with fake_providers():
+            from ai_agent import AIAgent
+            agent = AIAgent()
+            agent.commit_turn("Where is my order?", REPLY)
+            agent.truncate_last_response("Thanks for calling.")
+            self.assertEqual(agent.conversation_history[-1]["content"],
+                             "Thanks for calling.... [interrupted by caller]")
+            agent.truncate_last_response("")
+            self.assertEqual(agent.conversation_history, [{"role": "user", "content": "Where is my order?"}])
+
+class TestConcurrentBargeIn(unittest.TestCase):
+    CALLS = {
+        'CA1': ("My password is hunter2", "hold on"),
+        'CA2': ("What does the premium plan cost", "wait what"),
+    }
+
+    def setUp(self):
+        use_temporary_workdir(self)
+
+    def run_calls_at_once(self, client_for, turn):
+        barrier = threading.Barrier(len(self.CALLS))
+        errors = []
+
+        def run(call_sid):
+            try:
+                barrier.wait(timeout=5)
+                turn(client_for(), call_sid)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(call_sid,)) for call_sid in self.CALLS]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+        self.assertEqual(errors, [])
+
+    def test_interruptions_truncate_only_their_own_call(self):
+        from benchmarks.fakes import fake_providers
+        import app
+        now = [100.0]
+        services = app.AppServices()
+        engine = TurnTakingEngine(clock=lambda: now[0])
+        engine.add_barge_in_handler(services.cancel_pending_generation)
+        services._instances['turn_taking'] = engine
+
+        def first_turn(client, call_sid):
+            client.post('/incoming_call', data={'CallSid': call_sid})
+            client.post('/process_speech', data={'CallSid': call_sid, 'SpeechResult': self.CALLS[call_sid][0]})
+
+        def interrupting_turn(client, call_sid):
+            interruption = self.CALLS[call_sid][1]
+            client.post('/partial_speech', data={'CallSid': call_sid, 'StableSpeechResult': interruption})
+            client.post('/process_speech', data={'CallSid': call_sid, 'SpeechResult': interruption})
+
+        with fake_providers():
+            flask_app = app.create_app(services, warm_up=False)
+            self.run_calls_at_once(flask_app.test_client, first_turn)
+            # Both callers talk over the third second of their reply
+            now[0] += 3.0
+            self.run_calls_at_once(flask_app.test_client, interrupting_turn)
+
+        for call_sid, (question, interruption) in self.CALLS.items():
+            history = services.ai_agent(call_sid).conversation_history
+            self.assertEqual([m['role'] for m in history], ['user', 'assistant', 'user', 'assistant'])
+            self.assertEqual((history[0]['content'], history[2]['content']), (question, interruption))
+            self.assertTrue(history[1]['content'].endswith("... [interrupted by caller]"))
+            self.assertFalse(history[3]['content'].endswith("[interrupted by caller]"))
+            other_question = next(q for sid, (q, _) in self.CALLS.items() if sid != call_sid)
+            self.assertNotIn(other_question, str(history))
+
+class TestBargeInTruncation(unittest.TestCase):
+    def setUp(self):
+        use_temporary_workdir(self)
+
+    def test_draft_on_interruption_sees_only_heard_text(self):
+        from benchmarks.fakes import ProviderProfile, fake_providers
+        import app
+        now = [100.0]
+        services = app.AppServices()
+        engine = TurnTakingEngine(clock=lambda: now[0])
+        engine.add_barge_in_handler(services.cancel_pending_generation)
+        services._instances['turn_taking'] = engine
+
+        with fake_providers(ProviderProfile(request_log_size=20)) as profile:
+            client = app.create_app(services, warm_up=False).test_client()
+            client.post('/incoming_call', data={'CallSid': 'CA1'})
+            client.post('/process_speech', data={
+                'CallSid': 'CA1', 'SpeechResult': 'Where is the order I placed last week'})
+            reply = services.ai_agent('CA1').conversation_history[-1]['content']
+
+            now[0] += 3.0
+            seen = len(profile.chat_completion.requests)
+            interruption = 'no I mean the refund'
+            client.post('/partial_speech', data={'CallSid': 'CA1', 'StableSpeechResult': interruption})
+            services.speculative_responder.speculations['CA1'].future.result(timeout=5)
+            draft_prompts = str(list(profile.chat_completion.requests)[seen:])
+            self.assertIn('[interrupted by caller]', draft_prompts)
+            self.assertNotIn(reply, draft_prompts)
+
+            client.post('/process_speech', data={'CallSid': 'CA1', 'SpeechResult': interruption})
+
+        history = services.ai_agent('CA1').conversation_history
+        self.assertEqual([m['role'] for m in history], ['user', 'assistant', 'user', 'assistant'])
+        self.assertTrue(history[1]['content'].endswith('... [interrupted by caller]'))
+
+    def test_reply_cut_off_before_a_word_is_dropped_once(self):
+        from benchmarks.fakes import fake_providers
+        import app
+        now = [100.0]
+        services = app.AppServices()
+        engine = TurnTakingEngine(clock=lambda: now[0])
+        engine.add_barge_in_handler(services.cancel_pending_generation)
+        services._instances['turn_taking'] = engine
+
+        with fake_providers():
+            client = app.create_app(services, warm_up=False).test_client()
+            client.post('/incoming_call', data={'CallSid': 'CA1'})
+            client.post('/process_speech', data={'CallSid': 'CA1', 'SpeechResult': 'What does it cost'})
+            client.post('/process_speech', data={'CallSid': 'CA1', 'SpeechResult': 'And the premium plan'})
+            # Talks over the reply from its first word
+            now[0] += 0.5
+            client.post('/partial_speech', data={'CallSid': 'CA1', 'StableSpeechResult': 'stop'})
+            client.post('/process_speech', data={'CallSid': 'CA1', 'SpeechResult': 'stop'})
+
+        history = services.ai_agent('CA1').conversation_history
+        self.assertEqual([m['role'] for m in history], ['user', 'assistant', 'user', 'user', 'assistant'])
+        self.assertFalse(history[1]['content'].endswith('[interrupted by caller]'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from twiml_templates import (
+    TwiMLRenderer, TwiMLTemplate, build_greeting, build_reply, build_no_input, build_hangup,
+    build_transfer, build_transfer_offer
+)
+
+TRICKY_TEXT = [
+    "Your order shipped today.",
+    "Tom & Jerry's <special> \"offer\" > 50% ]]>",
+    "Café crème — naïve résumé \U0001F600",
+    "Line one\nLine two\r\n\ttabbed",
+    "&amp; already escaped &lt;tags&gt;",
+    "@@twiml-slot-ai_response@@",
+    "",
+    "lone surrogate \ud800 here",
+]
+
+class TestTwiMLRenderer(unittest.TestCase):
+    def setUp(self):
+        self.renderer = TwiMLRenderer()
+
+    def test_static_responses_match_library(self):
+        self.assertEqual(self.renderer.hangup(), str(build_hangup()))
+        self.assertEqual(self.renderer.transfer("+15550100"), str(build_transfer("+15550100")))
+        self.assertEqual(self.renderer.transfer_offer("+15550100"), str(build_transfer_offer("+15550100")))
+        for speech_timeout in (1, 2, 3):
+            self.assertEqual(self.renderer.greeting(speech_timeout), str(build_greeting(speech_timeout)))
+            self.assertEqual(self.renderer.no_input(speech_timeout), str(build_no_input(speech_timeout)))
+
+    def test_reply_matches_library_byte_for_byte(self):
+        for text in TRICKY_TEXT:
+            for speech_timeout in (1, 3):
+                expected = str(build_reply(text, speech_timeout)).encode('utf-8', 'surrogatepass')
+                actual = self.renderer.reply(text, speech_timeout).encode('utf-8', 'surrogatepass')
+                self.assertEqual(actual, expected, text)
+
+    def test_greeting_starts_media_stream_when_configured(self):
+        renderer = TwiMLRenderer(stream_url="wss://example.com/media_stream")
+        greeting = renderer.greeting(2)
+        self.assertEqual(greeting, str(build_greeting(2, "wss://example.com/media_stream")))
+        self.assertIn('<Start><Stream track="inbound_track" url="wss://example.com/media_stream" /></Start>', greeting)
+        self.assertNotIn('<Stream', TwiMLRenderer(stream_url=None).greeting(2))
+
+    def test_uncompiled_timeout_is_compiled_on_demand(self):
+        self.assertEqual(self.renderer.reply("Hi", 7), str(build_reply("Hi", 7)))
+        self.assertEqual(self.renderer.greeting(7), str(build_greeting(7)))
+
+class TestTwiMLTemplate(unittest.TestCase):
+    def test_multiple_slots(self):
+        from twilio.twiml.voice_response import VoiceResponse
+
+        def build(first, second):
+            response = VoiceResponse()
+            response.say(first)
+            response.pause(length=1)
+            response.say(second)
+            return response
+
+        template = TwiMLTemplate(build, ['second', 'first'])
+        self.assertEqual(template.order, ['first', 'second'])
+        self.assertEqual(template.render(first="a < b", second="c & d"), str(build("a < b", "c & d")))
+
+if __name__ == '__main__':
+    unittest.main()
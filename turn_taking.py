@@ -0,0 +1,343 @@
+import base64
+import json
+import math
+import threading
+import time
+import wave
+from collections import deque
+from typing import Callable, Dict, Any, List, Optional, Tuple, Union
+import numpy as np
+from config import (
+    VAD_SAMPLE_RATE, VAD_FRAME_MS, VAD_ENERGY_MARGIN_DB, VAD_MIN_SPEECH_DBFS, VAD_HANGOVER_MS,
+    BARGE_IN_MIN_SPEECH_MS, ENDPOINT_MIN_TIMEOUT, ENDPOINT_MAX_TIMEOUT, ENDPOINT_PAUSE_MARGIN,
+    TTS_WORDS_PER_SECOND, CALLER_WORDS_PER_SECOND
+)
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+def _build_mulaw_table() -> np.ndarray:
+    table = np.zeros(256, dtype=np.int16)
+    for code in range(256):
+        value = ~code & 0xFF
+        magnitude = (((value & 0x0F) << 3) + 0x84) << ((value >> 4) & 0x07)
+        table[code] = -(magnitude - 0x84) if value & 0x80 else magnitude - 0x84
+    return table
+
+_MULAW_TABLE = _build_mulaw_table()
+
+def decode_mulaw(data: bytes) -> np.ndarray:
+    """Decode G.711 mu-law bytes, as sent by Twilio media streams, to 16-bit PCM"""
+    return _MULAW_TABLE[np.frombuffer(data, dtype=np.uint8)]
+
+def load_pcm_fixture(path: str, sample_rate: int = VAD_SAMPLE_RATE) -> Tuple[np.ndarray, int]:
+    """Load a mono 16-bit recording from a WAV file or raw little-endian PCM"""
+    if path.endswith('.wav'):
+        with wave.open(path, 'rb') as wav:
+            if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+                raise ValueError(f"{path} must be 16-bit mono audio")
+            return np.frombuffer(wav.readframes(wav.getnframes()), dtype='<i2'), wav.getframerate()
+    with open(path, 'rb') as f:
+        return np.frombuffer(f.read(), dtype='<i2'), sample_rate
+
+class VoiceActivityDetector:
+    """Energy-based voice activity detection against an adaptive noise floor"""
+    def __init__(self,
+                 sample_rate: int = VAD_SAMPLE_RATE,
+                 frame_ms: int = VAD_FRAME_MS,
+                 margin_db: float = VAD_ENERGY_MARGIN_DB,
+                 min_speech_dbfs: float = VAD_MIN_SPEECH_DBFS,
+                 hangover_ms: int = VAD_HANGOVER_MS):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_size = sample_rate * frame_ms // 1000
+        self.margin_db = margin_db
+        self.min_speech_dbfs = min_speech_dbfs
+        self.hangover_frames = hangover_ms // frame_ms
+        self.noise_floor_db: Optional[float] = None
+        self._remainder = np.zeros(0, dtype=np.int16)
+        self._hangover = 0
+
+    @property
+    def buffered_samples(self) -> int:
+        """Samples waiting for the rest of their frame"""
+        return len(self._remainder)
+
+    def process(self, samples: np.ndarray) -> List[bool]:
+        """Classify each complete frame in ``samples`` as speech (True) or not"""
+        samples = np.concatenate([self._remainder, samples.astype(np.int16, copy=False)])
+        frame_count = len(samples) // self.frame_size
+        self._remainder = samples[frame_count * self.frame_size:]
+        if frame_count == 0:
+            return []
+
+        frames = samples[:frame_count * self.frame_size].reshape(frame_count, self.frame_size)
+        rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+        levels = 20 * np.log10(rms / 32768.0 + 1e-10)
+
+        decisions = []
+        for level in levels:
+            if self.noise_floor_db is None:
+                self.noise_floor_db = level
+            voiced = level >= self.min_speech_dbfs and level >= self.noise_floor_db + self.margin_db
+            if voiced:
+                self._hangover = self.hangover_frames
+            else:
+                # Track the floor quickly downwards and slowly upwards so speech never raises it much
+                if level < self.noise_floor_db:
+                    self.noise_floor_db = level
+                else:
+                    self.noise_floor_db = 0.95 * self.noise_floor_db + 0.05 * level
+                if self._hangover > 0:
+                    self._hangover -= 1
+                    voiced = True
+            decisions.append(bool(voiced))
+        return decisions
+
+class Playback:
+    """A reply being spoken to the caller, used to estimate how much of it they heard"""
+    def __init__(self, text: str, started_at: float, words_per_second: float = TTS_WORDS_PER_SECOND):
+        self.text = text
+        self.words = text.split()
+        self.started_at = started_at
+        self.words_per_second = words_per_second
+
+    @property
+    def ends_at(self) -> float:
+        return self.started_at + len(self.words) / self.words_per_second
+
+    def is_playing(self, at: float) -> bool:
+        return self.started_at <= at < self.ends_at
+
+    def heard_text(self, at: float) -> str:
+        spoken = int(max(at - self.started_at, 0.0) * self.words_per_second)
+        return " ".join(self.words[:spoken])
+
+class AdaptiveEndpointer:
+    """Chooses the end-of-utterance silence timeout from the caller's own pauses"""
+    def __init__(self,
+                 min_timeout: int = ENDPOINT_MIN_TIMEOUT,
+                 max_timeout: int = ENDPOINT_MAX_TIMEOUT,
+                 margin: float = ENDPOINT_PAUSE_MARGIN,
+                 window: int = 20):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.margin = margin
+        self.pauses = deque(maxlen=window)
+
+    def observe_pause(self, seconds: float):
+        """Record a mid-utterance pause; longer gaps are turn ends, not pauses"""
+        if 0 < seconds < self.max_timeout:
+            self.pauses.append(seconds)
+
+    @property
+    def timeout_seconds(self) -> float:
+        if not self.pauses:
+            return float(self.max_timeout)
+        ordered = sorted(self.pauses)
+        typical_pause = ordered[min(int(len(ordered) * 0.9), len(ordered) - 1)]
+        return min(max(typical_pause + self.margin, self.min_timeout), self.max_timeout)
+
+    def speech_timeout(self) -> int:
+        """Timeout in the whole seconds accepted by Twilio's speechTimeout"""
+        return int(min(max(math.ceil(self.timeout_seconds), self.min_timeout), self.max_timeout))
+
+class CallTurnState:
+    def __init__(self, sample_rate: int):
+        self.vad = VoiceActivityDetector(sample_rate=sample_rate)
+        self.endpointer = AdaptiveEndpointer()
+        self.playback: Optional[Playback] = None
+        self.heard_text: Optional[str] = None
+        self.speech_started_at: Optional[float] = None
+        self.last_speech_at: Optional[float] = None
+        self.last_partial_at: Optional[float] = None
+        self.caller_speaking = False
+
+class TurnTakingEngine:
+    """Detects barge-in and end of utterance for each call.
+
+    Inbound audio (e.g. from a Twilio media stream) is run through a VAD; caller
+    speech during playback is a barge-in, which stops the playback, records how
+    much of the reply was heard and notifies the registered handlers so they can
+    cancel pending TTS and LLM work. Without audio, Twilio's partial speech
+    results serve as the speech signal.
+    """
+    def __init__(self,
+                 sample_rate: int = VAD_SAMPLE_RATE,
+                 min_barge_in_ms: int = BARGE_IN_MIN_SPEECH_MS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.sample_rate = sample_rate
+        self.min_barge_in_ms = min_barge_in_ms
+        self.clock = clock
+        self.calls: Dict[str, CallTurnState] = {}
+        self.barge_in_handlers: List[Callable[[str, str], None]] = []
+        self._lock = threading.Lock()
+
+    def add_barge_in_handler(self, handler: Callable[[str, str], None]):
+        """Register ``handler(call_id, heard_text)`` to run when a caller interrupts"""
+        self.barge_in_handlers.append(handler)
+
+    def start_playback(self, call_id: str, text: str, at: Optional[float] = None):
+        """Note that ``text`` has started playing to the caller"""
+        state = self._state(call_id)
+        state.playback = Playback(text, self.clock() if at is None else at)
+        state.heard_text = None
+
+    def speech_timeout(self, call_id: Optional[str]) -> int:
+        """End-of-utterance timeout to use for the call's next Gather"""
+        if call_id is None or call_id not in self.calls:
+            return AdaptiveEndpointer().speech_timeout()
+        return self.calls[call_id].endpointer.speech_timeout()
+
+    def process_audio(self,
+                      call_id: str,
+                      audio: Union[bytes, np.ndarray],
+                      at: Optional[float] = None,
+                      encoding: str = 'pcm16') -> List[Dict[str, Any]]:
+        """Feed inbound caller audio starting at time ``at``; returns barge-in and end-of-utterance events"""
+        if isinstance(audio, bytes):
+            audio = decode_mulaw(audio) if encoding == 'mulaw' else np.frombuffer(audio, dtype='<i2')
+        state = self._state(call_id)
+        start = self.clock() if at is None else at
+        frame_seconds = state.vad.frame_ms / 1000.0
+        # Frames completed by this chunk begin with any samples carried over from the last one
+        start -= state.vad.buffered_samples / self.sample_rate
+
+        events = []
+        for index, voiced in enumerate(state.vad.process(audio)):
+            frame_at = start + index * frame_seconds
+            if voiced:
+                events.extend(self._on_speech(call_id, state, frame_at, frame_seconds))
+            else:
+                events.extend(self._on_silence(state, frame_at))
+        return events
+
+    def observe_partial(self, call_id: str, text: str, at: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Use a partial speech result as evidence the caller is talking"""
+        state = self._state(call_id)
+        now = self.clock() if at is None else at
+        if state.last_partial_at is not None:
+            gap = now - state.last_partial_at
+            # Recogniser updates arrive a few times a second while speaking; longer gaps are pauses
+            if gap > 0.5:
+                state.endpointer.observe_pause(gap)
+        state.last_partial_at = now
+
+        if state.playback is not None:
+            # The caller started speaking roughly as long ago as it takes to say the partial transcript
+            speech_started = now - len(text.split()) / CALLER_WORDS_PER_SECOND
+            if state.playback.is_playing(speech_started):
+                return self._barge_in(call_id, state, speech_started)
+        return None
+
+    def interrupted_playback(self,
+                             call_id: str,
+                             utterance: str,
+                             at: Optional[float] = None,
+                             include_barge_in: bool = True) -> Optional[str]:
+        """Return what the caller heard of the last reply if they cut it off, else None.
+
+        Pass ``include_barge_in=False`` when the barge-in handlers already acted on
+        interruptions detected mid-turn; only one estimated from the final transcript
+        is then returned.
+        """
+        state = self.calls.get(call_id)
+        if state is None:
+            return None
+        state.last_partial_at = None
+        if state.heard_text is not None:
+            heard, state.heard_text = state.heard_text, None
+            return heard if include_barge_in else None
+        if state.playback is None:
+            return None
+
+        # Without audio or partials, work back from when the final transcript arrived
+        now = self.clock() if at is None else at
+        speech_started = (now - state.endpointer.timeout_seconds
+                          - len(utterance.split()) / CALLER_WORDS_PER_SECOND)
+        playback, state.playback = state.playback, None
+        if playback.is_playing(speech_started):
+            return playback.heard_text(speech_started)
+        return None
+
+    def end_call(self, call_id: str):
+        with self._lock:
+            self.calls.pop(call_id, None)
+
+    def _state(self, call_id: str) -> CallTurnState:
+        with self._lock:
+            if call_id not in self.calls:
+                self.calls[call_id] = CallTurnState(self.sample_rate)
+            return self.calls[call_id]
+
+    def _on_speech(self, call_id: str, state: CallTurnState, at: float, frame_seconds: float) -> List[Dict[str, Any]]:
+        events = []
+        if not state.caller_speaking:
+            if state.last_speech_at is not None:
+                state.endpointer.observe_pause(at - state.last_speech_at)
+            state.caller_speaking = True
+            if state.speech_started_at is None:
+                state.speech_started_at = at
+        state.last_speech_at = at + frame_seconds
+
+        playback = state.playback
+        if playback is not None and playback.is_playing(state.speech_started_at):
+            if (at + frame_seconds - state.speech_started_at) * 1000 >= self.min_barge_in_ms:
+                events.append(self._barge_in(call_id, state, state.speech_started_at))
+        return events
+
+    def _on_silence(self, state: CallTurnState, at: float) -> List[Dict[str, Any]]:
+        state.caller_speaking = False
+        if state.speech_started_at is None or state.last_speech_at is None:
+            return []
+        if at - state.last_speech_at >= state.endpointer.timeout_seconds:
+            event = {
+                'type': 'end_of_utterance',
+                'at': at,
+                'speech_started_at': state.speech_started_at,
+                'speech_ended_at': state.last_speech_at
+            }
+            state.speech_started_at = None
+            state.last_speech_at = None
+            return [event]
+        return []
+
+    def _barge_in(self, call_id: str, state: CallTurnState, speech_started: float) -> Dict[str, Any]:
+        playback, state.playback = state.playback, None
+        state.heard_text = playback.heard_text(speech_started)
+        event = {'type': 'barge_in', 'at': speech_started, 'heard_text': state.heard_text}
+        for handler in self.barge_in_handlers:
+            try:
+                handler(call_id, state.heard_text)
+            except Exception as e:
+                logger.error(f"Error in barge-in handler for call {call_id}: {e}")
+        return event
+
+class MediaStreamSession:
+    """Feeds one Twilio media stream connection into the turn-taking engine.
+
+    ``start`` names the call; each ``media`` message carries base64 mu-law audio
+    stamped in milliseconds from the start of the stream.
+    """
+    def __init__(self, engine: TurnTakingEngine):
+        self.engine = engine
+        self.call_id: Optional[str] = None
+        self.started_at: Optional[float] = None
+
+    def handle(self, message: Union[str, bytes]) -> List[Dict[str, Any]]:
+        """Process one WebSocket message; returns the barge-in and end-of-utterance events it produced"""
+        data = json.loads(message)
+        event = data.get('event')
+        if event == 'start':
+            self.call_id = data['start']['callSid']
+        elif event == 'media' and self.call_id is not None:
+            media = data['media']
+            if media.get('track', 'inbound') != 'inbound':
+                return []
+            offset = int(media.get('timestamp', 0)) / 1000.0
+            if self.started_at is None:
+                # Anchor the stream to the engine clock once, so network jitter does not shift later frames
+                self.started_at = self.engine.clock() - offset
+            return self.engine.process_audio(self.call_id, base64.b64decode(media['payload']),
+                                             at=self.started_at + offset, encoding='mulaw')
+        return []
@@ -0,0 +1,156 @@
+from typing import Callable, Dict, List, Optional, Sequence
+from xml.sax.saxutils import escape
+from twilio.twiml.voice_response import VoiceResponse, Gather
+from config import SPEECH_TIMEOUT, ENDPOINT_MIN_TIMEOUT, ENDPOINT_MAX_TIMEOUT, MEDIA_STREAM_URL
+
+GREETING = "Hello, I'm your AI customer support agent. How can I help you today?"
+FOLLOW_UP = "Is there anything else I can help you with?"
+NO_INPUT_PROMPT = "I didn't catch that. Could you please repeat?"
+GOODBYE = "Thank you for calling. Goodbye!"
+TRANSFER_OFFER = ("We're experiencing a high volume of calls, so I'll transfer you to a member of our team. "
+                  "To keep talking with me instead, press 2 or say continue.")
+TRANSFER_NOTICE = "Please hold while I transfer you."
+TRANSFER_DECLINED = "No problem, let's keep going."
+
+def build_speech_gather(speech_timeout: int) -> Gather:
+    # Partial results drive both barge-in tracking and speculative drafting
+    return Gather(input='speech', action='/process_speech', timeout=SPEECH_TIMEOUT,
+                  speech_timeout=speech_timeout, partial_result_callback='/partial_speech')
+
+def build_greeting(speech_timeout: int, stream_url: Optional[str] = None) -> VoiceResponse:
+    response = VoiceResponse()
+    if stream_url:
+        # Fork the caller's audio to /media_stream for the rest of the call, for VAD barge-in
+        response.start().stream(url=stream_url, track='inbound_track')
+    gather = build_speech_gather(speech_timeout)
+    gather.say(GREETING)
+    response.append(gather)
+    return response
+
+def build_reply(ai_response: str, speech_timeout: int) -> VoiceResponse:
+    # Speak the reply inside the Gather so the caller can interrupt it
+    response = VoiceResponse()
+    gather = build_speech_gather(speech_timeout)
+    gather.say(ai_response)
+    gather.say(FOLLOW_UP)
+    response.append(gather)
+    return response
+
+def build_no_input(speech_timeout: int) -> VoiceResponse:
+    response = VoiceResponse()
+    response.say(NO_INPUT_PROMPT)
+    response.append(build_speech_gather(speech_timeout))
+    return response
+
+def build_hangup() -> VoiceResponse:
+    response = VoiceResponse()
+    response.say(GOODBYE)
+    response.hangup()
+    return response
+
+def build_transfer(transfer_to: str) -> VoiceResponse:
+    response = VoiceResponse()
+    response.say(TRANSFER_NOTICE)
+    response.dial(transfer_to)
+    return response
+
+def build_transfer_offer(transfer_to: str) -> VoiceResponse:
+    # A choice sends the caller to /transfer_choice; staying silent falls through to the transfer
+    response = VoiceResponse()
+    gather = Gather(input='dtmf speech', action='/transfer_choice', num_digits=1, timeout=5, hints='continue')
+    gather.say(TRANSFER_OFFER)
+    response.append(gather)
+    response.say(TRANSFER_NOTICE)
+    response.dial(transfer_to)
+    return response
+
+class TwiMLTemplate:
+    """TwiML rendered once by the twilio library, with text slots filled by string substitution.
+
+    Slot values are escaped exactly as ElementTree escapes element text, so the
+    output matches ``str(build(**values))`` byte for byte.
+    """
+    def __init__(self, build: Callable[..., VoiceResponse], slots: Sequence[str], **fixed):
+        self.build = build
+        self.slots = list(slots)
+        self.fixed = fixed
+
+        markers = {slot: f"@@twiml-slot-{slot}@@" for slot in self.slots}
+        rendered = str(build(**markers, **fixed))
+        self.parts: List[str] = []
+        self.order: List[str] = []
+        remaining = rendered
+        while True:
+            positions = [(remaining.find(marker), slot) for slot, marker in markers.items() if marker in remaining]
+            if not positions:
+                break
+            position, slot = min(positions)
+            self.parts.append(remaining[:position])
+            self.order.append(slot)
+            remaining = remaining[position + len(markers[slot]):]
+        self.parts.append(remaining)
+
+    def render(self, **values: str) -> str:
+        for slot in self.order:
+            value = values[slot]
+            # The library omits empty text entirely and writes unencodable characters as
+            # character references; leave those rare cases to the library itself
+            if not value or not (value.isascii() or _is_utf8_encodable(value)):
+                return str(self.build(**values, **self.fixed))
+
+        pieces = [self.parts[0]]
+        for index, slot in enumerate(self.order):
+            pieces.append(escape(values[slot]))
+            pieces.append(self.parts[index + 1])
+        return "".join(pieces)
+
+def _is_utf8_encodable(value: str) -> bool:
+    try:
+        value.encode('utf-8')
+        return True
+    except UnicodeEncodeError:
+        return False
+
+class TwiMLRenderer:
+    """Serves the app's TwiML from strings precomputed at startup"""
+    def __init__(self,
+                 speech_timeouts: Sequence[int] = range(ENDPOINT_MIN_TIMEOUT, ENDPOINT_MAX_TIMEOUT + 1),
+                 stream_url: Optional[str] = MEDIA_STREAM_URL):
+        self.stream_url = stream_url
+        self.hangup_xml = str(build_hangup())
+        self.transfer_template = TwiMLTemplate(build_transfer, ['transfer_to'])
+        self.transfer_offer_template = TwiMLTemplate(build_transfer_offer, ['transfer_to'])
+        self._greetings: Dict[int, str] = {}
+        self._no_inputs: Dict[int, str] = {}
+        self._replies: Dict[int, TwiMLTemplate] = {}
+        for speech_timeout in speech_timeouts:
+            self._compile(speech_timeout)
+
+    def greeting(self, speech_timeout: int) -> str:
+        if speech_timeout not in self._greetings:
+            self._compile(speech_timeout)
+        return self._greetings[speech_timeout]
+
+    def no_input(self, speech_timeout: int) -> str:
+        if speech_timeout not in self._no_inputs:
+            self._compile(speech_timeout)
+        return self._no_inputs[speech_timeout]
+
+    def reply(self, ai_response: str, speech_timeout: int) -> str:
+        if speech_timeout not in self._replies:
+            self._compile(speech_timeout)
+        return self._replies[speech_timeout].render(ai_response=ai_response)
+
+    def hangup(self) -> str:
+        return self.hangup_xml
+
+    def transfer(self, transfer_to: str) -> str:
+        return self.transfer_template.render(transfer_to=transfer_to)
+
+    def transfer_offer(self, transfer_to: str) -> str:
+        return self.transfer_offer_template.render(transfer_to=transfer_to)
+
+    def _compile(self, speech_timeout: int):
+        self._greetings[speech_timeout] = str(build_greeting(speech_timeout, self.stream_url))
+        self._no_inputs[speech_timeout] = str(build_no_input(speech_timeout))
+        self._replies[speech_timeout] = TwiMLTemplate(build_reply, ['ai_response'], speech_timeout=speech_timeout)
@@ -1,13 +1,13 @@
 import logging
 import json
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import hashlib
 import os
-from config import LOG_LEVEL, LOG_FORMAT
+from cpu_executor import (
+    CPUExecutor, SharedAudioBuffer, converted_size, convert_audio_bytes, detect_silence_bytes, run_task
+)
 
-# Set up logging
-logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
 logger = logging.getLogger(__name__)
 
 class CallUtils:
@@ -60,25 +60,43 @@ class ConversationUtils:
             logger.error(f"Error loading conversation: {e}")
         return None
 
+    @staticmethod
+    def index_transcript(conversation: list, executor: Optional[CPUExecutor] = None) -> Dict[str, List[int]]:
+        """Map each term in a conversation to the positions of the messages containing it"""
+        try:
+            return run_task(executor, 'index_transcript', conversation)
+        except Exception as e:
+            logger.error(f"Error indexing transcript: {e}")
+            return {}
+
 class AudioUtils:
     @staticmethod
-    def convert_audio_format(audio_data: bytes, source_format: str, target_format: str) -> Optional[bytes]:
-        """Convert audio between different formats"""
+    def convert_audio_format(audio_data: bytes, source_format: str, target_format: str,
+                             executor: Optional[CPUExecutor] = None) -> Optional[bytes]:
+        """Convert audio between the 'pcm16' and 'mulaw' encodings"""
         try:
-            # Implementation would depend on audio processing library
-            # This is a placeholder for the actual implementation
-            return audio_data
+            if source_format == target_format:
+                return audio_data
+            if executor is None:
+                return convert_audio_bytes(audio_data, source_format, target_format)
+            # Workers read and write the audio through shared memory rather than pickled bytes
+            size = converted_size(len(audio_data), source_format, target_format)
+            with SharedAudioBuffer.from_bytes(audio_data) as source, SharedAudioBuffer(size) as target:
+                written = run_task(executor, 'convert_audio', source.ref, target.ref, source_format, target_format)
+                return target.tobytes(written)
         except Exception as e:
             logger.error(f"Error converting audio format: {e}")
             return None
 
     @staticmethod
-    def detect_silence(audio_data: bytes, threshold: float = 0.1) -> bool:
-        """Detect if audio contains silence"""
+    def detect_silence(audio_data: bytes, threshold: float = 0.1, audio_format: str = 'pcm16',
+                       executor: Optional[CPUExecutor] = None) -> bool:
+        """Detect if audio is silent, i.e. fewer than ``threshold`` of its frames carry speech"""
         try:
-            # Implementation would depend on audio processing library
-            # This is a placeholder for the actual implementation
-            return False
+            if executor is None:
+                return detect_silence_bytes(audio_data, audio_format, threshold)
+            with SharedAudioBuffer.from_bytes(audio_data) as source:
+                return run_task(executor, 'detect_silence', source.ref, audio_format, threshold)
         except Exception as e:
             logger.error(f"Error detecting silence: {e}")
             return True
@@ -113,15 +131,6 @@ class SecurityUtils:
         return bool(api_key and len(api_key) >= 32)
 
     @staticmethod
-    def mask_sensitive_data(text: str) -> str:
-        """Mask sensitive data in logs"""
-        # Add patterns for sensitive data (credit cards, SSNs, etc.)
-        patterns = {
-            r'\b\d{16}\b': '****-****-****-****',  # Credit card
-            r'\b\d{3}-\d{2}-\d{4}\b': '***-**-****',  # SSN
-            r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b': '****@****.***'  # Email
-        }
-        masked = text
-        for pattern, mask in patterns.items():
-            masked = masked.replace(pattern, mask)
-        return masked
+    def mask_sensitive_data(text: str, executor: Optional[CPUExecutor] = None) -> str:
+        """Mask sensitive data (card numbers, SSNs, phone numbers, emails) in logs and transcripts"""
+        return run_task(executor, 'redact_pii', text)